@@ -1,19 +1,70 @@
 # bot/database/models.py
 import logging
 import sqlite3
+import time
 
+import pytz
 from settings import settings
+from utils.calculations import (
+    DEFAULT_HEIGHT,
+    FORMULA_VERSION,
+    ProgressConstants,
+    calculate_current_point,
+    calculate_point,
+    calculate_progress_constants,
+    calculate_target_point,
+)
+from utils.metrics import TracedConnection
 
 logger = logging.getLogger(__name__)
 DATABASE_PATH = settings.database_path
 
+# Срок хранения пустых записей FSM (завершенных диалогов), с
+FSM_EMPTY_RECORD_TTL = 24 * 60 * 60
+
+# Столбцы users с константами прогресса (для миграции старых баз)
+PROGRESS_CONSTANTS_COLUMNS = (
+    ("initial_bmi", "REAL"),
+    ("target_bmi", "REAL"),
+    ("weight_factor", "REAL"),
+    ("target_point", "REAL"),
+    ("formula_version", "INTEGER"),
+)
+
+
+def get_connection() -> sqlite3.Connection:
+    """Открытие соединения с базой данных бота.
+
+    Соединения из разных процессов-воркеров ждут освобождения блокировки
+    до SQLITE_BUSY_TIMEOUT секунд вместо немедленной ошибки "database is locked".
+    Запросы учитываются в метриках обрабатываемого обновления.
+    """
+    conn = sqlite3.connect(DATABASE_PATH, timeout=settings.sqlite_busy_timeout, factory=TracedConnection)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def progress_constants_values(constants: ProgressConstants) -> tuple[float, float, float, float, int]:
+    """Значения столбцов users с константами прогресса: initial_bmi, target_bmi, weight_factor, target_point, formula_version."""
+    return constants.initial_bmi, constants.target_bmi, constants.weight_factor, constants.target_point, FORMULA_VERSION
+
+
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> None:
+    """Добавление столбца в существующую таблицу (миграция старых баз)."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 
 def init_db() -> None:
     """Инициализация базы данных."""
     logger.info(DATABASE_PATH)
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
+    # WAL позволяет читать параллельно с записью из других процессов, режим сохраняется в файле базы
+    cursor.execute("PRAGMA journal_mode = WAL")
+
     # Создание таблицы пользователей
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -24,9 +75,44 @@ def init_db() -> None:
             height REAL,
             start_weight REAL,
             target_weight REAL,
-            registration_date TEXT DEFAULT CURRENT_TIMESTAMP
+            registration_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            weight_reminder_time TEXT,  -- персональное время напоминания о весе (HH:MM), NULL - общее
+            is_active INTEGER NOT NULL DEFAULT 1,  -- 0, если бот заблокирован или чат недоступен
+            inactive_since TEXT,  -- когда пользователь стал недоступен
+            -- константы расчета прогресса (utils.calculations.ProgressConstants) и версия формулы
+            initial_bmi REAL,
+            target_bmi REAL,
+            weight_factor REAL,
+            target_point REAL,
+            formula_version INTEGER
         )
     """)
+    _add_column_if_missing(cursor, "users", "weight_reminder_time", "TEXT")
+    _add_column_if_missing(cursor, "users", "is_active", "INTEGER NOT NULL DEFAULT 1")
+    _add_column_if_missing(cursor, "users", "inactive_since", "TEXT")
+    for column, definition in PROGRESS_CONSTANTS_COLUMNS:
+        _add_column_if_missing(cursor, "users", column, definition)
+
+    # Расчет констант прогресса для пользователей без них или со старой версией формулы
+    cursor.execute("""
+        SELECT id, start_weight, height, target_weight FROM users
+        WHERE start_weight IS NOT NULL AND target_weight IS NOT NULL
+          AND (formula_version IS NULL OR formula_version != ?)
+    """, (FORMULA_VERSION,))
+    stale_constants = {
+        user_id: calculate_progress_constants(start_weight, height or DEFAULT_HEIGHT, target_weight)
+        for user_id, start_weight, height, target_weight in cursor.fetchall()
+    }
+    cursor.executemany(
+        """
+        UPDATE users SET initial_bmi = ?, target_bmi = ?, weight_factor = ?, target_point = ?, formula_version = ?
+        WHERE id = ?
+        """,
+        [(*progress_constants_values(constants), user_id) for user_id, constants in stale_constants.items()],
+    )
+    if stale_constants:
+        logger.info("Пересчитаны константы прогресса %s пользователей (версия формулы %s)",
+                    len(stale_constants), FORMULA_VERSION)
 
     # Создание таблицы записей веса
     cursor.execute("""
@@ -86,6 +172,113 @@ def init_db() -> None:
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_weight_records_date ON weight_records (record_date)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_records_date ON activity_records (record_date)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_records_type ON activity_records (activity_type_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_weight_reminder_time ON users (weight_reminder_time)")
+
+    # Создание таблицы снимков прогресса (обновляется при каждой записи веса)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_progress (
+            user_id INTEGER PRIMARY KEY,
+            current_weight REAL NOT NULL,  -- последний записанный вес
+            last_update TEXT NOT NULL,  -- record_date последней записи веса
+            lost_weight REAL NOT NULL,  -- сброшено кг от стартового веса (отрицательное - набрано)
+            target_point REAL NOT NULL,
+            current_point REAL NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,  -- номер изменения, по нему воркеры подтягивают чужие обновления
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    _add_column_if_missing(cursor, "user_progress", "version", "INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_progress_version ON user_progress (version)")
+
+    # Пересчет снимков пользователей, чьи константы пересчитаны (например, после смены версии формулы)
+    cursor.execute("SELECT user_id, current_weight FROM user_progress")
+    cursor.executemany(
+        """
+        UPDATE user_progress SET target_point = ?, current_point = ?,
+            version = (SELECT MAX(version) FROM user_progress) + 1
+        WHERE user_id = ?
+        """,
+        [
+            (stale_constants[user_id].target_point, calculate_point(stale_constants[user_id], current_weight), user_id)
+            for user_id, current_weight in cursor.fetchall()
+            if user_id in stale_constants
+        ],
+    )
+
+    # Заполнение снимков для пользователей с записями веса, у которых снимка еще нет
+    conn.create_function("target_point", 3, calculate_target_point, deterministic=True)
+    conn.create_function("current_point", 4, calculate_current_point, deterministic=True)
+    cursor.execute("""
+        INSERT INTO user_progress (user_id, current_weight, last_update, lost_weight, target_point, current_point)
+        SELECT u.id, w.weight, w.record_date, u.start_weight - w.weight,
+               target_point(u.start_weight, COALESCE(u.height, ?), u.target_weight),
+               current_point(u.start_weight, w.weight, COALESCE(u.height, ?), u.target_weight)
+        FROM users u
+        JOIN weight_records w ON w.id = (
+            SELECT id FROM weight_records
+            WHERE user_id = u.id
+            ORDER BY record_date DESC, id DESC
+            LIMIT 1
+        )
+        WHERE u.start_weight IS NOT NULL AND u.target_weight IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM user_progress p WHERE p.user_id = u.id)
+    """, (DEFAULT_HEIGHT, DEFAULT_HEIGHT))
+
+    # Создание таблицы дневных итогов активности (обновляется при каждой записи активности)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS activity_daily_summary (
+            user_id INTEGER NOT NULL,
+            activity_type_id INTEGER NOT NULL,
+            day TEXT NOT NULL,  -- дата в часовом поясе уведомлений (YYYY-MM-DD)
+            records_count INTEGER NOT NULL,
+            total_value REAL NOT NULL,
+            total_calories REAL NOT NULL,
+            PRIMARY KEY (user_id, activity_type_id, day)
+        ) WITHOUT ROWID
+    """)
+
+    # Заполнение итогов по уже сохраненным записям, если таблица только что создана
+    from database.queries import record_local_day  # noqa: PLC0415
+
+    tz = pytz.timezone(settings.notification_timezone)
+    conn.create_function("local_day", 1, lambda record_date: record_local_day(record_date, tz), deterministic=True)
+    cursor.execute("""
+        INSERT INTO activity_daily_summary (user_id, activity_type_id, day, records_count, total_value, total_calories)
+        SELECT user_id, activity_type_id, local_day(record_date), COUNT(*), SUM(value), TOTAL(calories)
+        FROM activity_records
+        WHERE NOT EXISTS (SELECT 1 FROM activity_daily_summary)
+        GROUP BY 1, 2, 3
+    """)
+
+    # Создание таблицы file_id загруженных в Telegram графиков (utils.charts)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chart_files (
+            user_id INTEGER NOT NULL,
+            chart_type TEXT NOT NULL,
+            cache_key TEXT NOT NULL,  -- версия данных, для которой загружен график
+            file_id TEXT NOT NULL,
+            PRIMARY KEY (user_id, chart_type)
+        ) WITHOUT ROWID
+    """)
+
+    # Создание таблицы состояний FSM (storage.sqlite.SQLiteStorage)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key TEXT PRIMARY KEY,  -- ключ aiogram: fsm:<bot_id>:<chat_id>:<user_id>:<destiny>
+            state TEXT,
+            data TEXT NOT NULL,  -- данные FSM в JSON
+            version INTEGER NOT NULL,  -- возрастает с каждой записью, по ней воркеры подтягивают изменения
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fsm_storage_version ON fsm_storage (version)")
+
+    # Удаление пустых состояний старше суток (запись с последней версией оставляем, чтобы версии не повторялись)
+    cursor.execute("""
+        DELETE FROM fsm_storage
+        WHERE state IS NULL AND data = '{}' AND updated_at < ?
+            AND version < (SELECT MAX(version) FROM fsm_storage)
+    """, (time.time() - FSM_EMPTY_RECORD_TTL,))
 
     conn.commit()
     conn.close()
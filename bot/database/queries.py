@@ -0,0 +1,549 @@
+# bot/database/queries.py
+import sqlite3
+from dataclasses import dataclass
+from datetime import UTC, datetime, time, timedelta
+
+from pytz import BaseTzInfo
+from settings import settings
+from utils.calculations import (
+    DEFAULT_HEIGHT,
+    FORMULA_VERSION,
+    ProgressConstants,
+    calculate_point,
+    calculate_progress_constants,
+)
+
+from database.models import get_connection, progress_constants_values
+
+# Формат хранения дат в таблицах записей (UTC)
+RECORD_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Таблицы записей, по которым отбирается аудитория напоминаний
+REMINDER_RECORD_TABLES = ("weight_records", "activity_records")
+
+
+def local_day_bounds_utc(tz: BaseTzInfo, now: datetime | None = None) -> tuple[str, str]:
+    """Границы текущих суток в часовом поясе tz в виде строк record_date (UTC)."""
+    now = now or datetime.now(UTC)
+    local_today = now.astimezone(tz).date()
+    day_start = tz.localize(datetime.combine(local_today, time.min))
+    day_end = tz.localize(datetime.combine(local_today + timedelta(days=1), time.min))
+    return (
+        day_start.astimezone(UTC).strftime(RECORD_DATE_FORMAT),
+        day_end.astimezone(UTC).strftime(RECORD_DATE_FORMAT),
+    )
+
+
+def record_local_day(record_date: str, tz: BaseTzInfo) -> str:
+    """Дата (YYYY-MM-DD) записи в часовом поясе tz."""
+    return datetime.strptime(record_date, RECORD_DATE_FORMAT).replace(tzinfo=UTC).astimezone(tz).date().isoformat()
+
+
+def local_window_start(tz: BaseTzInfo, days: int) -> str:
+    """Первая дата (YYYY-MM-DD) периода из days последних дней, включая сегодня, в часовом поясе tz."""
+    return (datetime.now(UTC).astimezone(tz).date() - timedelta(days=days - 1)).isoformat()
+
+
+def select_reminder_audience(
+    records_table: str,
+    tz: BaseTzInfo,
+    bucket: int = 0,
+    buckets: int = 1,
+    reminder_time: str | None = None,
+) -> list[int]:
+    """Пользователи без записей в records_table за сегодня.
+
+    Один запрос: антиджойн по индексу (user_id, record_date) соответствующей таблицы.
+    При buckets > 1 выбирается только доля аудитории с user_id % buckets == bucket.
+    Если передан reminder_time, выбираются пользователи с этим персональным временем
+    напоминания о весе, иначе пользователи с персональным временем исключаются
+    (только если персональное время включено: иначе отдельной рассылки для них нет).
+    """
+    if records_table not in REMINDER_RECORD_TABLES:
+        error_msg = f"Неизвестная таблица записей: {records_table}"
+        raise ValueError(error_msg)
+
+    day_start, day_end = local_day_bounds_utc(tz)
+
+    conditions = ["u.is_active = 1"]
+    params: list[str | int] = []
+    if reminder_time is not None:
+        conditions.append("u.weight_reminder_time = ?")
+        params.append(reminder_time)
+    else:
+        if records_table == "weight_records" and settings.reminder_custom_time_enabled:
+            conditions.append("u.weight_reminder_time IS NULL")
+        if buckets > 1:
+            conditions.append("u.id % ? = ?")
+            params.extend((buckets, bucket))
+    where = "".join(f" AND {condition}" for condition in conditions)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f"""
+        SELECT u.id
+        FROM users u
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {records_table} r
+            WHERE r.user_id = u.id
+              AND r.record_date >= ?
+              AND r.record_date < ?
+        ){where}
+    """, (day_start, day_end, *params))  # noqa: S608
+    users = [row[0] for row in cursor.fetchall()]
+
+    conn.close()
+    return users
+
+
+def set_weight_reminder_time(user_id: int, reminder_time: str | None) -> bool:
+    """Установка персонального времени напоминания о весе. Возвращает False, если пользователь не найден."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("UPDATE users SET weight_reminder_time = ? WHERE id = ?", (reminder_time, user_id))
+    updated = cursor.rowcount > 0
+
+    conn.commit()
+    conn.close()
+    return updated
+
+
+def mark_users_inactive(user_ids: list[int]) -> None:
+    """Пометка пользователей как недоступных для рассылок."""
+    if not user_ids:
+        return
+
+    inactive_since = datetime.now(UTC).strftime(RECORD_DATE_FORMAT)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        "UPDATE users SET is_active = 0, inactive_since = ? WHERE id = ? AND is_active = 1",
+        [(inactive_since, user_id) for user_id in user_ids],
+    )
+
+    conn.commit()
+    conn.close()
+
+
+def reactivate_user(user_id: int) -> bool:
+    """Возврат пользователя в рассылки. Возвращает True, если пользователь был неактивен."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "UPDATE users SET is_active = 1, inactive_since = NULL WHERE id = ? AND is_active = 0",
+        (user_id,),
+    )
+    reactivated = cursor.rowcount > 0
+
+    conn.commit()
+    conn.close()
+    return reactivated
+
+
+def select_inactive_user_ids() -> set[int]:
+    """ID всех пользователей, помеченных недоступными."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id FROM users WHERE is_active = 0")
+    user_ids = {row[0] for row in cursor.fetchall()}
+
+    conn.close()
+    return user_ids
+
+
+@dataclass
+class UserProgress:
+    """Снимок прогресса пользователя (таблица user_progress)."""
+
+    user_id: int
+    current_weight: float
+    last_update: str
+    lost_weight: float  # сброшено кг от стартового веса, отрицательное значение - набрано
+    target_point: float
+    current_point: float
+
+
+def select_progress_constants(cursor: sqlite3.Cursor, user_id: int) -> ProgressConstants | None:
+    """Константы прогресса пользователя, сохраненные при регистрации.
+
+    Если они посчитаны по другой версии формулы, пересчитываются и сохраняются
+    в транзакции вызывающего. Возвращает None, если не заполнены стартовый и целевой вес.
+    """
+    cursor.execute("""
+        SELECT start_weight, target_weight, height, initial_bmi, target_bmi, weight_factor, target_point, formula_version
+        FROM users WHERE id = ?
+    """, (user_id,))
+    row = cursor.fetchone()
+    if row is None or row[0] is None or row[1] is None:
+        return None
+
+    start_weight, target_weight, height, *stored, formula_version = row
+    height = height or DEFAULT_HEIGHT
+    if formula_version == FORMULA_VERSION:
+        return ProgressConstants.from_stored(start_weight, height, tuple(stored))
+
+    constants = calculate_progress_constants(start_weight, height, target_weight)
+    cursor.execute("""
+        UPDATE users SET initial_bmi = ?, target_bmi = ?, weight_factor = ?, target_point = ?, formula_version = ?
+        WHERE id = ?
+    """, (*progress_constants_values(constants), user_id))
+    return constants
+
+
+def save_user_progress(cursor: sqlite3.Cursor, user_id: int, weight: float, record_date: str) -> UserProgress | None:
+    """Пересчет снимка прогресса по записи веса в транзакции вызывающего.
+
+    Снимок обновляется, только если запись не старше уже учтенной.
+    Возвращает записанный снимок или None, если у пользователя не заполнены
+    стартовый и целевой вес либо снимок уже построен по более поздней записи.
+    """
+    constants = select_progress_constants(cursor, user_id)
+    if constants is None:
+        return None
+
+    progress = UserProgress(
+        user_id=user_id,
+        current_weight=weight,
+        last_update=record_date,
+        lost_weight=constants.start_weight - weight,
+        target_point=constants.target_point,
+        current_point=calculate_point(constants, weight),
+    )
+
+    cursor.execute("""
+        INSERT INTO user_progress (
+            user_id, current_weight, last_update, lost_weight, target_point, current_point, version
+        )
+        VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM user_progress))
+        ON CONFLICT (user_id) DO UPDATE SET
+            current_weight = excluded.current_weight,
+            last_update = excluded.last_update,
+            lost_weight = excluded.lost_weight,
+            target_point = excluded.target_point,
+            current_point = excluded.current_point,
+            version = excluded.version
+        WHERE excluded.last_update >= user_progress.last_update
+    """, (
+        progress.user_id,
+        progress.current_weight,
+        progress.last_update,
+        progress.lost_weight,
+        progress.target_point,
+        progress.current_point,
+    ))
+    # Условие ON CONFLICT ... WHERE не пропустило обновление: снимок новее записи
+    if cursor.rowcount == 0:
+        return None
+    return progress
+
+
+def refresh_user_progress(cursor: sqlite3.Cursor, user_id: int) -> None:
+    """Пересчет снимка прогресса после изменения профиля (стартового или целевого веса, роста)."""
+    cursor.execute("SELECT current_weight, last_update FROM user_progress WHERE user_id = ?", (user_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        save_user_progress(cursor, user_id, row[0], row[1])
+
+
+def select_progress_changes(cursor: sqlite3.Cursor, since_version: int = -1) -> list[tuple[int, float, float, float, int]]:
+    """Снимки прогресса, измененные после since_version (по умолчанию все).
+
+    Строки: ID пользователя, очки, целевые очки, сброшено кг, версия.
+    """
+    cursor.execute("""
+        SELECT user_id, current_point, target_point, lost_weight, version
+        FROM user_progress
+        WHERE version > ?
+    """, (since_version,))
+    return cursor.fetchall()
+
+
+def select_usernames(user_ids: list[int]) -> dict[int, str]:
+    """Имена пользователей по списку ID."""
+    if not user_ids:
+        return {}
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    placeholders = ", ".join("?" * len(user_ids))
+    cursor.execute(f"SELECT id, username FROM users WHERE id IN ({placeholders})", user_ids)  # noqa: S608
+    rows = cursor.fetchall()
+
+    conn.close()
+    return dict(rows)
+
+
+def select_registered_user_ids() -> set[int]:
+    """ID всех зарегистрированных пользователей."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id FROM users")
+    user_ids = {row[0] for row in cursor.fetchall()}
+
+    conn.close()
+    return user_ids
+
+
+def select_activity_types() -> dict[str, tuple[int, float | None]]:
+    """Типы активности по имени: ID и калорий на единицу."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name, id, calories_per_unit FROM activity_types")
+    activity_types = {name: (activity_type_id, calories_per_unit) for name, activity_type_id, calories_per_unit in cursor}
+
+    conn.close()
+    return activity_types
+
+
+def insert_weight_record_if_new(cursor: sqlite3.Cursor, record: tuple[int, float, str]) -> bool:
+    """Запись веса (ID пользователя, вес, дата) в транзакции вызывающего.
+
+    Запись с теми же пользователем, датой и весом не дублируется.
+    Возвращает True, если запись добавлена.
+    """
+    user_id, weight, record_date = record
+    cursor.execute("""
+        INSERT INTO weight_records (user_id, weight, record_date)
+        SELECT :user_id, :weight, :record_date
+        WHERE NOT EXISTS (
+            SELECT 1 FROM weight_records
+            WHERE user_id = :user_id AND record_date = :record_date AND weight = :weight
+        )
+    """, {"user_id": user_id, "weight": weight, "record_date": record_date})
+    return cursor.rowcount > 0
+
+
+def insert_activity_record_if_new(cursor: sqlite3.Cursor, record: tuple[int, int, float, float | None, str]) -> int | None:
+    """Запись активности (ID пользователя, ID типа, значение, калории, дата) в транзакции вызывающего.
+
+    Запись с теми же пользователем, типом, датой и значением не дублируется.
+    Возвращает ID добавленной записи или None.
+    """
+    user_id, activity_type_id, value, calories, record_date = record
+    cursor.execute("""
+        INSERT INTO activity_records (user_id, activity_type_id, value, calories, record_date)
+        SELECT :user_id, :activity_type_id, :value, :calories, :record_date
+        WHERE NOT EXISTS (
+            -- Индекс по типу активности почти не отсекает строк, поиск идет по пользователю и дате
+            SELECT 1 FROM activity_records INDEXED BY idx_activity_records_user_date
+            WHERE user_id = :user_id AND record_date = :record_date
+              AND activity_type_id = :activity_type_id AND value = :value
+        )
+    """, {
+        "user_id": user_id,
+        "activity_type_id": activity_type_id,
+        "value": value,
+        "calories": calories,
+        "record_date": record_date,
+    })
+    return cursor.lastrowid if cursor.rowcount > 0 else None
+
+
+def select_weight_chart_state(user_id: int) -> tuple[int, float | None, float | None] | None:
+    """ID последней записи веса, стартовый и целевой вес пользователя (версия графика веса).
+
+    Возвращает None, если записей веса нет.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT MAX(w.id), u.start_weight, u.target_weight
+        FROM users u
+        LEFT JOIN weight_records w ON w.user_id = u.id
+        WHERE u.id = ?
+    """, (user_id,))
+    row = cursor.fetchone()
+
+    conn.close()
+    if not row or row[0] is None:
+        return None
+    return tuple(row)
+
+
+def select_weight_goals(user_id: int) -> tuple[float, float] | None:
+    """Стартовый и целевой вес пользователя."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT start_weight, target_weight FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+
+    conn.close()
+    return tuple(row) if row else None
+
+
+def select_weight_history(user_id: int) -> list[tuple[int, str, float]]:
+    """Записи веса пользователя по датам: ID, дата записи (UTC), вес."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "SELECT id, record_date, weight FROM weight_records WHERE user_id = ? ORDER BY record_date, id", (user_id,),
+    )
+    records = cursor.fetchall()
+
+    conn.close()
+    return records
+
+
+def select_last_weight_record_id() -> int:
+    """ID последней записи веса (0, если записей нет)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM weight_records")
+    record_id = cursor.fetchone()[0]
+
+    conn.close()
+    return record_id
+
+
+def select_weight_records_after(record_id: int) -> list[tuple[int, int, str, float]]:
+    """Записи веса с ID больше record_id в порядке ID: ID, пользователь, дата записи (UTC), вес."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id, user_id, record_date, weight FROM weight_records WHERE id > ? ORDER BY id", (record_id,))
+    records = cursor.fetchall()
+
+    conn.close()
+    return records
+
+
+def save_activity_summary(cursor: sqlite3.Cursor, record_id: int, day: str) -> None:
+    """Учет записи активности record_id в дневных итогах за day в транзакции вызывающего."""
+    cursor.execute("""
+        INSERT INTO activity_daily_summary (user_id, activity_type_id, day, records_count, total_value, total_calories)
+        SELECT user_id, activity_type_id, ?, 1, value, COALESCE(calories, 0)
+        FROM activity_records
+        WHERE id = ?
+        ON CONFLICT (user_id, activity_type_id, day) DO UPDATE SET
+            records_count = records_count + 1,
+            total_value = total_value + excluded.total_value,
+            total_calories = total_calories + excluded.total_calories
+    """, (day, record_id))
+
+
+def select_activity_summary(user_id: int, tz: BaseTzInfo, days: int) -> list[tuple[str, str, str, int, float, float]]:
+    """Дневные итоги активности пользователя за последние days дней.
+
+    Строки: описание и единица типа активности, дата, число записей, сумма значений, калории.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT at.description, at.unit, s.day, s.records_count, s.total_value, s.total_calories
+        FROM activity_daily_summary s
+        JOIN activity_types at ON at.id = s.activity_type_id
+        WHERE s.user_id = ? AND s.day >= ?
+        ORDER BY at.id, s.day
+    """, (user_id, local_window_start(tz, days)))
+    rows = cursor.fetchall()
+
+    conn.close()
+    return rows
+
+
+def select_activity_chart_version(user_id: int, tz: BaseTzInfo, days: int) -> str | None:
+    """Версия данных графика шагов за days дней: начало периода, число записей и сумма шагов.
+
+    Возвращает None, если записей нет.
+    """
+    window_start = local_window_start(tz, days)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT SUM(s.records_count), TOTAL(s.total_value)
+        FROM activity_daily_summary s
+        JOIN activity_types at ON at.id = s.activity_type_id
+        WHERE s.user_id = ? AND at.name = 'walking' AND s.day >= ?
+    """, (user_id, window_start))
+    count, total = cursor.fetchone()
+
+    conn.close()
+    if not count:
+        return None
+    return f"{window_start}-{count}-{total}"
+
+
+def select_activity_chart_data(user_id: int, tz: BaseTzInfo, days: int) -> list[tuple[str, float]]:
+    """Шаги пользователя по дням (в часовом поясе tz) за последние days дней."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT s.day, s.total_value
+        FROM activity_daily_summary s
+        JOIN activity_types at ON at.id = s.activity_type_id
+        WHERE s.user_id = ? AND at.name = 'walking' AND s.day >= ?
+        ORDER BY s.day
+    """, (user_id, local_window_start(tz, days)))
+    rows = cursor.fetchall()
+
+    conn.close()
+    return rows
+
+
+def select_comparison_chart_data() -> list[tuple[str, float, float, float, str, int]]:
+    """Снимки прогресса всех участников для сравнительного графика, по убыванию очков.
+
+    Строки: имя, очки, целевые очки, сброшено кг, дата последней записи, активен ли участник.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT u.username, p.current_point, p.target_point, p.lost_weight, p.last_update, u.is_active
+        FROM user_progress p
+        JOIN users u ON u.id = p.user_id
+        ORDER BY p.current_point DESC, u.id
+    """)
+    rows = cursor.fetchall()
+
+    conn.close()
+    return rows
+
+
+def select_chart_file_id(user_id: int, chart_type: str, cache_key: str) -> str | None:
+    """file_id Telegram графика, загруженного для этой версии данных."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "SELECT file_id FROM chart_files WHERE user_id = ? AND chart_type = ? AND cache_key = ?",
+        (user_id, chart_type, cache_key),
+    )
+    row = cursor.fetchone()
+
+    conn.close()
+    return row[0] if row else None
+
+
+def save_chart_file_id(user_id: int, chart_type: str, cache_key: str, file_id: str) -> None:
+    """Запоминание file_id графика (хранится только для последней версии данных)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        INSERT INTO chart_files (user_id, chart_type, cache_key, file_id)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, chart_type) DO UPDATE SET
+            cache_key = excluded.cache_key,
+            file_id = excluded.file_id
+    """, (user_id, chart_type, cache_key, file_id))
+
+    conn.commit()
+    conn.close()
@@ -1,16 +1,34 @@
 from aiogram import Router
+from middlewares.metrics import setup_router_metrics
 
 
 def setup_handlers(dp: Router) -> None:
     """Функция для регистрации всех обработчиков."""
-    from . import daily_polls, notifications, registration  # noqa: PLC0415
+    from . import admin, charts, daily_polls, leaderboard, notifications, progress, registration  # noqa: PLC0415
 
     # Создание роутеров
+    admin_router = admin.router
     registration_router = registration.router
     daily_polls_router = daily_polls.router
     notifications_router = notifications.router
+    progress_router = progress.router
+    charts_router = charts.router
+    leaderboard_router = leaderboard.router
 
-    # Включение роутеров в диспетчер
+    # Включение роутеров в диспетчер (роутер администратора первым, чтобы файлы не перехватывали состояния диалогов)
+    dp.include_router(admin_router)
     dp.include_router(registration_router)
     dp.include_router(daily_polls_router)
     dp.include_router(notifications_router)
+    dp.include_router(progress_router)
+    dp.include_router(charts_router)
+    dp.include_router(leaderboard_router)
+
+    # Замер времени обработчиков по роутерам
+    setup_router_metrics(admin_router, "admin")
+    setup_router_metrics(registration_router, "registration")
+    setup_router_metrics(daily_polls_router, "daily_polls")
+    setup_router_metrics(notifications_router, "notifications")
+    setup_router_metrics(progress_router, "progress")
+    setup_router_metrics(charts_router, "charts")
+    setup_router_metrics(leaderboard_router, "leaderboard")
@@ -0,0 +1,108 @@
+# bot/handlers/admin.py
+
+import logging
+import time
+from functools import partial
+
+import utils.messages as msg
+from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from settings import settings
+from utils.csv_import import ImportStats, import_csv
+from utils.jobs import QUEUE_IMPORT, QueueFullError, job_manager
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Максимальный размер файла, который бот может скачать через Bot API
+IMPORT_MAX_FILE_SIZE_MB = 20
+
+# Число последних задач в ответе /jobs
+JOBS_RECENT_LIMIT = 10
+
+
+def is_admin(user_id: int) -> bool:
+    return settings.admin_id is not None and str(user_id) == settings.admin_id.strip()
+
+
+# Команды роутера доступны только администратору
+router.message.filter(F.from_user.id.func(is_admin))
+
+
+@router.message(Command("import"))
+async def cmd_import(message: Message) -> SendMessage:
+    """Обработка команды /import - описание формата файла для импорта."""
+    return message.answer(msg.IMPORT_USAGE)
+
+
+@router.message(Command("jobs"))
+async def cmd_jobs(message: Message) -> SendMessage:
+    """Обработка команды /jobs - состояние очередей фоновых задач."""
+    lines = [msg.JOBS_QUEUES_HEADER]
+    lines.extend(
+        msg.JOBS_QUEUE_SSSS.format(name, waiting, max_size, running)
+        for name, waiting, running, max_size in job_manager.queues()
+    )
+    recent = job_manager.recent(JOBS_RECENT_LIMIT)
+    if recent:
+        lines.append(msg.JOBS_RECENT_HEADER)
+        lines.extend(msg.JOBS_RECENT_SSSS.format(job.id, job.name, job.queue, job.status) for job in recent)
+    else:
+        lines.append(msg.JOBS_EMPTY)
+    return message.answer("\n".join(lines))
+
+
+@router.message(F.document)
+async def process_import_file(message: Message) -> SendMessage:
+    """Постановка импорта истории веса и активности из присланного CSV-файла в очередь."""
+    document = message.document
+    if not (document.file_name or "").lower().endswith(".csv"):
+        return message.answer(msg.IMPORT_NOT_CSV)
+    if (document.file_size or 0) > IMPORT_MAX_FILE_SIZE_MB * 1024 * 1024:
+        return message.answer(msg.IMPORT_FILE_TOO_LARGE_S.format(IMPORT_MAX_FILE_SIZE_MB))
+
+    try:
+        job_manager.submit(QUEUE_IMPORT, f"import:{document.file_name}", partial(run_import, message))
+    except QueueFullError:
+        return message.answer(msg.JOB_QUEUE_FULL)
+    return message.answer(msg.IMPORT_QUEUED)
+
+
+async def run_import(message: Message) -> None:
+    """Импорт CSV-файла из сообщения (фоновая задача), прогресс и итог - в статусном сообщении."""
+    document = message.document
+    status = await message.answer(msg.IMPORT_STARTED)
+    started_at = time.monotonic()
+    reported_at = started_at
+
+    async def report_progress(stats: ImportStats) -> None:
+        nonlocal reported_at
+        now = time.monotonic()
+        if now - reported_at < settings.import_progress_interval:
+            return
+        reported_at = now
+        try:
+            await status.edit_text(
+                msg.IMPORT_PROGRESS_SSSS.format(stats.rows, stats.weights, stats.activities, stats.error_count),
+            )
+        except TelegramBadRequest as e:
+            logger.debug("Не удалось обновить прогресс импорта: %s", e)
+
+    logger.info("Импорт CSV %s (%s байт) от администратора", document.file_name, document.file_size)
+    try:
+        source = await message.bot.download(document)
+        stats = await import_csv(source, report_progress)
+    except ValueError as e:
+        await status.edit_text(msg.IMPORT_FAILED_S.format(e))
+        return
+
+    text = msg.IMPORT_DONE_SSSSS.format(
+        time.monotonic() - started_at, stats.rows, stats.weights, stats.activities, stats.duplicates,
+    )
+    if stats.error_count:
+        text += msg.IMPORT_ERRORS_SS.format(stats.error_count, "\n".join(stats.errors))
+    await status.edit_text(text)
@@ -0,0 +1,80 @@
+# bot/handlers/charts.py
+
+import utils.messages as msg
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from utils.charts import (
+    CHART_ACTIVITY,
+    CHART_WEIGHT,
+    COMPARISON_ACTIVE,
+    COMPARISON_ALL,
+    COMPARISON_TOP,
+    chart_service,
+)
+from utils.jobs import PRIORITY_LOW, QUEUE_CHARTS, submit_or_reject
+
+router = Router()
+
+# Число участников в варианте /comparison top по умолчанию и максимальное
+COMPARISON_TOP_DEFAULT = 10
+COMPARISON_TOP_MAX = 30
+
+
+def submit_chart(message: Message, kind: str, caption: str, no_data: str) -> SendMessage | None:
+    """Постановка индивидуального графика в очередь; график отправляет задача."""
+    user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
+
+    async def send_chart() -> None:
+        if not await chart_service.send(message, user_id, kind, caption):
+            await message.answer(no_data)
+
+    return submit_or_reject(message, QUEUE_CHARTS, f"chart:{kind}", send_chart)
+
+
+@router.message(Command("chart"))
+async def cmd_chart(message: Message) -> SendMessage | None:
+    """Обработка команды /chart - индивидуальный график прогресса веса."""
+    return submit_chart(message, CHART_WEIGHT, msg.CHART_CAPTION, msg.CHART_NO_DATA)
+
+
+@router.message(Command("activity_chart"))
+async def cmd_activity_chart(message: Message) -> SendMessage | None:
+    """Обработка команды /activity_chart - график шагов за последние 30 дней."""
+    return submit_chart(message, CHART_ACTIVITY, msg.ACTIVITY_CHART_CAPTION, msg.ACTIVITY_CHART_NO_DATA)
+
+
+def parse_comparison_args(args: str | None) -> tuple[str, int] | None:
+    """Вариант сравнительного графика из аргументов команды: (вид, N для топа) или None."""
+    kind, *rest = (args or "").lower().split() or [COMPARISON_ALL]
+    if kind in {COMPARISON_ALL, COMPARISON_ACTIVE} and not rest:
+        return kind, 0
+    if kind == COMPARISON_TOP and not rest:
+        return kind, COMPARISON_TOP_DEFAULT
+    if kind == COMPARISON_TOP and len(rest) == 1 and rest[0].isdigit() and 1 <= int(rest[0]) <= COMPARISON_TOP_MAX:
+        return kind, int(rest[0])
+    return None
+
+
+@router.message(Command("comparison"))
+async def cmd_comparison(message: Message, command: CommandObject) -> SendMessage | None:
+    """Обработка команды /comparison [top N | active] - сравнительный график участников."""
+    variant = parse_comparison_args(command.args)
+    if variant is None:
+        return message.answer(msg.COMPARISON_CHART_USAGE_S.format(COMPARISON_TOP_MAX))
+
+    kind, top = variant
+    if kind == COMPARISON_TOP:
+        caption = msg.COMPARISON_CHART_TOP_CAPTION_S.format(top)
+    elif kind == COMPARISON_ACTIVE:
+        caption = msg.COMPARISON_CHART_ACTIVE_CAPTION
+    else:
+        caption = msg.COMPARISON_CHART_CAPTION
+
+    async def send_comparison() -> None:
+        if not await chart_service.send_comparison(message, kind, caption, top):
+            await message.answer(msg.COMPARISON_CHART_NO_DATA)
+
+    # Общий график строится по всем участникам, личные графики в очереди идут раньше
+    return submit_or_reject(message, QUEUE_CHARTS, f"comparison:{kind}", send_comparison, PRIORITY_LOW)
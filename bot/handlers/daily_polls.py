@@ -1,19 +1,40 @@
 import logging
-import sqlite3
 from datetime import UTC, datetime
 
+import pytz
 import utils.messages as msg
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.methods import SendMessage
 from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup
-from database.models import DATABASE_PATH
+from database.models import get_connection
+from database.queries import RECORD_DATE_FORMAT, record_local_day, save_activity_summary, save_user_progress
+from settings import settings
+from utils.leaderboard import leaderboard
+from utils.validation import (
+    ACTIVITY_MAX_VALUES,
+    WEIGHT_MAX_VALUE,
+    WEIGHT_MIN_VALUE,
+    is_valid_activity_value,
+    is_valid_weight,
+    parse_number,
+)
+from utils.weight_history import weight_history
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Сообщения о выходе значения активности за диапазон по типам
+ACTIVITY_RANGE_MESSAGES = {
+    "walking": msg.INVALID_STEPS_RANGE_SS,
+    "running": msg.INVALID_RUNNING_RANGE_SS,
+    "cycling": msg.INVALID_CYCLING_RANGE_SS,
+    "cardio": msg.INVALID_CARDIO_RANGE_SS,
+}
+
 
 # Состояния для FSM
 class ActivityStates(StatesGroup):
@@ -26,134 +47,114 @@ class WeightStates(StatesGroup):
 
 
 @router.message(Command("weight"))
-async def cmd_weight(message: Message, state: FSMContext) -> None:
+async def cmd_weight(message: Message, state: FSMContext) -> SendMessage:
     """Обработка команды /weight - ввод текущего веса."""
     user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
 
     # Проверяем, зарегистрирован ли пользователь
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
     user_exists = cursor.fetchone()
 
     if not user_exists:
-        await message.answer(msg.NOT_REGISTERED)
         conn.close()
-        return
+        return message.answer(msg.NOT_REGISTERED)
 
     conn.close()
 
     # Устанавливаем состояние ожидания ввода веса
     await state.set_state(WeightStates.waiting_for_weight)
-    await message.answer(msg.WEIGHT_INPUT_REQUEST)
+    return message.answer(msg.WEIGHT_INPUT_REQUEST)
 
 
 @router.message(WeightStates.waiting_for_weight, F.text.func(lambda x: x.replace(",", ".", 1).replace(".", "", 1).isdigit()))
-async def process_weight_input(message: Message, state: FSMContext) -> None:
+async def process_weight_input(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода веса."""
     user_id_debug = message.from_user.id if message.from_user and message.from_user.id is not None else "unknown"
     logger.debug(msg.LOG_RECEIVED_NUMERIC_MESSAGE_SS, message.text, user_id_debug)
 
     try:
         # Заменяем запятую на точку для корректного преобразования
-        weight = float(message.text.replace(",", ".")) if message.text is not None else 0.0
+        weight = parse_number(message.text) if message.text is not None else 0.0
         user_id_debug = message.from_user.id if message.from_user and message.from_user.id is not None else "unknown"
         logger.debug(msg.LOG_DETECTED_WEIGHT_SS, weight, user_id_debug)
 
-        # Используем константы вместо магических чисел
-        min_weight = 30
-        max_weight = 300
-
-        if weight < min_weight or weight > max_weight:
+        if not is_valid_weight(weight):
             user_id_debug = message.from_user.id if message.from_user and message.from_user.id is not None else "unknown"
             logger.debug(msg.LOG_WEIGHT_OUT_OF_RANGE_SS, weight, user_id_debug)
-            await message.answer(msg.INVALID_WEIGHT_RANGE_SS.format(min_weight, max_weight))
-            return
+            return message.answer(msg.INVALID_WEIGHT_RANGE_SS.format(WEIGHT_MIN_VALUE, WEIGHT_MAX_VALUE))
 
         user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
 
         # Сохраняем вес в базу
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = get_connection()
         cursor = conn.cursor()
 
+        record_date = datetime.now(UTC).strftime(RECORD_DATE_FORMAT)
         cursor.execute("""
             INSERT INTO weight_records (user_id, weight, record_date)
             VALUES (?, ?, ?)
-        """, (user_id, weight, datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")))
+        """, (user_id, weight, record_date))
+        record_id = cursor.lastrowid
 
-        # Получаем данные пользователя для расчета прогресса
-        cursor.execute("""
-            SELECT start_weight, target_weight, height
-            FROM users
-            WHERE id = ?
-        """, (user_id,))
+        # Обновляем снимок прогресса в той же транзакции
+        progress = save_user_progress(cursor, user_id, weight, record_date)
 
         conn.commit()
         conn.close()
         logger.debug(msg.LOG_WEIGHT_SAVED_SS, weight, user_id)
 
-        # Рассчитываем изменение веса
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT start_weight
-            FROM users
-            WHERE id = ?
-        """, (user_id,))
+        # Дописываем вес в историю пользователя в памяти
+        weight_history.append(user_id, record_id, record_date, weight)
 
-        start_weight_result = cursor.fetchone()
-        conn.close()
+        # Сбрасываем состояние после успешного ввода веса
+        await state.clear()
 
-        if start_weight_result:
-            start_weight = start_weight_result[0]
-            weight_change = start_weight - weight
+        # None - снимок не изменился: нет стартового и целевого веса или учтена более поздняя запись
+        if progress:
+            # Перемещение участника в таблице лидеров
+            leaderboard.update(progress)
+            weight_change = progress.lost_weight
 
             if weight_change > 0:
-                await message.answer(msg.WEIGHT_LOST_SS.format(weight, abs(weight_change)))
-            elif weight_change < 0:
-                await message.answer(msg.WEIGHT_GAINED_SS.format(weight, abs(weight_change)))
-            else:
-                await message.answer(msg.WEIGHT_UNCHANGED_S.format(weight))
-        else:
-            await message.answer(msg.WEIGHT_SAVED_S.format(weight))
-
-        # Сбрасываем состояние после успешного ввода веса
-        await state.clear()
+                return message.answer(msg.WEIGHT_LOST_SS.format(weight, abs(weight_change)))
+            if weight_change < 0:
+                return message.answer(msg.WEIGHT_GAINED_SS.format(weight, abs(weight_change)))
+            return message.answer(msg.WEIGHT_UNCHANGED_S.format(weight))
+        return message.answer(msg.WEIGHT_SAVED_S.format(weight))
 
     except ValueError:
         # Если текст не является числом, не обрабатываем как вес
         logger.debug("Сообщение '%s' не является числом, пропускаем обработку", message.text)
         # Не сбрасываем состояние, даём пользователю возможность повторить ввод
-        await message.answer(msg.INVALID_WEIGHT_INPUT)
+        return message.answer(msg.INVALID_WEIGHT_INPUT)
 
 
 @router.message(Command("activity"))
-async def cmd_activity(message: Message) -> None:
+async def cmd_activity(message: Message) -> SendMessage:
     """Обработка команды /activity - ввод активности."""
     user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
 
     # Проверяем, зарегистрирован ли пользователь
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
     user_exists = cursor.fetchone()
 
     if not user_exists:
-        await message.answer(msg.NOT_REGISTERED)
         conn.close()
-        return
+        return message.answer(msg.NOT_REGISTERED)
 
     # Получаем доступные типы активности
     cursor.execute("SELECT id, name, description FROM activity_types")
     activities = cursor.fetchall()
 
     if not activities:
-        await message.answer(msg.NO_ACTIVITIES_AVAILABLE)
         conn.close()
-        return
+        return message.answer(msg.NO_ACTIVITIES_AVAILABLE)
 
     # Создаем клавиатуру с типами активности
     keyboard = []
@@ -168,27 +169,27 @@ async def cmd_activity(message: Message) -> None:
         keyboard.append(row)
 
     reply_markup = ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
-    await message.answer(msg.ACTIVITY_SELECTION_PROMPT, reply_markup=reply_markup)
 
     conn.close()
 
+    return message.answer(msg.ACTIVITY_SELECTION_PROMPT, reply_markup=reply_markup)
+
 
 @router.message(ActivityStates.waiting_for_activity_type)
-async def process_activity_type_selection(message: Message, state: FSMContext) -> None:
+async def process_activity_type_selection(message: Message, state: FSMContext) -> SendMessage:
     """Обработка выбора типа активности."""
     activity_description = message.text
 
     # Получаем ID типа активности по описанию
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("SELECT id, name, unit FROM activity_types WHERE description = ?", (activity_description,))
     result = cursor.fetchone()
 
     if not result:
-        await message.answer(msg.INVALID_ACTIVITY_SELECTION)
         conn.close()
-        return
+        return message.answer(msg.INVALID_ACTIVITY_SELECTION)
 
     activity_id, activity_name, unit = result
 
@@ -197,22 +198,22 @@ async def process_activity_type_selection(message: Message, state: FSMContext) -
 
     conn.close()
 
-    # Запрашиваем значение активности
-    await message.answer(msg.ACTIVITY_VALUE_REQUEST_SS.format(activity_description, unit))
-
     # Переходим к следующему состоянию
     await state.set_state(ActivityStates.waiting_for_value)
 
+    # Запрашиваем значение активности
+    return message.answer(msg.ACTIVITY_VALUE_REQUEST_SS.format(activity_description, unit))
+
 
 @router.message(ActivityStates.waiting_for_value)
-async def process_activity_value(message: Message, state: FSMContext) -> None:
+async def process_activity_value(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода значения активности."""
     user_id_debug = message.from_user.id if message.from_user and message.from_user.id is not None else "unknown"
     logger.debug(msg.LOG_RECEIVED_ACTIVITY_VALUE_SS, message.text, user_id_debug)
 
     try:
         # Заменяем запятую на точку для корректного преобразования
-        value = float(message.text.replace(",", ".")) if message.text is not None else 0.0
+        value = parse_number(message.text) if message.text is not None else 0.0
         user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
 
         # Получаем сохраненные данные
@@ -225,30 +226,12 @@ async def process_activity_value(message: Message, state: FSMContext) -> None:
                     user_id, activity_name, value, unit)
 
         # Проверяем диапазон значений в зависимости от типа активности
-        max_steps = 50000
-        max_running_minutes = 300  # до 5 часов
-        max_cycling_km = 200  # до 200 км
-        max_cardio_kcal = 2000  # до 2000 ккал
-
-        if activity_name == "walking" and (value < 0 or value > max_steps):
-            logger.debug("Значение %s вне диапазона для ходьбы", value)
-            await message.answer(msg.INVALID_STEPS_RANGE_SS.format(0, max_steps))
-            return
-        if activity_name == "running" and (value < 0 or value > max_running_minutes):  # до 5 часов
-            logger.debug("Значение %s вне диапазона для бега", value)
-            await message.answer(msg.INVALID_RUNNING_RANGE_SS.format(0, max_running_minutes))
-            return
-        if activity_name == "cycling" and (value < 0 or value > max_cycling_km):  # до 200 км
-            logger.debug("Значение %s вне диапазона для велосипеда", value)
-            await message.answer(msg.INVALID_CYCLING_RANGE_SS.format(0, max_cycling_km))
-            return
-        if activity_name == "cardio" and (value < 0 or value > max_cardio_kcal):  # до 2000 ккал
-            logger.debug("Значение %s вне диапазона для кардио", value)
-            await message.answer(msg.INVALID_CARDIO_RANGE_SS.format(0, max_cardio_kcal))
-            return
+        if not is_valid_activity_value(activity_name, value):
+            logger.debug("Значение %s вне диапазона для активности %s", value, activity_name)
+            return message.answer(ACTIVITY_RANGE_MESSAGES[activity_name].format(0, ACTIVITY_MAX_VALUES[activity_name]))
 
         # Сохраняем активность в базу
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = get_connection()
         cursor = conn.cursor()
 
         # Получаем коэффициент для расчета калорий
@@ -262,33 +245,37 @@ async def process_activity_value(message: Message, state: FSMContext) -> None:
         logger.debug("Сохраняем активность в базу: пользователь %s, тип %s, значение %s, калории %s",
                     user_id, activity_type_id, value, calories)
 
+        record_date = datetime.now(UTC).strftime(RECORD_DATE_FORMAT)
         cursor.execute("""
             INSERT INTO activity_records (user_id, activity_type_id, value, calories, record_date)
             VALUES (?, ?, ?, ?, ?)
-        """, (user_id, activity_type_id, value, calories, datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")))
+        """, (user_id, activity_type_id, value, calories, record_date))
+
+        # Обновляем дневные итоги в той же транзакции
+        tz = pytz.timezone(settings.notification_timezone)
+        save_activity_summary(cursor, cursor.lastrowid, record_local_day(record_date, tz))
 
         conn.commit()
         conn.close()
 
-        # Отправляем подтверждение
-        if calories:
-            await message.answer(msg.ACTIVITY_SAVED_WITH_CALORIES_SSSS.format(activity_name, value, unit, calories))
-        else:
-            await message.answer(msg.ACTIVITY_SAVED_SSSS.format(activity_name, value, unit, 0))
-
         logger.debug(msg.LOG_ACTIVITY_SAVED_SS, activity_name, user_id)
 
         # Сбрасываем состояние
         await state.clear()
 
+        # Отправляем подтверждение
+        if calories:
+            return message.answer(msg.ACTIVITY_SAVED_WITH_CALORIES_SSSS.format(activity_name, value, unit, calories))
+        return message.answer(msg.ACTIVITY_SAVED_SSSS.format(activity_name, value, unit, 0))
+
     except ValueError:
         logger.debug("Значение '%s' не является числом для активности", message.text)
-        await message.answer(msg.INVALID_ACTIVITY_VALUE_INPUT)
         # Не сбрасываем состояние, даём пользователю возможность повторить ввод
+        return message.answer(msg.INVALID_ACTIVITY_VALUE_INPUT)
 
 
 @router.message(F.text.contains("Ходьба") | F.text.contains("Бег") | F.text.contains("Велосипед") | F.text.contains("Кардио"))
-async def quick_activity_selection(message: Message, state: FSMContext) -> None:
+async def quick_activity_selection(message: Message, state: FSMContext) -> SendMessage | None:
     """Быстрый выбор активности через клавиатуру. Работает в любой момент."""
     activity_text = message.text
     user_id = message.from_user.id if message.from_user else 0
@@ -313,7 +300,7 @@ async def quick_activity_selection(message: Message, state: FSMContext) -> None:
 
         logger.debug("Пользователь %s выбрал активность: %s (%s)", user_id, activity_name, activity_text)
 
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute("SELECT id FROM activity_types WHERE name = ?", (activity_name,))
@@ -328,11 +315,13 @@ async def quick_activity_selection(message: Message, state: FSMContext) -> None:
 
             conn.close()
 
-            # Запрашиваем значение активности
-            await message.answer(msg.ACTIVITY_VALUE_REQUEST_SS.format(activity_text, unit))
-
             # Переходим к следующему состоянию
             await state.set_state(ActivityStates.waiting_for_value)
-        else:
-            logger.error("Активность '%s' не найдена в базе данных", activity_name)
-            await message.answer(msg.ACTIVITY_SELECTION_ERROR)
+
+            # Запрашиваем значение активности
+            return message.answer(msg.ACTIVITY_VALUE_REQUEST_SS.format(activity_text, unit))
+
+        logger.error("Активность '%s' не найдена в базе данных", activity_name)
+        return message.answer(msg.ACTIVITY_SELECTION_ERROR)
+
+    return None
@@ -0,0 +1,38 @@
+# bot/handlers/leaderboard.py
+
+import utils.messages as msg
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from database.queries import select_usernames
+from settings import settings
+from utils.leaderboard import leaderboard
+
+router = Router()
+
+
+@router.message(Command("leaderboard"))
+async def cmd_leaderboard(message: Message) -> SendMessage:
+    """Обработка команды /leaderboard - топ участников по очкам и место пользователя."""
+    user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
+
+    top = leaderboard.top(settings.leaderboard_size)
+    if not top:
+        return message.answer(msg.LEADERBOARD_EMPTY)
+
+    usernames = select_usernames([entry.user_id for _, entry in top])
+    lines = [msg.LEADERBOARD_TITLE]
+    lines.extend(
+        msg.LEADERBOARD_ROW_SSSS.format(rank, usernames.get(entry.user_id, "?"), entry.current_point, -entry.lost_weight)
+        for rank, entry in top
+    )
+
+    own = leaderboard.rank(user_id)
+    if own is None:
+        lines.append(msg.LEADERBOARD_NOT_RANKED)
+    else:
+        rank, entry = own
+        lines.append(msg.LEADERBOARD_OWN_RANK_SSSS.format(rank, len(leaderboard), entry.current_point, entry.target_point))
+
+    return message.answer("\n".join(lines))
@@ -1,98 +1,154 @@
 # bot/handlers/notifications.py
 
-import logging
-import sqlite3
+from collections.abc import Awaitable, Callable
+from datetime import datetime, time, timedelta
 
 import pytz
 import utils.messages as msg
 from aiogram import Bot, Router
+from aiogram.filters import KICKED, MEMBER, ChatMemberUpdatedFilter, Command, CommandObject
+from aiogram.methods import SendMessage
+from aiogram.types import ChatMemberUpdated, Message
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from database.models import DATABASE_PATH
+from database.queries import select_reminder_audience, set_weight_reminder_time
+from middlewares.reactivation import inactive_users
 from settings import settings
+from utils.broadcast import Broadcaster
 
 # Создаем роутер для уведомлений
 router = Router()
 
+# Формат персонального времени напоминания
+REMINDER_TIME_FORMAT = "%H:%M"
+
+
+@router.message(Command("reminder"))
+async def cmd_reminder(message: Message, command: CommandObject) -> SendMessage:
+    """Обработка команды /reminder - персональное время напоминания о весе."""
+    if not settings.reminder_custom_time_enabled:
+        return message.answer(msg.REMINDER_TIME_DISABLED_S.format(settings.weight_notification_time))
+
+    user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
+    argument = (command.args or "").strip().lower()
+
+    if argument == "off":
+        reminder_time = None
+    else:
+        try:
+            reminder_time = datetime.strptime(argument, REMINDER_TIME_FORMAT).strftime(REMINDER_TIME_FORMAT)  # noqa: DTZ007
+        except ValueError:
+            return message.answer(msg.REMINDER_TIME_USAGE)
+
+    if not set_weight_reminder_time(user_id, reminder_time):
+        return message.answer(msg.NOT_REGISTERED)
+
+    if reminder_time is None:
+        return message.answer(msg.REMINDER_TIME_RESET_S.format(settings.weight_notification_time))
+    return message.answer(msg.REMINDER_TIME_SET_S.format(reminder_time))
+
+
+@router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=KICKED))
+async def on_bot_blocked(event: ChatMemberUpdated) -> None:
+    """Пользователь заблокировал бота - исключаем его из рассылок."""
+    inactive_users.mark_inactive([event.from_user.id])
+
+
+@router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=MEMBER))
+async def on_bot_unblocked(event: ChatMemberUpdated) -> None:
+    """Пользователь разблокировал бота - возвращаем его в рассылки."""
+    inactive_users.reactivate(event.from_user.id)
+
 
 class NotificationScheduler:
     def __init__(self) -> None:
-        self.bot = Bot(token=settings.bot_token)
+        # Бот передается при запуске, чтобы рассылки шли через общую HTTP-сессию процесса
+        self.bot: Bot | None = None
+        self.broadcaster: Broadcaster | None = None
         self.scheduler = AsyncIOScheduler()
-
-    def start_scheduler(self) -> None:
-        """Запуск планировщика уведомлений."""
-        # Используем московский часовой пояс
-        tz = pytz.timezone("Europe/Moscow")
-
-        # Разбор времени уведомлений из настроек
-        weight_hour, weight_minute = map(int, settings.weight_notification_time.split(":"))
-        activity_hour, activity_minute = map(int, settings.activity_notification_time.split(":"))
+        # Часовой пояс расписания и границ "сегодня" для отбора аудитории
+        self.tz = pytz.timezone(settings.notification_timezone)
+
+    def _add_reminder_jobs(
+        self,
+        func: Callable[..., Awaitable[None]],
+        job_id: str,
+        notification_time: str,
+        buckets: int,
+    ) -> None:
+        """Добавление задач рассылки: по одной на каждую минутную корзину аудитории."""
+        hour, minute = map(int, notification_time.split(":"))
+        base_time = datetime.combine(datetime.now(self.tz).date(), time(hour, minute))
+
+        for bucket in range(buckets):
+            run_at = base_time + timedelta(minutes=bucket * settings.reminder_bucket_interval)
+            self.scheduler.add_job(
+                func,
+                "cron",
+                hour=run_at.hour,
+                minute=run_at.minute,
+                timezone=self.tz,
+                id=job_id if buckets == 1 else f"{job_id}_{bucket}",
+                kwargs={"bucket": bucket, "buckets": buckets},
+            )
+
+    def start_scheduler(self, bot: Bot, spread_buckets: int | None = None) -> None:
+        """Запуск планировщика уведомлений.
+
+        :param bot: экземпляр бота, через который отправляются рассылки
+        :param spread_buckets: на сколько корзин разбить аудиторию каждой рассылки.
+            Корзина пользователя определяется как user_id % spread_buckets, корзины
+            отправляются с интервалом REMINDER_BUCKET_INTERVAL минут, что сглаживает
+            пик входящих ответов. По умолчанию берется из настроек.
+        """
+        self.bot = bot
+        self.broadcaster = Broadcaster(bot)
+        buckets = max(1, spread_buckets if spread_buckets is not None else settings.reminder_spread_buckets)
 
         # Добавляем задачи в планировщик
-        self.scheduler.add_job(
-            self.send_weight_reminders,
-            "cron",
-            hour=weight_hour,
-            minute=weight_minute,
-            timezone=tz,
-            id="weight_reminder",
+        self._add_reminder_jobs(
+            self.send_weight_reminders, "weight_reminder", settings.weight_notification_time, buckets,
         )
-
-        self.scheduler.add_job(
-            self.send_activity_reminders,
-            "cron",
-            hour=activity_hour,
-            minute=activity_minute,
-            timezone=tz,
-            id="activity_reminder",
+        self._add_reminder_jobs(
+            self.send_activity_reminders, "activity_reminder", settings.activity_notification_time, buckets,
         )
 
+        # Напоминания пользователям с персональным временем проверяются раз в минуту
+        if settings.reminder_custom_time_enabled:
+            self.scheduler.add_job(
+                self.send_custom_time_weight_reminders,
+                "cron",
+                minute="*",
+                timezone=self.tz,
+                id="weight_reminder_custom_time",
+            )
+
         # Запускаем планировщик
         self.scheduler.start()
 
-    async def send_weight_reminders(self) -> None:
-        """Отправка напоминаний о вводе веса."""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-
-        # Получаем всех пользователей
-        cursor.execute("SELECT id FROM users")
-        users = cursor.fetchall()
-
-        for user in users:
-            user_id = user[0]
-            try:
-                await self.bot.send_message(
-                    chat_id=user_id,
-                    text=msg.WEIGHT_REMINDER,
-                )
-            except Exception:
-                logger = logging.getLogger(__name__)
-                logger.exception("Ошибка при отправке уведомления пользователю %s", user_id)
-
-        conn.close()
-
-    async def send_activity_reminders(self) -> None:
-        """Отправка напоминаний о вводе активности."""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-
-        # Получаем всех пользователей
-        cursor.execute("SELECT id FROM users")
-        users = cursor.fetchall()
-
-        for user in users:
-            user_id = user[0]
-            try:
-                await self.bot.send_message(
-                    chat_id=user_id,
-                    text=msg.ACTIVITY_REMINDER,
-                )
-            except Exception:
-                logger = logging.getLogger(__name__)
-                logger.exception("Ошибка при отправке уведомления пользователю %s", user_id)
-
-        conn.close()
+    async def _broadcast(self, users: list[int], text: str, name: str) -> None:
+        """Рассылка с исключением недоступных пользователей из следующих рассылок."""
+        if self.broadcaster is None:
+            error_msg = "Планировщик уведомлений не запущен"
+            raise RuntimeError(error_msg)
+        stats = await self.broadcaster.broadcast(users, text, name=name)
+        inactive_users.mark_inactive(stats.unreachable)
+
+    async def send_weight_reminders(self, bucket: int = 0, buckets: int = 1) -> None:
+        """Отправка напоминаний о вводе веса пользователям, не вводившим вес сегодня."""
+        users = select_reminder_audience("weight_records", self.tz, bucket=bucket, buckets=buckets)
+        await self._broadcast(users, msg.WEIGHT_REMINDER, name=f"weight_reminder_{bucket}")
+
+    async def send_activity_reminders(self, bucket: int = 0, buckets: int = 1) -> None:
+        """Отправка напоминаний о вводе активности пользователям, не вводившим активность сегодня."""
+        users = select_reminder_audience("activity_records", self.tz, bucket=bucket, buckets=buckets)
+        await self._broadcast(users, msg.ACTIVITY_REMINDER, name=f"activity_reminder_{bucket}")
+
+    async def send_custom_time_weight_reminders(self) -> None:
+        """Отправка напоминаний о весе пользователям, выбравшим текущую минуту своим временем."""
+        reminder_time = datetime.now(self.tz).strftime(REMINDER_TIME_FORMAT)
+        users = select_reminder_audience("weight_records", self.tz, reminder_time=reminder_time)
+        if users:
+            await self._broadcast(users, msg.WEIGHT_REMINDER, name=f"weight_reminder_{reminder_time}")
 
     def stop_scheduler(self) -> None:
         """Остановка планировщика уведомлений."""
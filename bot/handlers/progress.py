@@ -0,0 +1,107 @@
+# bot/handlers/progress.py
+
+from datetime import UTC, datetime
+
+import pytz
+import utils.messages as msg
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from database.models import get_connection
+from database.queries import RECORD_DATE_FORMAT, select_activity_summary
+from settings import settings
+
+router = Router()
+
+# Формат даты последнего обновления в сообщении
+LAST_UPDATE_FORMAT = "%d.%m.%Y"
+
+# Период статистики /activities, дней
+ACTIVITY_STATS_DAYS = 30
+
+
+def format_last_update(record_date: str) -> str:
+    """Дата записи (UTC) в часовом поясе уведомлений."""
+    tz = pytz.timezone(settings.notification_timezone)
+    return datetime.strptime(record_date, RECORD_DATE_FORMAT).replace(tzinfo=UTC).astimezone(tz).strftime(
+        LAST_UPDATE_FORMAT,
+    )
+
+
+@router.message(Command("progress"))
+async def cmd_progress(message: Message) -> SendMessage:
+    """Обработка команды /progress - прогресс участника из снимка user_progress."""
+    user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT u.username, u.start_weight, u.target_weight,
+               p.current_weight, p.last_update, p.lost_weight, p.target_point, p.current_point
+        FROM users u
+        LEFT JOIN user_progress p ON p.user_id = u.id
+        WHERE u.id = ?
+    """, (user_id,))
+    row = cursor.fetchone()
+
+    conn.close()
+
+    if not row:
+        return message.answer(msg.NOT_REGISTERED)
+
+    username, start_weight, target_weight, current_weight, last_update, lost_weight, target_point, current_point = row
+
+    if current_weight is None:
+        return message.answer(msg.PROGRESS_INFO_NO_RECORDS_SS.format(username, start_weight, target_weight))
+
+    if lost_weight > 0:
+        change_text = msg.PROGRESS_WEIGHT_LOST_TEXT_S.format(lost_weight)
+    elif lost_weight < 0:
+        change_text = msg.PROGRESS_WEIGHT_GAINED_TEXT_S.format(abs(lost_weight))
+    else:
+        change_text = msg.PROGRESS_NO_CHANGE
+
+    return message.answer(
+        msg.PROGRESS_INFO_WITH_CHANGE_SSSSS.format(
+            username,
+            start_weight,
+            current_weight,
+            target_weight,
+            change_text,
+            msg.PROGRESS_POINTS_SS.format(current_point, target_point),
+            format_last_update(last_update),
+        ),
+    )
+
+
+@router.message(Command("activities"))
+async def cmd_activities(message: Message) -> SendMessage:
+    """Обработка команды /activities - статистика активности из дневных итогов."""
+    user_id = message.from_user.id if message.from_user and message.from_user.id is not None else 0
+
+    tz = pytz.timezone(settings.notification_timezone)
+    rows = select_activity_summary(user_id, tz, ACTIVITY_STATS_DAYS)
+    if not rows:
+        return message.answer(msg.NO_ACTIVITIES_RECORDS)
+
+    today = datetime.now(UTC).astimezone(tz).date().isoformat()
+
+    # Итоги по типам активности: дни, записи, сумма, сумма за сегодня, калории
+    stats: dict[tuple[str, str], list[float]] = {}
+    for description, unit, day, records_count, total_value, total_calories in rows:
+        activity = stats.setdefault((description, unit), [0, 0, 0.0, 0.0, 0.0])
+        activity[0] += 1
+        activity[1] += records_count
+        activity[2] += total_value
+        activity[3] += total_value if day == today else 0.0
+        activity[4] += total_calories
+
+    lines = [msg.ACTIVITIES_STATS_TITLE_S.format(ACTIVITY_STATS_DAYS)]
+    lines.extend(
+        msg.ACTIVITIES_STATS_ROW_SSSSSSS.format(description, total, unit, days, records, today_total, calories)
+        for (description, unit), (days, records, total, today_total, calories) in stats.items()
+    )
+    lines.append(msg.ACTIVITIES_STATS_CALORIES_S.format(sum(activity[4] for activity in stats.values())))
+    return message.answer("\n".join(lines))
@@ -1,7 +1,5 @@
 # bot/handlers/registration.py
 
-import sqlite3
-
 import utils.messages as msg
 
 # Константы для валидации данных
@@ -18,8 +16,11 @@ from aiogram import Router
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.methods import SendMessage
 from aiogram.types import Message
-from database.models import DATABASE_PATH
+from database.models import get_connection, progress_constants_values
+from database.queries import refresh_user_progress
+from utils.calculations import calculate_progress_constants
 
 router = Router()
 
@@ -34,103 +35,98 @@ class RegistrationStates(StatesGroup):
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext) -> None:
+async def cmd_start(message: Message, state: FSMContext) -> SendMessage:
     """Обработка команды /start."""
-    await message.answer(
+    await state.set_state(RegistrationStates.waiting_for_username)
+    return message.answer(
         msg.REGISTRATION_WELCOME_SS.format(USERNAME_MIN_LENGTH, USERNAME_MAX_LENGTH),
     )
-    await state.set_state(RegistrationStates.waiting_for_username)
 
 
 @router.message(RegistrationStates.waiting_for_username)
-async def process_username(message: Message, state: FSMContext) -> None:
+async def process_username(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода ника."""
     username = message.text.strip() if message.text is not None else ""
 
     if len(username) < USERNAME_MIN_LENGTH or len(username) > USERNAME_MAX_LENGTH:
-        await message.answer(msg.INVALID_NICKNAME_LENGTH_SS.format(USERNAME_MIN_LENGTH, USERNAME_MAX_LENGTH))
-        return
+        return message.answer(msg.INVALID_NICKNAME_LENGTH_SS.format(USERNAME_MIN_LENGTH, USERNAME_MAX_LENGTH))
 
     await state.update_data(username=username)
-    await message.answer(
+    await state.set_state(RegistrationStates.waiting_for_gender)
+    return message.answer(
         msg.GENDER_REQUEST_SIMPLE,
     )
-    await state.set_state(RegistrationStates.waiting_for_gender)
 
 
 @router.message(RegistrationStates.waiting_for_gender)
-async def process_gender(message: Message, state: FSMContext) -> None:
+async def process_gender(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода пола."""
     gender = message.text.strip().upper() if message.text is not None else ""
 
     if gender not in ["М", "Ж", "M", "F"]:
-        await message.answer(msg.INVALID_GENDER_SS.format("М", "Ж"))
-        return
+        return message.answer(msg.INVALID_GENDER_SS.format("М", "Ж"))
 
     # Преобразуем в формат базы данных
     gender_db = "M" if gender in ["М", "M"] else "F"
 
     await state.update_data(gender=gender_db)
-    await message.answer(msg.AGE_REQUEST)
     await state.set_state(RegistrationStates.waiting_for_age)
+    return message.answer(msg.AGE_REQUEST)
 
 
 @router.message(RegistrationStates.waiting_for_age)
-async def process_age(message: Message, state: FSMContext) -> None:
+async def process_age(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода возраста."""
     try:
         age = int(message.text.strip()) if message.text is not None else 0
 
         if age < AGE_MIN_VALUE or age > AGE_MAX_VALUE:
-            await message.answer(msg.INVALID_AGE_SS.format(AGE_MIN_VALUE, AGE_MAX_VALUE))
-            return
+            return message.answer(msg.INVALID_AGE_SS.format(AGE_MIN_VALUE, AGE_MAX_VALUE))
 
         await state.update_data(age=age)
-        await message.answer(msg.HEIGHT_REQUEST)
         await state.set_state(RegistrationStates.waiting_for_height)
+        return message.answer(msg.HEIGHT_REQUEST)
 
     except ValueError:
-        await message.answer(msg.INVALID_AGE_INPUT)
+        return message.answer(msg.INVALID_AGE_INPUT)
 
 
 @router.message(RegistrationStates.waiting_for_height)
-async def process_height(message: Message, state: FSMContext) -> None:
+async def process_height(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода роста."""
     try:
         height = float(message.text.strip()) if message.text is not None else 0.0
 
         if height < HEIGHT_MIN_VALUE or height > HEIGHT_MAX_VALUE:
-            await message.answer(msg.INVALID_HEIGHT_SS.format(HEIGHT_MIN_VALUE, HEIGHT_MAX_VALUE))
-            return
+            return message.answer(msg.INVALID_HEIGHT_SS.format(HEIGHT_MIN_VALUE, HEIGHT_MAX_VALUE))
 
         await state.update_data(height=height)
-        await message.answer(msg.START_WEIGHT_REQUEST)
         await state.set_state(RegistrationStates.waiting_for_start_weight)
+        return message.answer(msg.START_WEIGHT_REQUEST)
 
     except ValueError:
-        await message.answer(msg.INVALID_HEIGHT_INPUT)
+        return message.answer(msg.INVALID_HEIGHT_INPUT)
 
 
 @router.message(RegistrationStates.waiting_for_start_weight)
-async def process_start_weight(message: Message, state: FSMContext) -> None:
+async def process_start_weight(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода стартового веса."""
     try:
         start_weight = float(message.text.strip()) if message.text is not None else 0.0
 
         if start_weight < WEIGHT_MIN_VALUE or start_weight > WEIGHT_MAX_VALUE:
-            await message.answer(msg.INVALID_WEIGHT_SS.format(WEIGHT_MIN_VALUE, WEIGHT_MAX_VALUE))
-            return
+            return message.answer(msg.INVALID_WEIGHT_SS.format(WEIGHT_MIN_VALUE, WEIGHT_MAX_VALUE))
 
         await state.update_data(start_weight=start_weight)
-        await message.answer(msg.TARGET_WEIGHT_REQUEST_EXTRA)
         await state.set_state(RegistrationStates.waiting_for_target_weight)
+        return message.answer(msg.TARGET_WEIGHT_REQUEST_EXTRA)
 
     except ValueError:
-        await message.answer(msg.INVALID_START_WEIGHT_INPUT)
+        return message.answer(msg.INVALID_START_WEIGHT_INPUT)
 
 
 @router.message(RegistrationStates.waiting_for_target_weight)
-async def process_target_weight(message: Message, state: FSMContext) -> None:
+async def process_target_weight(message: Message, state: FSMContext) -> SendMessage:
     """Обработка ввода целевого веса."""
     try:
         target_weight = float(message.text.strip()) if message.text is not None else 0.0
@@ -138,12 +134,10 @@ async def process_target_weight(message: Message, state: FSMContext) -> None:
         start_weight = data["start_weight"]
 
         if target_weight < WEIGHT_MIN_VALUE or target_weight > WEIGHT_MAX_VALUE:
-            await message.answer(msg.INVALID_WEIGHT_SS.format(WEIGHT_MIN_VALUE, WEIGHT_MAX_VALUE))
-            return
+            return message.answer(msg.INVALID_WEIGHT_SS.format(WEIGHT_MIN_VALUE, WEIGHT_MAX_VALUE))
 
         if target_weight >= start_weight:
-            await message.answer(msg.INVALID_TARGET_WEIGHT_S)
-            return
+            return message.answer(msg.INVALID_TARGET_WEIGHT_S)
 
         await state.update_data(target_weight=target_weight)
 
@@ -157,19 +151,42 @@ async def process_target_weight(message: Message, state: FSMContext) -> None:
         start_weight = user_data["start_weight"]
         target_weight = user_data["target_weight"]
 
-        conn = sqlite3.connect(DATABASE_PATH)
+        # Константы формулы прогресса считаются один раз и хранятся с пользователем
+        constants = calculate_progress_constants(start_weight, height, target_weight)
+
+        conn = get_connection()
         cursor = conn.cursor()
 
+        # При повторной регистрации обновляем профиль, сохраняя остальные поля (напоминания, активность)
         cursor.execute("""
-            INSERT OR REPLACE INTO users
-            (id, username, gender, age, height, start_weight, target_weight)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (user_id, username, gender, age, height, start_weight, target_weight))
+            INSERT INTO users (
+                id, username, gender, age, height, start_weight, target_weight,
+                initial_bmi, target_bmi, weight_factor, target_point, formula_version
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                username = excluded.username,
+                gender = excluded.gender,
+                age = excluded.age,
+                height = excluded.height,
+                start_weight = excluded.start_weight,
+                target_weight = excluded.target_weight,
+                initial_bmi = excluded.initial_bmi,
+                target_bmi = excluded.target_bmi,
+                weight_factor = excluded.weight_factor,
+                target_point = excluded.target_point,
+                formula_version = excluded.formula_version
+        """, (user_id, username, gender, age, height, start_weight, target_weight, *progress_constants_values(constants)))
+
+        # При повторной регистрации пересчитываем прогресс под новые стартовый и целевой вес
+        refresh_user_progress(cursor, user_id)
 
         conn.commit()
         conn.close()
 
-        await message.answer(
+        await state.clear()
+
+        return message.answer(
             msg.REGISTRATION_COMPLETED_SSSSSS.format(
                 username,
                 "Мужской" if gender == "M" else "Женский",
@@ -180,7 +197,5 @@ async def process_target_weight(message: Message, state: FSMContext) -> None:
             ),
         )
 
-        await state.clear()
-
     except ValueError:
-        await message.answer(msg.INVALID_TARGET_WEIGHT_INPUT)
+        return message.answer(msg.INVALID_TARGET_WEIGHT_INPUT)
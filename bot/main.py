@@ -1,18 +1,32 @@
 # Основной файл запуска бота
 
 import asyncio
+import itertools
 import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
 
 import utils.messages as msg
 from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 from database.models import init_db
 from handlers import setup_handlers
 from handlers.notifications import scheduler
+from middlewares.metrics import UpdateMetricsMiddleware
+from middlewares.reactivation import ReactivationMiddleware
 from settings import settings
+from storage import create_storage
+from utils.charts import chart_service
+from utils.jobs import job_manager
+from utils.leaderboard import leaderboard
+from utils.metrics import metrics_handler
+from utils.session import create_bot
+
+# Ключ экземпляра бота в веб-приложении
+BOT_APP_KEY = web.AppKey("bot", Bot)
 
 
 async def on_startup(app: web.Application) -> None:
@@ -20,7 +34,7 @@ async def on_startup(app: web.Application) -> None:
     init_db()
 
     # Запуск планировщика уведомлений
-    scheduler.start_scheduler()
+    scheduler.start_scheduler(app[BOT_APP_KEY])
 
 
 async def on_cleanup(app: web.Application) -> None:
@@ -28,90 +42,223 @@ async def on_cleanup(app: web.Application) -> None:
     scheduler.stop_scheduler()
 
 
-async def main() -> None:
-    # Настройка логирования
+async def on_worker_startup(app: web.Application) -> None:
+    # Запуск пула отрисовки графиков, очередей фоновых задач и построение таблицы лидеров (в каждом воркере)
+    chart_service.start()
+    job_manager.start()
+    leaderboard.load()
+
+
+async def on_worker_cleanup(app: web.Application) -> None:
+    # Остановка очередей фоновых задач (они используют пул графиков) и пула отрисовки графиков
+    await job_manager.stop()
+    chart_service.stop()
+    leaderboard.close()
+
+
+def setup_logging() -> None:
+    """Настройка логирования."""
     logging.basicConfig(level=getattr(logging, settings.log_min_level.upper(), logging.INFO))
 
-    # Инициализация логгера
-    logger = logging.getLogger(__name__)
 
-    # Инициализация бота
-    bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+def setup_dispatcher() -> Dispatcher:
+    """Создание диспетчера с middleware и обработчиками."""
+    dp = Dispatcher(storage=create_storage())
+
+    # Замер времени обработки обновлений и запросов к базе
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
 
-    # Инициализация диспетчера
-    dp = Dispatcher()
+    # Возврат в рассылки пользователей, которые снова пишут боту
+    dp.update.outer_middleware(ReactivationMiddleware())
 
     # Настройка обработчиков
     setup_handlers(dp)
 
+    return dp
+
+
+async def run_webhook(worker_id: int = 0, workers: int = 1) -> None:
+    """Запуск веб-сервера с webhook.
+
+    При workers > 1 несколько процессов слушают один порт через SO_REUSEPORT,
+    а ядро распределяет между ними входящие соединения. Только ведущий воркер
+    (worker_id == 0) устанавливает webhook и запускает планировщик уведомлений,
+    чтобы напоминания не дублировались.
+    """
+    logger = logging.getLogger(__name__)
+    is_leader = worker_id == 0
+
+    # Инициализация бота с общей HTTP-сессией для обработчиков и рассылок
+    bot = create_bot()
+    dp = setup_dispatcher()
+
+    # Получение webhook URL из настроек
+    webhook_url = settings.webhook_url
+
+    # Установка webhook
+    # Если используется самоподписной сертификат, нужно передать его в Telegram
+    # см. инструкции в nginx/ssl_setup_instructions.md
+    if is_leader and webhook_url:
+        await bot.set_webhook(webhook_url)
+
+    # Настройка веб-приложения
+    app = web.Application()
+    app[BOT_APP_KEY] = bot
+
+    # Регистрация обработчика запросов
+    # В режиме WEBHOOK_REPLY_INLINE вебхук ждет завершения обработчика, и если обработчик
+    # вернул метод API (единственный ответ через return message.answer(...)), он уходит
+    # в теле ответа на вебхук без отдельного исходящего запроса к Telegram.
+    # Обработчики с несколькими сообщениями по-прежнему вызывают API через await.
+    webhook_requests_handler = SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=not settings.webhook_reply_inline,
+    )
+
+    # Регистрация маршрута для вебхука
+    webhook_requests_handler.register(app, path="/webhook")
+
+    # Метрики процесса в формате Prometheus
+    app.router.add_get("/metrics", metrics_handler)
+
+    # Настройка приложения
+    setup_application(app, dp, bot=bot)
+
+    # Добавление функций запуска и остановки (планировщик только в ведущем воркере)
+    if is_leader:
+        app.on_startup.append(on_startup)
+        app.on_cleanup.append(on_cleanup)
+    app.on_startup.append(on_worker_startup)
+    app.on_cleanup.append(on_worker_cleanup)
+
+    # Получение хоста и порта из настроек
+    host = settings.host
+    port = settings.port
+
+    # Запуск веб-сервера
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, reuse_port=workers > 1)
+    await site.start()
+
+    logger.info(msg.BOT_STARTED_ON_HOST_PORT_SS, host, port)
+    if workers > 1:
+        logger.info(msg.WORKER_STARTED_SSS, worker_id, os.getpid(), "ведущий" if is_leader else "ведомый")
+
+    # Ожидание сигнала остановки
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop_event.set)
+    loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+
+    try:
+        await stop_event.wait()
+        logger.warning(msg.SHUTTING_DOWN)
+    finally:
+        # Остановка планировщика при завершении работы
+        if is_leader:
+            scheduler.stop_scheduler()
+        await runner.cleanup()
+
+
+async def main() -> None:
+    # Настройка логирования
+    setup_logging()
+
+    # Инициализация логгера
+    logger = logging.getLogger(__name__)
+
     # Проверяем режим работы: development или production
     if settings.app_env.lower() == "development":
         # Режим разработки - запуск с polling
         logger.info(msg.BOT_STARTUP_DEV_MODE)
 
+        # Инициализация бота с общей HTTP-сессией для обработчиков и рассылок
+        bot = create_bot()
+        dp = setup_dispatcher()
+
         # Инициализация базы данных
         init_db()
 
-        # Запуск планировщика уведомлений
-        scheduler.start_scheduler()
+        # Запуск планировщика уведомлений, пула отрисовки графиков, очередей задач и таблицы лидеров
+        scheduler.start_scheduler(bot)
+        chart_service.start()
+        job_manager.start()
+        leaderboard.load()
 
         try:
             await dp.start_polling(bot)
         finally:
-            # Остановка планировщика при завершении работы
+            # Остановка планировщика, очередей задач и пула графиков при завершении работы
             scheduler.stop_scheduler()
+            await job_manager.stop()
+            chart_service.stop()
+            leaderboard.close()
     else:
         # Режим продакшн - запуск с webhook
-        # Получение webhook URL из настроек
-        webhook_url = settings.webhook_url
+        await run_webhook()
 
-        # Установка webhook
-        # Если используется самоподписной сертификат, нужно передать его в Telegram
-        # см. инструкции в nginx/ssl_setup_instructions.md
-        if webhook_url:
-            await bot.set_webhook(webhook_url)
 
-        # Настройка веб-приложения
-        app = web.Application()
+def run_worker(worker_id: int, workers: int) -> None:
+    """Точка входа процесса-воркера."""
+    # Обработчики сигналов родителя наследуются при fork, воркер завершается по сигналу сам
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    setup_logging()
+    asyncio.run(run_webhook(worker_id, workers))
 
-        # Регистрация обработчика запросов
-        webhook_requests_handler = SimpleRequestHandler(
-            dispatcher=dp,
-            bot=bot,
-        )
 
-        # Регистрация маршрута для вебхука
-        webhook_requests_handler.register(app, path="/webhook")
+def run_workers(workers: int) -> None:
+    """Запуск нескольких процессов-воркеров на одном порту.
 
-        # Настройка приложения
-        setup_application(app, dp, bot=bot)
+    База данных инициализируется один раз до запуска воркеров, дальше каждый
+    воркер работает со своими соединениями SQLite (WAL и ожидание блокировки).
+    Упавший воркер перезапускается с тем же номером, поэтому ведущий воркер
+    с планировщиком всегда один.
+    """
+    setup_logging()
+    logger = logging.getLogger(__name__)
 
-        # Добавление функций запуска и остановки
-        app.on_startup.append(on_startup)
-        app.on_cleanup.append(on_cleanup)
+    init_db()
 
-        # Получение хоста и порта из настроек
-        host = settings.host
-        port = settings.port
+    def start(worker_id: int) -> multiprocessing.Process:
+        process = multiprocessing.Process(target=run_worker, args=(worker_id, workers), name=f"worker-{worker_id}")
+        process.start()
+        return process
 
-        # Запуск веб-сервера
-        runner = web.AppRunner(app)
-        await runner.setup()
-        site = web.TCPSite(runner, host, port)
-        await site.start()
+    processes: dict[int, multiprocessing.Process] = {}
+    stopping = False
 
-        logger.info(msg.BOT_STARTED_ON_HOST_PORT_SS, host, port)
+    def stop(*_: object) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
 
-        # Бесконечный цикл
-        try:
-            await asyncio.sleep(float("inf"))
-        except (KeyboardInterrupt, SystemExit):
-            logger.warning(msg.SHUTTING_DOWN)
-        finally:
-            # Остановка планировщика при завершении работы
-            scheduler.stop_scheduler()
-            await runner.cleanup()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Обработчики установлены до запуска воркеров: сигнал во время запуска останавливает уже запущенных и отменяет остальных
+    for worker_id in itertools.takewhile(lambda _: not stopping, range(workers)):
+        processes[worker_id] = start(worker_id)
+
+    while processes:
+        multiprocessing.connection.wait([process.sentinel for process in processes.values()], timeout=1)
+        for worker_id, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            if stopping:
+                del processes[worker_id]
+            else:
+                logger.error(msg.WORKER_RESTARTING_SS, worker_id, process.exitcode)
+                processes[worker_id] = start(worker_id)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if settings.app_env.lower() != "development" and settings.web_workers > 1:
+        run_workers(settings.web_workers)
+    else:
+        asyncio.run(main())
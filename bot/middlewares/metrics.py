@@ -0,0 +1,103 @@
+# bot/middlewares/metrics.py
+
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import utils.messages as msg
+from aiogram import BaseMiddleware, Router
+from aiogram.types import TelegramObject, Update
+from settings import settings
+from utils.metrics import DB_CALLS_BUCKETS, UpdateTrace, current_trace, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Замер полного времени обработки обновления и запросов к базе во время него.
+
+    Регистрируется как внешний middleware на dp.update. Обновления дольше
+    порога записываются в лог с разбивкой по этапам.
+    """
+
+    def __init__(self, slow_threshold: float | None = None) -> None:
+        self.slow_threshold = slow_threshold if slow_threshold is not None else settings.slow_update_threshold
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        trace = UpdateTrace()
+        token = current_trace.set(trace)
+        failed = True
+        try:
+            result = await handler(event, data)
+            failed = False
+            return result
+        finally:
+            current_trace.reset(token)
+            self._record(event, trace, time.perf_counter() - trace.started_at, failed=failed)
+
+    def _record(self, event: TelegramObject, trace: UpdateTrace, duration: float, *, failed: bool) -> None:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        handler = f"{trace.router}.{trace.handler}" if trace.handler else "unhandled"
+
+        metrics.observe("bot_update_duration_seconds", duration, event_type=event_type, handler=handler)
+        metrics.observe("bot_update_db_calls", trace.db_calls, DB_CALLS_BUCKETS, handler=handler)
+        metrics.observe("bot_update_db_duration_seconds", trace.db_duration, handler=handler)
+        if failed:
+            metrics.inc("bot_update_errors_total", handler=handler)
+
+        if duration >= self.slow_threshold:
+            handler_started_at = trace.handler_started_at or trace.started_at + duration
+            before_handler = handler_started_at - trace.started_at
+            logger.warning(
+                msg.LOG_SLOW_UPDATE_SSSSSSSS,
+                event.update_id if isinstance(event, Update) else "-",
+                handler,
+                duration * 1000,
+                before_handler * 1000,
+                trace.handler_duration * 1000,
+                (duration - before_handler - trace.handler_duration) * 1000,
+                trace.db_calls,
+                trace.db_duration * 1000,
+            )
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Замер времени обработчика роутера (внутренний middleware, после фильтров)."""
+
+    def __init__(self, router_name: str) -> None:
+        self.router_name = router_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            duration = time.perf_counter() - started_at
+            handler_object = data.get("handler")
+            handler_name = handler_object.callback.__name__ if handler_object else "unknown"
+            metrics.observe("bot_handler_duration_seconds", duration, router=self.router_name, handler=handler_name)
+
+            trace = current_trace.get()
+            if trace is not None:
+                trace.router = self.router_name
+                trace.handler = handler_name
+                trace.handler_started_at = started_at
+                trace.handler_duration = duration
+
+
+def setup_router_metrics(router: Router, name: str) -> None:
+    """Подключение замера обработчиков ко всем событиям роутера."""
+    for event_name, observer in router.observers.items():
+        if event_name != "error":
+            observer.middleware(HandlerMetricsMiddleware(name))
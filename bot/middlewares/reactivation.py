@@ -0,0 +1,63 @@
+# bot/middlewares/reactivation.py
+
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from database.queries import mark_users_inactive, reactivate_user, select_inactive_user_ids
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InactiveUsers:
+    """Кэш ID пользователей, недоступных для рассылок.
+
+    Позволяет проверять каждое входящее обновление без обращения к базе.
+    Кэш периодически перечитывается, чтобы видеть изменения других процессов.
+    """
+
+    def __init__(self, ttl: float | None = None) -> None:
+        self.ttl = ttl if ttl is not None else settings.inactive_users_cache_ttl
+        self._user_ids: set[int] = set()
+        self._loaded_at: float | None = None
+
+    def _refresh(self) -> None:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._user_ids = select_inactive_user_ids()
+            self._loaded_at = time.monotonic()
+
+    def mark_inactive(self, user_ids: list[int]) -> None:
+        """Пометка пользователей недоступными в базе и в кэше."""
+        mark_users_inactive(user_ids)
+        self._user_ids.update(user_ids)
+
+    def reactivate(self, user_id: int) -> bool:
+        """Возврат пользователя в рассылки, если он был помечен недоступным."""
+        self._refresh()
+        if user_id not in self._user_ids:
+            return False
+        self._user_ids.discard(user_id)
+        return reactivate_user(user_id)
+
+
+# Глобальный экземпляр кэша
+inactive_users = InactiveUsers()
+
+
+class ReactivationMiddleware(BaseMiddleware):
+    """Автоматически возвращает в рассылки пользователей, которые снова написали боту."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is not None and inactive_users.reactivate(user.id):
+            logger.info("Пользователь %s снова активен", user.id)
+        return await handler(event, data)
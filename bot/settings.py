@@ -1,4 +1,5 @@
 import pathlib
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -20,22 +21,97 @@ class Settings(BaseSettings):
     weight_notification_time: str = Field("09:40", description="Time for weight notifications in HH:MM format")
     activity_notification_time: str = Field("22:01", description="Time for activity notifications in HH:MM format")
 
+    notification_timezone: str = Field("Europe/Moscow", description="Timezone of notification schedule")
+
+    reminder_spread_buckets: int = Field(1, description="Number of buckets to spread each reminder audience over")
+    reminder_bucket_interval: int = Field(1, description="Interval between reminder buckets in minutes")
+    reminder_custom_time_enabled: bool = Field(default=True, description="Allow per-user weight reminder time")
+
+    inactive_users_cache_ttl: float = Field(60.0, description="Refresh interval of the inactive users cache (s)")
+
+    # Broadcast configuration
+    broadcast_rate_limit: float = Field(25.0, description="Global broadcast rate limit (messages per second)")
+    broadcast_per_chat_interval: float = Field(1.0, description="Minimal interval between messages to one chat (s)")
+    broadcast_concurrency: int = Field(10, description="Number of concurrent broadcast senders")
+    broadcast_max_retries: int = Field(3, description="Max retries of a message after RetryAfter")
+
     # Database configuration
     database_path: pathlib.Path = base_path / "../data/database.db"
+    sqlite_busy_timeout: float = Field(30.0, description="How long to wait for a locked SQLite database (s)")
+
+    # FSM storage configuration
+    fsm_storage: Literal["memory", "sqlite", "ttl"] = Field("sqlite", description="FSM storage backend")
+    fsm_flush_interval: float = Field(0.05, description="Delay of batched FSM writes to SQLite (s, 0 - write through)")
+    fsm_sync_interval: float = Field(0.5, description="How often to pick up FSM changes of other workers (s)")
+    fsm_cache_size: int = Field(10000, description="Max FSM keys cached in process")
+    fsm_ttl: float = Field(24 * 60 * 60, description="Lifetime of an idle FSM key in the ttl storage (s)")
+    fsm_state_ttls: dict[str, float] = Field(
+        default_factory=lambda: {"WeightStates": 60 * 60, "ActivityStates": 60 * 60},
+        description="Lifetime of an idle FSM key per StatesGroup name in the ttl storage (s)",
+    )
+    fsm_sweep_interval: float = Field(60.0, description="Interval of expired FSM keys cleanup in the ttl storage (s)")
+    fsm_max_keys: int = Field(100_000, description="Max FSM keys in the ttl storage, least recently used are evicted")
 
     # Charts configuration
     charts_dir: pathlib.Path = base_path / "../charts/"
+    chart_workers: int = Field(2, description="Number of chart rendering processes")
+    charts_cache_size: int = Field(500, description="Max number of cached chart PNG files in charts_dir")
+    comparison_chart_debounce: float = Field(
+        60.0, description="Min interval between checks of the shared comparison chart for new data (s)",
+    )
+
+    # Telegram Bot API server (e.g. local fake server for tests)
+    telegram_api_url: str | None = Field(None, description="Base URL of the Telegram Bot API server")
+
+    # Shared HTTP session configuration
+    http_pool_limit: int = Field(100, description="Max simultaneous connections of the shared HTTP session")
+    http_pool_limit_per_host: int = Field(0, description="Max simultaneous connections per host (0 - no limit)")
+    http_keepalive_timeout: float = Field(60.0, description="Idle keep-alive connection lifetime (s)")
+    http_dns_cache_ttl: int = Field(3600, description="DNS cache TTL (s)")
+    http_timeout: float = Field(60.0, description="Total timeout of a Bot API request (s)")
 
     # Webhook configuration
     webhook_url: str | None = Field(None, description="Webhook URL for the bot")
+    webhook_reply_inline: bool = Field(
+        default=False,
+        description="Send single replies in the webhook response body instead of a separate API call",
+    )
 
     # Server configuration
     host: str = Field("0.0.0.0", description="Host for the web server")  # noqa:S104
     port: int = Field(8000, description="Port for the web server")
+    web_workers: int = Field(1, description="Number of webhook worker processes sharing the port (SO_REUSEPORT)")
+
+    # Weight history cache configuration
+    weight_history_cache_size: int = Field(20000, description="Max users whose weight history is cached in process")
+    weight_history_sync_interval: float = Field(
+        1.0, description="How often to pick up weight records added by other workers or the import (s)",
+    )
+
+    # Leaderboard configuration
+    leaderboard_size: int = Field(10, description="Number of participants shown by /leaderboard")
+    leaderboard_sync_interval: float = Field(
+        1.0, description="How often to pick up leaderboard changes made by other workers (s)",
+    )
+
+    # CSV import configuration
+    import_batch_size: int = Field(5000, description="Number of CSV rows written in one transaction by the import")
+    import_progress_interval: float = Field(2.0, description="Min interval between import progress updates (s)")
+
+    # Background job queues configuration
+    job_queues: dict[str, int] = Field(
+        default_factory=lambda: {"charts": 4, "import": 1},
+        description="Number of concurrently running jobs per background queue name",
+    )
+    job_queue_max_size: int = Field(100, description="Max waiting jobs per queue, new jobs are rejected when full")
+    job_history_size: int = Field(1000, description="Number of recent jobs kept for status tracking")
 
     # Application environment
     app_env: str = Field("production", description="Application environment (development or production)")
 
+    # Metrics configuration
+    slow_update_threshold: float = Field(0.5, description="Log updates processed longer than this (s)")
+
     # Logging configuration
     log_min_level: str = Field("INFO", description="Minimum logging level (DEBUG, INFO, WARNING, ERROR)")
 
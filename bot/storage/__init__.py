@@ -0,0 +1,26 @@
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from settings import settings
+
+from .memory import TTLMemoryStorage
+from .sqlite import SQLiteStorage
+
+
+def create_storage() -> BaseStorage:
+    """Создание хранилища FSM по настройкам приложения."""
+    if settings.fsm_storage == "memory":
+        return MemoryStorage()
+
+    if settings.fsm_storage == "ttl":
+        return TTLMemoryStorage(
+            default_ttl=settings.fsm_ttl,
+            state_ttls=settings.fsm_state_ttls,
+            sweep_interval=settings.fsm_sweep_interval,
+            max_keys=settings.fsm_max_keys,
+        )
+
+    return SQLiteStorage(
+        flush_interval=settings.fsm_flush_interval,
+        sync_interval=settings.fsm_sync_interval,
+        cache_size=settings.fsm_cache_size,
+    )
@@ -0,0 +1,149 @@
+"""Хранилище состояний FSM в памяти процесса с вытеснением по TTL."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """Состояние, данные и срок жизни одного ключа FSM."""
+
+    __slots__ = ("data", "expires_at", "state")
+
+    def __init__(self, state: str | None, data: dict[str, Any], expires_at: float) -> None:
+        self.state = state
+        self.data = data
+        self.expires_at = expires_at
+
+
+class TTLMemoryStorage(BaseStorage):
+    """Хранилище FSM в памяти, забывающее брошенные диалоги.
+
+    Каждый ключ живет ttl секунд с последнего обращения. Срок задается
+    для группы состояний (state_ttls, ключ - StatesGroup или ее имя),
+    для остальных ключей действует default_ttl. Истекшие ключи удаляются
+    при обращении к ним и фоновой очисткой раз в sweep_interval. Ключ
+    без состояния и данных (завершенный диалог) не хранится вовсе.
+
+    Если задан max_keys, при его превышении вытесняются давно не
+    использованные ключи (LRU), даже если их срок еще не истек.
+    Число ключей и вытеснений отдается в метриках bot_fsm_live_keys
+    и bot_fsm_evictions_total (reason: expired или capacity).
+    """
+
+    def __init__(
+        self,
+        default_ttl: float,
+        state_ttls: Mapping[type[StatesGroup] | str, float] | None = None,
+        sweep_interval: float = 60.0,
+        max_keys: int | None = None,
+    ) -> None:
+        self.default_ttl = default_ttl
+        self.state_ttls = {
+            group if isinstance(group, str) else group.__full_group_name__: ttl
+            for group, ttl in (state_ttls or {}).items()
+        }
+        self.sweep_interval = sweep_interval
+        self.max_keys = max_keys
+        self.evictions = 0
+        # Порядок ключей - от давно использованных к недавним
+        self._records: OrderedDict[StorageKey, _Record] = OrderedDict()
+        self._sweep_task: asyncio.Task[None] | None = None
+
+    @property
+    def live_keys(self) -> int:
+        """Число хранимых ключей (включая истекшие, но еще не удаленные)."""
+        return len(self._records)
+
+    def _ttl(self, state: str | None) -> float:
+        if state is None:
+            return self.default_ttl
+        group = state.rpartition(":")[0]
+        return self.state_ttls.get(group, self.default_ttl)
+
+    def _evicted(self, count: int, reason: str) -> None:
+        self.evictions += count
+        metrics.inc("bot_fsm_evictions_total", count, reason=reason)
+        metrics.set("bot_fsm_live_keys", self.live_keys)
+
+    def _get(self, key: StorageKey) -> _Record | None:
+        record = self._records.get(key)
+        if record is None:
+            return None
+        now = time.monotonic()
+        if record.expires_at <= now:
+            del self._records[key]
+            self._evicted(1, "expired")
+            return None
+        record.expires_at = now + self._ttl(record.state)
+        self._records.move_to_end(key)
+        return record
+
+    def _put(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        if state is None and not data:
+            self._records.pop(key, None)
+            metrics.set("bot_fsm_live_keys", self.live_keys)
+            return
+        self._records[key] = _Record(state, data, time.monotonic() + self._ttl(state))
+        self._records.move_to_end(key)
+        overflow = len(self._records) - self.max_keys if self.max_keys else 0
+        for _ in range(overflow):
+            self._records.popitem(last=False)
+        if overflow > 0:
+            self._evicted(overflow, "capacity")
+        else:
+            metrics.set("bot_fsm_live_keys", self.live_keys)
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_periodically())
+
+    def sweep(self) -> int:
+        """Удаление всех истекших ключей. Возвращает число удаленных."""
+        now = time.monotonic()
+        expired = [key for key, record in self._records.items() if record.expires_at <= now]
+        for key in expired:
+            del self._records[key]
+        self._evicted(len(expired), "expired")
+        return len(expired)
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.info(
+                    "FSM: удалено истекших ключей %s, осталось %s, всего удалено %s",
+                    removed,
+                    self.live_keys,
+                    self.evictions,
+                )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._get(key)
+        new_state = state.state if isinstance(state, State) else state
+        self._put(key, new_state, record.data if record else {})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        record = self._get(key)
+        self._put(key, record.state if record else None, dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record else {}
+
+    async def close(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
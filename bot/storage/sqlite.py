@@ -0,0 +1,208 @@
+"""Хранилище состояний FSM в базе данных бота (SQLite)."""
+
+import asyncio
+import contextvars
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from database.models import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """Состояние и данные одного ключа FSM в кэше процесса."""
+
+    __slots__ = ("data", "state")
+
+    def __init__(self, state: str | None = None, data: dict[str, Any] | None = None) -> None:
+        self.state = state
+        self.data = data or {}
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM в таблице fsm_storage с кэшем процесса и пакетной записью.
+
+    Чтение идет из кэша; при промахе запись читается из базы и кэшируется,
+    в том числе отсутствующая (пустое состояние). Запись сразу попадает в кэш,
+    а в базу - пачкой раз в flush_interval одной транзакцией.
+
+    Каждая запись в таблице получает возрастающую версию. Раз в sync_interval
+    хранилище проверяет PRAGMA data_version (без чтения с диска) и, если базу
+    меняли другие соединения, подтягивает строки с версией больше последней
+    увиденной. Так состояние, записанное одним воркером, видно остальным
+    не позже чем через flush_interval + sync_interval.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float,
+        sync_interval: float,
+        cache_size: int,
+        key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self.cache_size = cache_size
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: OrderedDict[str, _Record] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task[None] | None = None
+        self._flush_lock = asyncio.Lock()
+        # Соединение открывается при первом обращении, когда init_db уже создала таблицу
+        self._conn: sqlite3.Connection | None = None
+        self._version = 0
+        self._data_version = 0
+        self._checked_at = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = get_connection()
+            self._version = self._conn.execute("SELECT COALESCE(MAX(version), 0) FROM fsm_storage").fetchone()[0]
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._checked_at = time.monotonic()
+        return self._conn
+
+    def _sync(self) -> None:
+        """Обновление кэша записями, измененными другими соединениями."""
+        conn = self._connection()
+        now = time.monotonic()
+        if now - self._checked_at < self.sync_interval:
+            return
+        self._checked_at = now
+
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+
+        rows = conn.execute(
+            "SELECT key, state, data, version FROM fsm_storage WHERE version > ?", (self._version,),
+        ).fetchall()
+        for key, state, data, version in rows:
+            self._version = max(self._version, version)
+            # Еще не записанные изменения этого процесса новее прочитанных
+            if key in self._cache and key not in self._dirty:
+                self._cache[key] = _Record(state, json.loads(data))
+
+    def _get(self, key: StorageKey) -> _Record:
+        self._sync()
+        storage_key = self.key_builder.build(key)
+        record = self._cache.get(storage_key)
+        if record is not None:
+            self._cache.move_to_end(storage_key)
+            return record
+
+        row = self._connection().execute(
+            "SELECT state, data FROM fsm_storage WHERE key = ?", (storage_key,),
+        ).fetchone()
+        record = _Record(row[0], json.loads(row[1])) if row else _Record()
+        self._remember(storage_key, record)
+        return record
+
+    def _remember(self, storage_key: str, record: _Record) -> None:
+        self._cache[storage_key] = record
+        self._cache.move_to_end(storage_key)
+        # Вытеснение давно не использованных записей, кроме еще не сохраненных
+        for _ in range(len(self._cache) - self.cache_size):
+            old_key, old_record = self._cache.popitem(last=False)
+            if old_key in self._dirty:
+                self._cache[old_key] = old_record
+
+    async def _put(self, key: StorageKey, record: _Record) -> None:
+        storage_key = self.key_builder.build(key)
+        self._remember(storage_key, record)
+        self._dirty.add(storage_key)
+        if self.flush_interval <= 0:
+            await self._flush()
+        elif self._flush_task is None:
+            # Пакетная запись не относится к обновлению, вызвавшему ее (не попадает в его метрики)
+            self._flush_task = asyncio.create_task(self._flush_later(), context=contextvars.Context())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        """Запись накопленных изменений в базу одной транзакцией.
+
+        Строки собираются из кэша в цикле событий, а транзакция (в том числе
+        ожидание блокировки записи до SQLITE_BUSY_TIMEOUT) идет в потоке со своим
+        соединением. Записи выполняются по очереди, чтобы версии шли в порядке
+        изменений.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            keys = list(self._dirty)
+            self._dirty.clear()
+
+            rows = []
+            for key in keys:
+                record = self._cache.get(key) or _Record()
+                rows.append((key, record.state, json.dumps(record.data, ensure_ascii=False)))
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except sqlite3.Error:
+                # Повторим при следующей записи
+                self._dirty.update(keys)
+                logger.exception("Не удалось сохранить состояния FSM (%s ключей)", len(keys))
+
+    @staticmethod
+    def _write(rows: list[tuple[str, str | None, str]]) -> None:
+        conn = get_connection()
+        try:
+            # Блокировка на запись берется сразу, чтобы версии шли в порядке коммитов
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("SELECT COALESCE(MAX(version), 0) FROM fsm_storage").fetchone()[0]
+            updated_at = time.time()
+            conn.executemany(
+                """
+                INSERT INTO fsm_storage (key, state, data, version, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    state = excluded.state,
+                    data = excluded.data,
+                    version = excluded.version,
+                    updated_at = excluded.updated_at
+                """,
+                [(key, state, data, version + index, updated_at) for index, (key, state, data) in enumerate(rows, 1)],
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        current = self._get(key)
+        new_state = state.state if isinstance(state, State) else state
+        await self._put(key, _Record(new_state, current.data))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return self._get(key).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        current = self._get(key)
+        await self._put(key, _Record(current.state, dict(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return self._get(key).data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
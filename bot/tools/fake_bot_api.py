@@ -0,0 +1,230 @@
+"""Локальный фейковый сервер Telegram Bot API и сессия без сети для тестов и бенчмарков.
+
+Запуск из каталога bot:
+
+    python -m tools.fake_bot_api --port 8081
+
+После этого бота можно направить на сервер через TELEGRAM_API_URL=http://127.0.0.1:8081
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections.abc import AsyncGenerator, Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import web
+
+FAKE_BOT_USER = {"id": 42, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+
+def fake_message(message_id: int, chat_id: int, params: Mapping[str, Any]) -> dict[str, Any]:
+    """Сообщение бота, которое Telegram вернул бы на вызов send*."""
+    message: dict[str, Any] = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": FAKE_BOT_USER,
+    }
+    if "text" in params:
+        message["text"] = params["text"]
+    if "photo" in params or "document" in params:
+        file_id = f"fake-file-{message_id}"
+        message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 800, "height": 600}]
+    return message
+
+
+@dataclass
+class FakeCall:
+    """Запрос, полученный фейковым сервером."""
+
+    method: str
+    params: dict[str, Any]
+    received_at: float
+
+
+@dataclass
+class FakeBotAPIConfig:
+    """Поведение фейкового сервера."""
+
+    # Задержка ответа на каждый запрос, с
+    latency: float = 0.0
+    # Каждый N-й запрос получает 429 Too Many Requests (0 - отключено)
+    flood_every: int = 0
+    # Значение retry_after в ответе 429
+    retry_after: int = 1
+    # Чаты, заблокировавшие бота (ответ 403)
+    blocked_chat_ids: set[int] = field(default_factory=set)
+    # Чаты удаленных пользователей (ответ 403 user is deactivated)
+    deactivated_chat_ids: set[int] = field(default_factory=set)
+    # Чаты, которых не существует (ответ 400 chat not found)
+    missing_chat_ids: set[int] = field(default_factory=set)
+    # Сколько первых запросов в чат получают 500 Internal Server Error, по chat_id
+    server_errors: dict[int, int] = field(default_factory=dict)
+
+
+class FakeBotAPI:
+    """Фейковый сервер Bot API, записывающий все входящие вызовы."""
+
+    def __init__(self, config: FakeBotAPIConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or FakeBotAPIConfig()
+        self.host = host
+        self.port = port
+        self.calls: list[FakeCall] = []
+        self.connections: set[tuple[str, int]] = set()
+        self._message_ids = itertools.count(1)
+        self._requests = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        # Вызывается для каждого записанного запроса (например, чтобы дождаться ответа бота)
+        self.on_call: Callable[[FakeCall], None] | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reset(self) -> None:
+        """Очистка записанных вызовов и соединений."""
+        self.calls.clear()
+        self.connections.clear()
+
+    def _error(self, request_number: int, chat_id: int) -> tuple[int, str, dict[str, Any] | None] | None:
+        """Ошибка, которую нужно вернуть на запрос (код, описание, parameters), или None."""
+        if self.config.flood_every and request_number % self.config.flood_every == 0:
+            return (
+                429,
+                f"Too Many Requests: retry after {self.config.retry_after}",
+                {"retry_after": self.config.retry_after},
+            )
+        if chat_id in self.config.blocked_chat_ids:
+            return 403, "Forbidden: bot was blocked by the user", None
+        if chat_id in self.config.deactivated_chat_ids:
+            return 403, "Forbidden: user is deactivated", None
+        if self.config.server_errors.get(chat_id, 0) > 0:
+            self.config.server_errors[chat_id] -= 1
+            return 500, "Internal Server Error", None
+        if chat_id in self.config.missing_chat_ids:
+            return 400, "Bad Request: chat not found", None
+        return None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer:
+            self.connections.add((peer[0], peer[1]))
+
+        method = request.match_info["method"]
+        # aiogram отправляет параметры как form-data, файлы заменяем заглушкой
+        post = await request.post()
+        params: dict[str, Any] = {key: value if isinstance(value, str) else "<file>" for key, value in post.items()}
+        call = FakeCall(method=method, params=params, received_at=time.monotonic())
+        self.calls.append(call)
+        if self.on_call:
+            self.on_call(call)
+
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+
+        chat_id = int(params.get("chat_id", 0) or 0)
+        error = self._error(next(self._requests), chat_id)
+        if error is not None:
+            error_code, description, parameters = error
+            body: dict[str, Any] = {"ok": False, "error_code": error_code, "description": description}
+            if parameters:
+                body["parameters"] = parameters
+            return web.json_response(body, status=error_code)
+
+        result: Any = True
+        if method == "getMe":
+            result = FAKE_BOT_USER
+        elif method.startswith("send"):
+            result = fake_message(next(self._message_ids), chat_id, params)
+        return web.json_response({"ok": True, "result": result})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            # Порт выбран системой, узнаем его из открытого сокета
+            server = site._server  # noqa: SLF001
+            self.port = server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class RecordingSession(BaseSession):
+    """Сессия бота без сети: записывает исходящие вызовы и отвечает как фейковый сервер.
+
+    Подходит для прогона диспетчера в том же процессе, где HTTP к Bot API не нужен.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: list[TelegramMethod[Any]] = []
+        self._message_ids = itertools.count(1)
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,  # noqa: ASYNC109 - сигнатура BaseSession.make_request из aiogram
+    ) -> TelegramType:
+        self.calls.append(method)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        result: Any = True
+        if method.__api_method__ == "getMe":
+            result = FAKE_BOT_USER
+        elif method.__api_method__.startswith("send"):
+            params = method.model_dump(exclude_none=True)
+            result = fake_message(next(self._message_ids), int(params.get("chat_id", 0)), params)
+        response = self.check_response(bot, method, 200, json.dumps({"ok": True, "result": result}))
+        return cast("TelegramType", response.result)
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    config = FakeBotAPIConfig(latency=args.latency, flood_every=args.flood_every, retry_after=args.retry_after)
+    server = FakeBotAPI(config, host=args.host, port=args.port)
+    await server.start()
+    print(f"Fake Bot API слушает {server.base_url}")  # noqa: T201
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Фейковый сервер Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--flood-every", type=int, default=0, help="отвечать 429 на каждый N-й запрос")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответе 429")
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Общие помощники инструментов нагрузочного тестирования и бенчмарков."""
+
+import itertools
+import math
+import os
+import pathlib
+import tempfile
+import time
+from typing import Any
+
+FAKE_BOT_TOKEN = "42:FAKE-TOKEN"  # noqa: S105
+
+
+def prepare_environment() -> pathlib.Path:
+    """Настройка окружения до импорта модулей бота: фейковый токен и временная база.
+
+    Возвращает путь к временной базе данных.
+    """
+    os.environ.setdefault("BOT_TOKEN", FAKE_BOT_TOKEN)
+    os.environ.setdefault("APP_ENV", "benchmark")
+    if "DATABASE_PATH" not in os.environ:
+        os.environ["DATABASE_PATH"] = str(pathlib.Path(tempfile.mkdtemp(prefix="1x-fit-")) / "database.db")
+    return pathlib.Path(os.environ["DATABASE_PATH"])
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Перцентиль p (0-100) методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class UpdateFactory:
+    """Генератор сырых обновлений Telegram (в формате JSON вебхука)."""
+
+    def __init__(self) -> None:
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def message(self, user_id: int, text: str) -> dict[str, Any]:
+        """Личное сообщение пользователя user_id с текстом text."""
+        message: dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": f"user{user_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            command_length = len(text.split(maxsplit=1)[0])
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": command_length}]
+        return {"update_id": next(self._update_ids), "message": message}
@@ -0,0 +1,192 @@
+"""Нагрузочный тест диспетчера и обработчиков бота синтетическими обновлениями.
+
+Виртуальные пользователи параллельно проходят регистрацию (/start ... целевой вес),
+а затем несколько "дней": /weight и ввод веса, /activity, выбор ходьбы на клавиатуре
+и ввод шагов. Каждый пользователь отправляет следующее обновление только после
+обработки предыдущего, как живой человек в чате.
+
+Обновления проходят через настоящий диспетчер бота (middleware, хранилище FSM
+по настройкам, обработчики из setup_handlers) с временной базой данных:
+
+- inprocess: обновления передаются в dp.feed_update, ответ обработчика
+  выполняется через бота, как при polling;
+- http: обновления отправляются POST-запросом на маршрут /webhook локального
+  веб-приложения; ответ приходит после завершения обработчика.
+
+Исходящие вызовы Bot API не уходят в сеть: их записывает RecordingSession.
+Выводится пропускная способность и задержки p50/p95/p99 по шагам сценария.
+
+Запуск из каталога bot:
+
+    python -m tools.load_test --users 200 --days 3 --mode inprocess
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+from tools.harness import UpdateFactory, percentile, prepare_environment
+
+prepare_environment()
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from database.models import init_db
+from main import setup_dispatcher
+from utils.session import create_bot
+
+from tools.fake_bot_api import RecordingSession
+
+MODES = ("inprocess", "http")
+
+
+def scenario(user_id: int, days: int) -> list[tuple[str, str]]:
+    """Шаги пользователя: (название шага, текст сообщения)."""
+    steps = [
+        ("start", "/start"),
+        ("username", f"user{user_id}"),
+        ("gender", "М"),
+        ("age", "30"),
+        ("height", "180"),
+        ("start_weight", "95"),
+        ("target_weight", "80"),
+    ]
+    for day in range(days):
+        steps += [
+            ("weight_command", "/weight"),
+            ("weight", f"{94 - day * 0.3:.1f}"),
+            ("activity_command", "/activity"),
+            ("activity_type", "Ходьба (шаги)"),
+            ("activity_value", "8000"),
+        ]
+    return steps
+
+
+class InProcessTarget:
+    """Обработка обновления в том же процессе, как при polling."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.inline_replies = 0
+
+    async def send(self, raw_update: dict) -> None:
+        update = Update.model_validate(raw_update, context={"bot": self.bot})
+        response = await self.dp.feed_update(self.bot, update)
+        if isinstance(response, TelegramMethod):
+            await self.bot(response)
+
+
+class HTTPTarget:
+    """Обработка обновления через маршрут /webhook локального веб-приложения."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.url = ""
+        # Ответы, вернувшиеся в теле ответа на вебхук вместо вызова Bot API
+        self.inline_replies = 0
+        self._runner: web.AppRunner | None = None
+        self._client: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        # Ответ на вебхук приходит после завершения обработчика, так задержка включает обработку
+        SimpleRequestHandler(dispatcher=self.dp, bot=self.bot, handle_in_background=False).register(
+            app, path="/webhook",
+        )
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]  # noqa: SLF001
+        self.url = f"http://127.0.0.1:{port}/webhook"
+        self._client = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+    async def send(self, raw_update: dict) -> None:
+        assert self._client is not None
+        async with self._client.post(self.url, json=raw_update) as response:
+            response.raise_for_status()
+            body = await response.read()
+        if b'name="method"' in body:
+            self.inline_replies += 1
+
+    async def stop(self) -> None:
+        if self._client:
+            await self._client.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def run_user(
+    target: InProcessTarget | HTTPTarget,
+    factory: UpdateFactory,
+    user_id: int,
+    days: int,
+    latencies: dict[str, list[float]],
+) -> None:
+    for step, text in scenario(user_id, days):
+        started_at = time.perf_counter()
+        await target.send(factory.message(user_id, text))
+        latencies[step].append(time.perf_counter() - started_at)
+
+
+def print_report(latencies: dict[str, list[float]], duration: float, calls: int, inline_replies: int) -> None:
+    total = [latency for values in latencies.values() for latency in values]
+    print(f"{'шаг':<18}{'обновлений':>12}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}")  # noqa: T201
+    for step, values in [*latencies.items(), ("всего", total)]:
+        print(  # noqa: T201
+            f"{step:<18}{len(values):>12}"
+            f"{percentile(values, 50) * 1000:>10.2f}"
+            f"{percentile(values, 95) * 1000:>10.2f}"
+            f"{percentile(values, 99) * 1000:>10.2f}",
+        )
+    print(f"\nобновлений: {len(total)}, за {duration:.2f} с, {len(total) / duration:.0f} обновлений/с")  # noqa: T201
+    print(f"исходящих вызовов Bot API: {calls}, ответов в теле вебхука: {inline_replies}")  # noqa: T201
+
+
+async def run_load_test(users: int, days: int, mode: str, api_latency: float) -> None:
+    init_db()
+
+    session = RecordingSession(latency=api_latency)
+    bot = create_bot(session)
+    dp = setup_dispatcher()
+
+    target: InProcessTarget | HTTPTarget
+    if mode == "http":
+        target = HTTPTarget(dp, bot)
+        await target.start()
+    else:
+        target = InProcessTarget(dp, bot)
+
+    factory = UpdateFactory()
+    latencies: dict[str, list[float]] = defaultdict(list)
+    try:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(run_user(target, factory, user_id, days, latencies) for user_id in range(1, users + 1)))
+        duration = time.perf_counter() - started_at
+    finally:
+        if isinstance(target, HTTPTarget):
+            await target.stop()
+        await dp.storage.close()
+
+    print_report(latencies, duration, len(session.calls), target.inline_replies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработчиков бота")
+    parser.add_argument("--users", type=int, default=200, help="число виртуальных пользователей")
+    parser.add_argument("--days", type=int, default=3, help="число дней с вводом веса и активности")
+    parser.add_argument("--mode", choices=MODES, default="inprocess", help="способ доставки обновлений")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка ответа фейкового Bot API, с")
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args.users, args.days, args.mode, args.api_latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Бенчмарк HTTP-сессии бота против локального фейкового Bot API.
+
+Сравнивает три варианта отправки одинакового числа запросов sendMessage:
+
+- shared: один бот с общей KeepAliveSession (как в приложении);
+- two_sessions: два бота с отдельными сессиями (как было до общей сессии);
+- per_request: новая сессия на каждый запрос (худший случай, без повторного использования соединений).
+
+Для каждого варианта выводятся запросы в секунду и число открытых TCP-соединений.
+
+Запуск из каталога bot:
+
+    python -m tools.session_benchmark --requests 2000 --concurrency 50 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections.abc import Awaitable, Callable
+
+# Токен нужен настройкам бота, но сервер фейковый
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from utils.session import create_session
+
+from tools.fake_bot_api import FakeBotAPI, FakeBotAPIConfig
+
+BENCHMARK_TOKEN = "42:BENCHMARK"  # noqa: S105
+
+
+async def _run(requests: int, concurrency: int, send: Callable[[int], Awaitable[None]]) -> float:
+    """Выполнение requests вызовов send с ограничением параллельности. Возвращает длительность."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await send(i)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - started_at
+
+
+async def bench_shared(api: TelegramAPIServer, requests: int, concurrency: int) -> float:
+    bot = Bot(token=BENCHMARK_TOKEN, session=create_session(api))
+    try:
+        return await _run(requests, concurrency, lambda i: bot.send_message(chat_id=i + 1, text="ping"))
+    finally:
+        await bot.session.close()
+
+
+async def bench_two_sessions(api: TelegramAPIServer, requests: int, concurrency: int) -> float:
+    bots = [Bot(token=BENCHMARK_TOKEN, session=AiohttpSession(api=api)) for _ in range(2)]
+    try:
+        return await _run(
+            requests, concurrency, lambda i: bots[i % 2].send_message(chat_id=i + 1, text="ping"),
+        )
+    finally:
+        for bot in bots:
+            await bot.session.close()
+
+
+async def bench_per_request(api: TelegramAPIServer, requests: int, concurrency: int) -> float:
+    async def send(i: int) -> None:
+        bot = Bot(token=BENCHMARK_TOKEN, session=AiohttpSession(api=api))
+        try:
+            await bot.send_message(chat_id=i + 1, text="ping")
+        finally:
+            await bot.session.close()
+
+    return await _run(requests, concurrency, send)
+
+
+BENCHMARKS = {
+    "shared": bench_shared,
+    "two_sessions": bench_two_sessions,
+    "per_request": bench_per_request,
+}
+
+
+async def run_benchmarks(requests: int, concurrency: int, latency: float) -> None:
+    server = FakeBotAPI(FakeBotAPIConfig(latency=latency))
+    await server.start()
+    api = TelegramAPIServer.from_base(server.base_url)
+    try:
+        print(f"{'вариант':<14}{'запросов/с':>12}{'соединений':>12}{'запросов на соединение':>26}")  # noqa: T201
+        for name, bench in BENCHMARKS.items():
+            server.reset()
+            duration = await bench(api, requests, concurrency)
+            connections = len(server.connections)
+            print(  # noqa: T201
+                f"{name:<14}{requests / duration:>12.0f}{connections:>12}{requests / max(connections, 1):>26.1f}",
+            )
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк HTTP-сессии бота")
+    parser.add_argument("--requests", type=int, default=2000, help="число запросов в каждом варианте")
+    parser.add_argument("--concurrency", type=int, default=50, help="число одновременных запросов")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа фейкового API, с")
+    args = parser.parse_args()
+    asyncio.run(run_benchmarks(args.requests, args.concurrency, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Замер задержки ответа и числа исходящих запросов в режимах вебхука.
+
+Виртуальные пользователи проходят начало регистрации (/start, ник, пол) через
+настоящий диспетчер с обработчиками бота. Каждое обновление отправляется POST-запросом
+на вебхук, следующее - только после получения ответа бота.
+
+- background: вебхук сразу отвечает 200, ответ бота уходит отдельным запросом к API;
+- inline: ответ бота возвращается в теле ответа на вебхук (WEBHOOK_REPLY_INLINE).
+
+Задержка ответа считается от отправки обновления до момента, когда ответ бота дошел
+до Telegram: получение тела ответа вебхука или приход sendMessage на фейковый API.
+Задержка фейкового API имитирует время запроса к Telegram.
+
+Запуск из каталога bot:
+
+    python -m tools.webhook_benchmark --users 200 --api-latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from tools.harness import UpdateFactory, percentile, prepare_environment
+
+prepare_environment()
+
+import aiohttp
+from aiogram import Dispatcher
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from database.models import init_db
+from handlers import setup_handlers
+from utils.session import create_bot, create_session
+
+from tools.fake_bot_api import FakeBotAPI, FakeBotAPIConfig, FakeCall
+
+MODES = {"background": "/webhook-background", "inline": "/webhook-inline"}
+
+
+class ReplyWaiter:
+    """Ожидание ответов бота, пришедших на фейковый API, по chat_id."""
+
+    def __init__(self) -> None:
+        self._events: dict[int, asyncio.Event] = defaultdict(asyncio.Event)
+
+    def on_call(self, call: FakeCall) -> None:
+        if call.method == "sendMessage":
+            self._events[int(call.params["chat_id"])].set()
+
+    async def wait(self, chat_id: int) -> None:
+        event = self._events[chat_id]
+        await event.wait()
+        event.clear()
+
+
+@dataclass
+class ModeRun:
+    """Прогон одного режима вебхука: общие для его пользователей объекты и собранные задержки."""
+
+    client: aiohttp.ClientSession
+    url: str
+    waiter: ReplyWaiter
+    factory: UpdateFactory = field(default_factory=UpdateFactory)
+    latencies: list[float] = field(default_factory=list)
+
+
+async def run_user(run: ModeRun, user_id: int) -> None:
+    for text in ("/start", f"user{user_id}", "М"):
+        started_at = time.monotonic()
+        async with run.client.post(run.url, json=run.factory.message(user_id, text)) as response:
+            body = await response.read()
+        if b'name="method"' in body:
+            # Ответ пришел в теле ответа на вебхук (aiogram отвечает multipart/form-data)
+            run.latencies.append(time.monotonic() - started_at)
+        else:
+            await run.waiter.wait(user_id)
+            run.latencies.append(time.monotonic() - started_at)
+
+
+async def run_benchmark(users: int, api_latency: float) -> None:
+    init_db()
+
+    server = FakeBotAPI(FakeBotAPIConfig(latency=api_latency))
+    waiter = ReplyWaiter()
+    server.on_call = waiter.on_call
+    await server.start()
+
+    bot = create_bot(create_session(TelegramAPIServer.from_base(server.base_url)))
+    dp = Dispatcher()
+    setup_handlers(dp)
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=True).register(app, path=MODES["background"])
+    SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=False).register(app, path=MODES["inline"])
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]  # noqa: SLF001
+
+    print(  # noqa: T201
+        f"{'режим':<12}{'обновлений':>12}{'исх. запросов':>15}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}",
+    )
+    try:
+        async with aiohttp.ClientSession() as client:
+            for offset, (mode, path) in enumerate(MODES.items()):
+                server.reset()
+                run = ModeRun(client, f"http://127.0.0.1:{port}{path}", waiter)
+                # Для каждого режима свои пользователи, чтобы состояния FSM не пересекались
+                user_ids = range(offset * users + 1, (offset + 1) * users + 1)
+                await asyncio.gather(*(run_user(run, user_id) for user_id in user_ids))
+                print(  # noqa: T201
+                    f"{mode:<12}{len(run.latencies):>12}{len(server.calls):>15}"
+                    f"{percentile(run.latencies, 50) * 1000:>10.1f}"
+                    f"{percentile(run.latencies, 95) * 1000:>10.1f}"
+                    f"{percentile(run.latencies, 99) * 1000:>10.1f}",
+                )
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение режимов ответа на вебхук")
+    parser.add_argument("--users", type=int, default=200, help="число виртуальных пользователей")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="задержка фейкового Bot API, с")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.users, args.api_latency))
+
+
+if __name__ == "__main__":
+    main()
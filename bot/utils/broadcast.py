@@ -0,0 +1,230 @@
+"""Массовая рассылка сообщений с ограничением скорости."""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничитель скорости по алгоритму token bucket."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """Создает ведро с пополнением rate токенов в секунду и емкостью capacity."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Ожидание свободного токена."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class DeliveryFailure(StrEnum):
+    """Тип ошибки доставки сообщения."""
+
+    RATE_LIMITED = "rate_limited"
+    BLOCKED = "blocked"
+    CHAT_NOT_FOUND = "chat_not_found"
+    BAD_REQUEST = "bad_request"
+    NETWORK = "network"
+    SERVER = "server"
+    UNKNOWN = "unknown"
+
+
+# Ошибки, после которых чат считается недоступным навсегда
+PERMANENT_FAILURES = frozenset({DeliveryFailure.BLOCKED, DeliveryFailure.CHAT_NOT_FOUND})
+
+# Временные ошибки: сообщение возвращается в очередь, как после RetryAfter
+TRANSIENT_FAILURES = frozenset({DeliveryFailure.NETWORK, DeliveryFailure.SERVER})
+
+
+# Соответствие исключений aiogram типам ошибок доставки
+_FAILURE_TYPES: tuple[tuple[type[Exception], DeliveryFailure], ...] = (
+    (TelegramRetryAfter, DeliveryFailure.RATE_LIMITED),
+    # Бот заблокирован, пользователь удален или бот исключен из чата
+    (TelegramForbiddenError, DeliveryFailure.BLOCKED),
+    (TelegramNotFound, DeliveryFailure.CHAT_NOT_FOUND),
+    (TelegramNetworkError, DeliveryFailure.NETWORK),
+    (TelegramServerError, DeliveryFailure.SERVER),
+)
+
+
+def classify_failure(error: Exception) -> DeliveryFailure:
+    """Определение типа ошибки доставки."""
+    if isinstance(error, TelegramBadRequest):
+        if "chat not found" in error.message.lower():
+            return DeliveryFailure.CHAT_NOT_FOUND
+        return DeliveryFailure.BAD_REQUEST
+    for error_type, failure in _FAILURE_TYPES:
+        if isinstance(error, error_type):
+            return failure
+    return DeliveryFailure.UNKNOWN
+
+
+@dataclass
+class BroadcastStats:
+    """Статистика одной рассылки."""
+
+    name: str
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    duration: float = 0.0
+    # Количество ошибок по типам
+    failures: Counter[DeliveryFailure] = field(default_factory=Counter)
+    # Чаты, недоступные навсегда (бот заблокирован, чат не найден)
+    unreachable: list[int] = field(default_factory=list)
+
+    def record_failure(self, chat_id: int, failure: DeliveryFailure) -> None:
+        self.failed += 1
+        self.failures[failure] += 1
+        if failure in PERMANENT_FAILURES:
+            self.unreachable.append(chat_id)
+
+
+class Broadcaster:
+    """Рассылка сообщений с глобальным и поканальным ограничением скорости.
+
+    Telegram допускает около 30 сообщений в секунду суммарно и не более одного
+    сообщения в секунду в один чат. Отправка идет несколькими параллельными
+    воркерами, ответ RetryAfter приостанавливает все воркеры на указанное время,
+    а сообщение возвращается в очередь. После временной ошибки (сеть, 5xx)
+    сообщение тоже возвращается в очередь, но не больше max_retries раз.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float | None = None,
+        per_chat_interval: float | None = None,
+        concurrency: int | None = None,
+        max_retries: int | None = None,
+    ) -> None:
+        self.bot = bot
+        self.bucket = TokenBucket(rate or settings.broadcast_rate_limit)
+        self.per_chat_interval = (
+            per_chat_interval if per_chat_interval is not None else settings.broadcast_per_chat_interval
+        )
+        self.concurrency = concurrency or settings.broadcast_concurrency
+        self.max_retries = max_retries if max_retries is not None else settings.broadcast_max_retries
+        self._resume_at = 0.0
+        self._chat_next_at: dict[int, float] = {}
+
+    async def _wait_for_slot(self, chat_id: int) -> None:
+        """Ожидание окончания глобальной паузы, лимита чата и свободного токена."""
+        while True:
+            now = time.monotonic()
+            delay = max(self._resume_at, self._chat_next_at.get(chat_id, 0.0)) - now
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        await self.bucket.acquire()
+        self._chat_next_at[chat_id] = time.monotonic() + self.per_chat_interval
+
+    def _forget_idle_chats(self) -> None:
+        """Удаление лимитов чатов, время которых прошло.
+
+        Лимиты общие для параллельных рассылок, поэтому лимиты, которые еще
+        задерживают отправку, остаются.
+        """
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, next_at in self._chat_next_at.items() if next_at <= now]:
+            del self._chat_next_at[chat_id]
+
+    async def _worker(self, queue: asyncio.Queue[tuple[int, int]], text: str, stats: BroadcastStats) -> None:
+        while True:
+            chat_id, attempt = await queue.get()
+            try:
+                await self._wait_for_slot(chat_id)
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                stats.sent += 1
+            except TelegramRetryAfter as e:
+                # Приостанавливаем всех воркеров и возвращаем сообщение в очередь
+                self._resume_at = max(self._resume_at, time.monotonic() + e.retry_after)
+                if attempt < self.max_retries:
+                    stats.retried += 1
+                    queue.put_nowait((chat_id, attempt + 1))
+                else:
+                    stats.record_failure(chat_id, DeliveryFailure.RATE_LIMITED)
+                    logger.warning("Превышено число повторов отправки пользователю %s", chat_id)
+            except TelegramAPIError as e:
+                failure = classify_failure(e)
+                if failure in TRANSIENT_FAILURES and attempt < self.max_retries:
+                    stats.retried += 1
+                    queue.put_nowait((chat_id, attempt + 1))
+                    logger.debug("Повтор отправки пользователю %s после ошибки (%s): %s", chat_id, failure, e)
+                    continue
+                stats.record_failure(chat_id, failure)
+                if failure in PERMANENT_FAILURES:
+                    logger.info("Пользователь %s недоступен (%s): %s", chat_id, failure, e.message)
+                else:
+                    logger.warning("Ошибка при отправке уведомления пользователю %s (%s): %s", chat_id, failure, e)
+            except Exception:
+                stats.record_failure(chat_id, DeliveryFailure.UNKNOWN)
+                logger.exception("Ошибка при отправке уведомления пользователю %s", chat_id)
+            finally:
+                queue.task_done()
+
+    async def broadcast(self, chat_ids: Iterable[int], text: str, name: str = "broadcast") -> BroadcastStats:
+        """Отправка сообщения text всем чатам из chat_ids."""
+        stats = BroadcastStats(name=name)
+        queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait((chat_id, 0))
+        stats.total = queue.qsize()
+
+        started_at = time.monotonic()
+        workers = [
+            asyncio.create_task(self._worker(queue, text, stats))
+            for _ in range(min(self.concurrency, stats.total))
+        ]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._forget_idle_chats()
+
+        stats.duration = time.monotonic() - started_at
+        logger.info(
+            "Рассылка %s завершена: всего %s, отправлено %s, ошибок %s %s, повторов %s, за %.2f с",
+            stats.name,
+            stats.total,
+            stats.sent,
+            stats.failed,
+            dict(stats.failures),
+            stats.retried,
+            stats.duration,
+        )
+        return stats
@@ -0,0 +1,169 @@
+"""Функции для расчета прогресса пользователя.
+
+Копия расчета из etl_service/calculations.py: бот и ETL собираются в разные образы,
+формулы должны оставаться одинаковыми (проверяется tests/test_calculations.py).
+"""
+
+from dataclasses import dataclass
+
+# Рост по умолчанию, если он не указан (как в ETL), см
+DEFAULT_HEIGHT = 170.0
+
+# Версия формулы очков прогресса (как в ETL). При изменении расчета ее нужно
+# увеличить: сохраненные константы пользователей будут пересчитаны.
+FORMULA_VERSION = 1
+
+
+def calculate_bmi(weight: float, height: float) -> float:
+    """Рассчитывает ИМТ (индекс массы тела).
+
+    :param weight: вес в кг
+    :param height: рост в см
+    :return: значение ИМТ
+    """
+    height_m = height / 100  # переводим рост в метры
+    return weight / (height_m ** 2)
+
+
+def get_weight_factor(initial_bmi: float) -> float:
+    """Возвращает коэффициент, зависящий от начального ИМТ.
+
+    :param initial_bmi: начальный ИМТ
+    :return: коэффициент для расчета прогресса
+    """
+    # Константы для порогов ИМТ
+    normal_bmi_threshold = 25
+    overweight_bmi_threshold = 30
+    obesity1_bmi_threshold = 35
+    obesity2_bmi_threshold = 40
+
+    if initial_bmi < normal_bmi_threshold:  # нормальный вес
+        return 1.0
+    if initial_bmi < overweight_bmi_threshold:  # избыточный вес
+        return 1.2
+    if initial_bmi < obesity1_bmi_threshold:  # ожирение 1 степени
+        return 1.5
+    if initial_bmi < obesity2_bmi_threshold:  # ожирение 2 степени
+        return 1.8
+    # ожирение 3 степени
+    return 2.0
+
+
+def calculate_progress_points(start_weight: float, current_weight: float, height: float, target_weight: float) -> float:
+    """Рассчитывает прогресс в условных пунктов.
+
+    :param start_weight: начальный вес
+    :param current_weight: текущий вес
+    :param height: рост
+    :param target_weight: целевой вес
+    :return: количество условных пунктов прогресса
+    """
+    initial_bmi = calculate_bmi(start_weight, height)
+    current_bmi = calculate_bmi(current_weight, height)
+
+    # Применяем коэффициент, зависящий от начального ИМТ
+    _weight_factor = get_weight_factor(initial_bmi)
+
+    # Рассчитываем адаптивный фактор для шкалы прогресса
+    target_bmi = calculate_bmi(target_weight, height)
+    current_bmi_diff = abs(current_bmi - target_bmi)
+    initial_bmi_diff = abs(initial_bmi - target_bmi)
+
+    adaptive_factor = max(0.5, 1.0 - (current_bmi_diff / initial_bmi_diff if initial_bmi_diff != 0 else 1.0))
+
+    # Определяем базовые очки за кг
+    base_points_for_kg = 1.0
+
+    # Рассчитываем очки за 1 кг с учетом адаптивного фактора
+    points_for_kg = base_points_for_kg * adaptive_factor
+
+    # Рассчитываем итоговый прогресс
+    weight_loss = start_weight - current_weight
+    return weight_loss * points_for_kg
+
+
+def calculate_target_point(start_weight: float, height: float, target_weight: float) -> float:
+    """Рассчитывает целевой прогресс (максимально возможный).
+
+    :param start_weight: начальный вес
+    :param height: рост
+    :param target_weight: целевой вес
+    :return: целевое количество условных пунктов прогресса
+    """
+    return calculate_progress_points(start_weight, target_weight, height, target_weight)
+
+
+def calculate_current_point(start_weight: float, current_weight: float, height: float, target_weight: float) -> float:
+    """Рассчитывает текущий прогресс.
+
+    :param start_weight: начальный вес
+    :param current_weight: текущий вес
+    :param height: рост
+    :param target_weight: целевой вес
+    :return: текущее количество условных пунктов прогресса
+    """
+    return calculate_progress_points(start_weight, current_weight, height, target_weight)
+
+
+@dataclass(frozen=True)
+class ProgressConstants:
+    """Величины расчета прогресса, зависящие только от профиля пользователя.
+
+    Считаются один раз при регистрации (calculate_progress_constants) и хранятся
+    в таблице users вместе с версией формулы FORMULA_VERSION.
+    """
+
+    start_weight: float
+    height_m_squared: float  # квадрат роста в метрах
+    initial_bmi: float
+    target_bmi: float
+    weight_factor: float
+    target_point: float
+
+    @property
+    def initial_bmi_diff(self) -> float:
+        return abs(self.initial_bmi - self.target_bmi)
+
+    @classmethod
+    def from_stored(
+        cls,
+        start_weight: float,
+        height: float,
+        stored: tuple[float, float, float, float],
+    ) -> "ProgressConstants":
+        """Константы из сохраненных значений пользователя (initial_bmi, target_bmi, weight_factor, target_point)."""
+        return cls(start_weight, (height / 100) ** 2, *stored)
+
+
+def calculate_progress_constants(start_weight: float, height: float, target_weight: float) -> ProgressConstants:
+    """Рассчитывает константы прогресса пользователя.
+
+    :param start_weight: начальный вес
+    :param height: рост
+    :param target_weight: целевой вес
+    :return: константы прогресса
+    """
+    initial_bmi = calculate_bmi(start_weight, height)
+    return ProgressConstants(
+        start_weight=start_weight,
+        height_m_squared=(height / 100) ** 2,
+        initial_bmi=initial_bmi,
+        target_bmi=calculate_bmi(target_weight, height),
+        weight_factor=get_weight_factor(initial_bmi),
+        target_point=calculate_target_point(start_weight, height, target_weight),
+    )
+
+
+def calculate_point(constants: ProgressConstants, current_weight: float) -> float:
+    """Рассчитывает текущий прогресс по константам пользователя.
+
+    Результат совпадает с calculate_current_point для того же профиля.
+
+    :param constants: константы прогресса пользователя
+    :param current_weight: текущий вес
+    :return: текущее количество условных пунктов прогресса
+    """
+    initial_bmi_diff = constants.initial_bmi_diff
+    current_bmi_diff = abs(current_weight / constants.height_m_squared - constants.target_bmi)
+    adaptive_factor = max(0.5, 1.0 - (current_bmi_diff / initial_bmi_diff if initial_bmi_diff != 0 else 1.0))
+    return (constants.start_weight - current_weight) * adaptive_factor
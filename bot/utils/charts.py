@@ -0,0 +1,298 @@
+"""Сервис графиков: отрисовка в пуле процессов, кэш PNG на диске и file_id Telegram.
+
+Запрос графика проходит три уровня кэша:
+
+1. file_id: если график этой версии данных уже загружался в Telegram,
+   он отправляется по file_id без отрисовки и загрузки файла;
+2. PNG в charts_dir: файл с именем из ID пользователя, типа графика и версии
+   данных отправляется без отрисовки; старые файлы вытесняются по LRU;
+3. отрисовка в ProcessPoolExecutor с прогретыми процессами, чтобы matplotlib
+   не блокировал цикл событий. Одновременные запросы одного графика ждут
+   одну отрисовку.
+
+Сравнительный график всех участников один для всех пользователей: он хранится
+под user_id 0, данные для него проверяются не чаще раза в
+comparison_chart_debounce секунд, а перерисовывается он только при изменении
+прогресса участников. Варианты (все, топ-N, активные) кэшируются отдельно.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import pathlib
+import signal
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytz
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+from database.queries import (
+    RECORD_DATE_FORMAT,
+    save_chart_file_id,
+    select_activity_chart_version,
+    select_chart_file_id,
+    select_comparison_chart_data,
+)
+from settings import settings
+
+from utils import visualization
+from utils.metrics import metrics
+from utils.timeseries import activity_series, weight_series, weight_series_version
+
+logger = logging.getLogger(__name__)
+
+CHART_WEIGHT = "weight"
+CHART_ACTIVITY = "activity"
+
+CHART_COMPARISON = "comparison"
+
+# Период графика активности, дней
+ACTIVITY_CHART_DAYS = 30
+
+# Варианты сравнительного графика: все участники, топ-N по очкам, активные
+COMPARISON_ALL = "all"
+COMPARISON_TOP = "top"
+COMPARISON_ACTIVE = "active"
+# Владелец общих графиков в таблице chart_files
+SHARED_CHART_USER_ID = 0
+# Активные участники - вносившие вес за последние дни
+COMPARISON_ACTIVE_DAYS = 7
+
+RenderJob = tuple[Callable[..., str], tuple[Any, ...]]
+
+
+def _init_worker() -> None:
+    """Инициализация процесса пула: Ctrl+C обрабатывает родитель, он же останавливает пул."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    visualization.warm_up()
+
+
+def _digest(version: str) -> str:
+    return hashlib.sha1(version.encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+def comparison_variant(kind: str, top: int = 0) -> str:
+    """Имя варианта сравнительного графика (часть ключа кэша)."""
+    return f"{COMPARISON_TOP}{top}" if kind == COMPARISON_TOP else kind
+
+
+def select_comparison_participants(
+    rows: list[tuple[str, float, float, float, str, int]],
+    kind: str,
+    top: int = 0,
+) -> list[tuple[str, float, float, float]]:
+    """Участники варианта сравнительного графика: (имя, очки, целевые очки, сброшено кг)."""
+    if kind == COMPARISON_ACTIVE:
+        since = (datetime.now(UTC) - timedelta(days=COMPARISON_ACTIVE_DAYS)).strftime(RECORD_DATE_FORMAT)
+        rows = [row for row in rows if row[5] and row[4] >= since]
+    elif kind == COMPARISON_TOP:
+        rows = rows[:top]
+    return [(name, points, target_points, lost_weight) for name, points, target_points, lost_weight, *_ in rows]
+
+
+@dataclass
+class _SharedChart:
+    """Последняя проверенная версия общего графика в процессе."""
+
+    cache_key: str
+    participants: list[tuple[str, float, float, float]]
+    file_id: str | None
+    checked_at: float
+
+
+def _mtime(file: pathlib.Path) -> float:
+    try:
+        return file.stat().st_mtime
+    except FileNotFoundError:
+        # Файл уже удален другим воркером
+        return 0.0
+
+
+class ChartService:
+    """Отрисовка, кэширование и отправка графиков."""
+
+    def __init__(
+        self,
+        charts_dir: pathlib.Path | None = None,
+        workers: int | None = None,
+        cache_size: int | None = None,
+    ) -> None:
+        self.charts_dir = charts_dir or settings.charts_dir
+        self.workers = workers or settings.chart_workers
+        self.cache_size = cache_size or settings.charts_cache_size
+        self.tz = pytz.timezone(settings.notification_timezone)
+        self._executor: ProcessPoolExecutor | None = None
+        self.comparison_debounce = settings.comparison_chart_debounce
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+        self._shared: dict[str, _SharedChart] = {}
+        self._shared_locks: dict[str, asyncio.Lock] = {}
+
+    def start(self) -> None:
+        """Запуск пула процессов и их прогрев (импорт matplotlib, загрузка шрифтов)."""
+        if self._executor is not None:
+            return
+        self.charts_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # Пул создает процессы по мере надобности, поэтому запускаем их все заранее
+        for _ in range(self.workers):
+            self._executor.submit(visualization.warm_up)
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _version(self, chart_type: str, user_id: int) -> str | None:
+        if chart_type == CHART_WEIGHT:
+            return weight_series_version(user_id)
+        return select_activity_chart_version(user_id, self.tz, ACTIVITY_CHART_DAYS)
+
+    def _render_job(self, chart_type: str, user_id: int) -> RenderJob | None:
+        """Функция отрисовки и ее аргументы (данные читаются только при промахе кэша, прореженными)."""
+        if chart_type == CHART_WEIGHT:
+            data = weight_series(user_id)
+            return (visualization.render_weight_chart, data) if data else None
+        days = activity_series(user_id, self.tz, ACTIVITY_CHART_DAYS)
+        return (visualization.render_activity_chart, (days,)) if days else None
+
+    async def send(self, message: Message, user_id: int, chart_type: str, caption: str) -> bool:
+        """Отправка графика в ответ на сообщение. Возвращает False, если данных нет."""
+        version = self._version(chart_type, user_id)
+        if version is None:
+            return False
+        cache_key = f"{user_id}_{chart_type}_{_digest(version)}"
+
+        file_id = select_chart_file_id(user_id, chart_type, cache_key)
+        if file_id:
+            try:
+                await message.answer_photo(file_id, caption=caption)
+            except TelegramBadRequest:
+                logger.warning("file_id графика %s отклонен Telegram, загружаем файл заново", cache_key)
+            else:
+                metrics.inc("bot_chart_requests_total", chart_type=chart_type, source="file_id")
+                return True
+
+        path = await self._render(chart_type, cache_key, lambda: self._render_job(chart_type, user_id))
+        if path is None:
+            return False
+
+        sent = await message.answer_photo(FSInputFile(path), caption=caption)
+        if sent.photo:
+            save_chart_file_id(user_id, chart_type, cache_key, sent.photo[-1].file_id)
+        return True
+
+    def _shared_chart(self, variant: str, kind: str, top: int) -> _SharedChart | None:
+        """Версия варианта сравнительного графика; данные читаются не чаще раза в comparison_debounce."""
+        now = time.monotonic()
+        shared = self._shared.get(variant)
+        if shared is not None and now - shared.checked_at < self.comparison_debounce:
+            return shared
+
+        participants = select_comparison_participants(select_comparison_chart_data(), kind, top)
+        if not participants:
+            self._shared.pop(variant, None)
+            return None
+
+        cache_key = f"{CHART_COMPARISON}_{variant}_{_digest(repr(participants))}"
+        if shared is None or shared.cache_key != cache_key:
+            # График этой версии мог уже загрузить другой воркер
+            file_id = select_chart_file_id(SHARED_CHART_USER_ID, f"{CHART_COMPARISON}_{variant}", cache_key)
+            shared = _SharedChart(cache_key, participants, file_id, now)
+            self._shared[variant] = shared
+        shared.checked_at = now
+        return shared
+
+    async def send_comparison(self, message: Message, kind: str, caption: str, top: int = 0) -> bool:
+        """Отправка сравнительного графика участников. Возвращает False, если данных нет."""
+        variant = comparison_variant(kind, top)
+        shared = self._shared_chart(variant, kind, top)
+        if shared is None:
+            return False
+
+        if shared.file_id and await self._send_shared(message, shared, caption):
+            return True
+
+        # Загрузку нового графика делает один запрос, остальные ждут его file_id
+        lock = self._shared_locks.setdefault(variant, asyncio.Lock())
+        async with lock:
+            if shared.file_id and await self._send_shared(message, shared, caption):
+                return True
+
+            participants = shared.participants
+            path = await self._render(
+                CHART_COMPARISON,
+                shared.cache_key,
+                lambda: (visualization.render_comparison_chart, (participants,)),
+            )
+            if path is None:
+                return False
+
+            sent = await message.answer_photo(FSInputFile(path), caption=caption)
+            if sent.photo:
+                shared.file_id = sent.photo[-1].file_id
+                save_chart_file_id(
+                    SHARED_CHART_USER_ID, f"{CHART_COMPARISON}_{variant}", shared.cache_key, shared.file_id,
+                )
+        return True
+
+    async def _send_shared(self, message: Message, shared: _SharedChart, caption: str) -> bool:
+        try:
+            await message.answer_photo(shared.file_id, caption=caption)
+        except TelegramBadRequest:
+            logger.warning("file_id графика %s отклонен Telegram, загружаем файл заново", shared.cache_key)
+            shared.file_id = None
+            return False
+        metrics.inc("bot_chart_requests_total", chart_type=CHART_COMPARISON, source="file_id")
+        return True
+
+    async def _render(self, chart_type: str, cache_key: str, job: Callable[[], RenderJob | None]) -> str | None:
+        """Путь к PNG графика: из кэша на диске или после отрисовки в пуле."""
+        path = self.charts_dir / f"{cache_key}.png"
+        try:
+            # Отметка использования для LRU
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        else:
+            metrics.inc("bot_chart_requests_total", chart_type=chart_type, source="disk")
+            return str(path)
+
+        future = self._inflight.get(cache_key)
+        if future is None:
+            render_job = job()
+            if render_job is None:
+                return None
+            render, args = render_job
+            if self._executor is None:
+                self.start()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, render, *args, str(path))
+            self._inflight[cache_key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+            metrics.inc("bot_chart_requests_total", chart_type=chart_type, source="render")
+        else:
+            metrics.inc("bot_chart_requests_total", chart_type=chart_type, source="inflight")
+
+        # Отмена одного запроса не должна отменять отрисовку для остальных
+        result = await asyncio.shield(future)
+        self._evict()
+        return result
+
+    def _evict(self) -> None:
+        """Удаление давно не использованных PNG сверх cache_size."""
+        files = list(self.charts_dir.glob("*.png"))
+        if len(files) <= self.cache_size:
+            return
+        files.sort(key=_mtime)
+        for file in files[: len(files) - self.cache_size]:
+            file.unlink(missing_ok=True)
+
+
+# Глобальный экземпляр сервиса графиков
+chart_service = ChartService()
@@ -0,0 +1,248 @@
+"""Массовый импорт истории веса и активности из CSV.
+
+Файл читается построчно, строки проверяются по тем же правилам, что и ввод
+через /weight и /activity (utils/validation.py), и записываются пачками
+по import_batch_size строк. Каждая пачка - отдельная короткая транзакция
+в потоке (asyncio.to_thread): цикл событий продолжает обрабатывать
+обновления других пользователей, а блокировка записи SQLite не держится
+весь импорт. Вместе с записями обновляются снимки прогресса и дневные итоги
+активности; таблица лидеров подтягивает новые снимки по версии (sync).
+
+Формат файла (заголовок обязателен, разделитель - запятая или точка с запятой):
+
+    user_id,date,type,value
+    123456789,2024-01-15,weight,92.4
+    123456789,15.01.2024 19:30,walking,10500
+
+date - местное время notification_timezone (дата без времени - полдень),
+type - weight или имя типа активности (walking, running, cycling, cardio).
+Записи с теми же пользователем, временем и значением пропускаются, поэтому
+повторная загрузка файла не дублирует данные.
+"""
+
+import asyncio
+import csv
+import io
+import itertools
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import lru_cache
+from typing import BinaryIO
+
+import pytz
+from database.models import get_connection
+from database.queries import (
+    RECORD_DATE_FORMAT,
+    insert_activity_record_if_new,
+    insert_weight_record_if_new,
+    save_activity_summary,
+    save_user_progress,
+    select_activity_types,
+    select_registered_user_ids,
+)
+from pytz import BaseTzInfo
+from settings import settings
+
+import utils.messages as msg
+from utils.validation import (
+    ACTIVITY_MAX_VALUES,
+    WEIGHT_MAX_VALUE,
+    WEIGHT_MIN_VALUE,
+    is_valid_activity_value,
+    is_valid_weight,
+    parse_number,
+)
+from utils.weight_history import HISTORY_EPOCH
+
+logger = logging.getLogger(__name__)
+
+# Обязательные колонки файла
+IMPORT_COLUMNS = ("user_id", "date", "type", "value")
+IMPORT_WEIGHT_TYPE = "weight"
+
+# Форматы даты в файле; дата без времени считается полднем
+IMPORT_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M", "%Y-%m-%d", "%d.%m.%Y")
+IMPORT_DEFAULT_HOUR = 12
+
+# Сколько описаний ошибочных строк сохранять для отчета
+IMPORT_MAX_ERRORS_SHOWN = 10
+
+WeightRecord = tuple[int, float, str]  # ID пользователя, вес, дата
+ActivityRecord = tuple[int, int, float, float | None, str]  # ID пользователя, ID типа, значение, калории, дата
+
+
+@dataclass
+class ImportStats:
+    """Итоги импорта."""
+
+    rows: int = 0
+    weights: int = 0
+    activities: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, line: int, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS_SHOWN:
+            self.errors.append(msg.IMPORT_ROW_ERROR_SS.format(line, error))
+
+
+@lru_cache(maxsize=4096)
+def parse_import_date(text: str, tz: BaseTzInfo) -> tuple[str, str]:
+    """Дата из файла (местное время tz): дата записи в UTC и местный день (YYYY-MM-DD)."""
+    text = text.strip()
+    for date_format in IMPORT_DATE_FORMATS:
+        try:
+            local = datetime.strptime(text, date_format)  # noqa: DTZ007 - местное время tz
+        except ValueError:
+            continue
+        if "%H" not in date_format:
+            local = local.replace(hour=IMPORT_DEFAULT_HOUR)
+        record_date = tz.localize(local).astimezone(UTC).strftime(RECORD_DATE_FORMAT)
+        return record_date, local.date().isoformat()
+    error_msg = msg.IMPORT_INVALID_DATE_S.format(text)
+    raise ValueError(error_msg)
+
+
+class CsvImporter:
+    """Построчное чтение CSV и запись пачками.
+
+    Конструктор и import_batch обращаются к базе и должны вызываться в потоке.
+    """
+
+    def __init__(self, source: BinaryIO, batch_size: int | None = None) -> None:
+        self.batch_size = batch_size or settings.import_batch_size
+        self.stats = ImportStats()
+        self._tz = pytz.timezone(settings.notification_timezone)
+        self._now = datetime.now(UTC).strftime(RECORD_DATE_FORMAT)
+
+        text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        header = text.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        columns = [column.strip().lower() for column in next(csv.reader([header], delimiter=delimiter), [])]
+        missing = [column for column in IMPORT_COLUMNS if column not in columns]
+        if missing:
+            error_msg = msg.IMPORT_MISSING_COLUMNS_SS.format(", ".join(missing), ",".join(IMPORT_COLUMNS))
+            raise ValueError(error_msg)
+        self._indexes = [columns.index(column) for column in IMPORT_COLUMNS]
+        self._reader = csv.reader(text, delimiter=delimiter)
+
+        self._user_ids = select_registered_user_ids()
+        self._activity_types = select_activity_types()
+
+    def _parse_date(self, date_text: str) -> tuple[str, str]:
+        """Дата записи в UTC и местный день; даты в будущем и раньше начала истории веса отклоняются."""
+        record_date, day = parse_import_date(date_text, self._tz)
+        if record_date > self._now:
+            raise ValueError(msg.IMPORT_FUTURE_DATE_S.format(date_text))
+        if day < HISTORY_EPOCH.isoformat():
+            raise ValueError(msg.IMPORT_EARLY_DATE_SS.format(date_text, f"{HISTORY_EPOCH:%d.%m.%Y}"))
+        return record_date, day
+
+    def _parse_row(self, row: list[str], weights: list[WeightRecord], activities: list[tuple[ActivityRecord, str]]) -> None:
+        if len(row) < len(IMPORT_COLUMNS):
+            raise ValueError(msg.IMPORT_INVALID_ROW)
+        user_id_text, date_text, record_type, value_text = (row[index] for index in self._indexes)
+
+        try:
+            user_id = int(user_id_text)
+        except ValueError:
+            user_id = None
+        if user_id not in self._user_ids:
+            raise ValueError(msg.IMPORT_UNKNOWN_USER_S.format(user_id_text))
+
+        record_date, day = self._parse_date(date_text)
+
+        try:
+            value = parse_number(value_text)
+        except ValueError:
+            raise ValueError(msg.IMPORT_INVALID_VALUE_S.format(value_text)) from None
+
+        record_type = record_type.strip().lower()
+        if record_type == IMPORT_WEIGHT_TYPE:
+            if not is_valid_weight(value):
+                raise ValueError(msg.IMPORT_WEIGHT_RANGE_SSS.format(value, WEIGHT_MIN_VALUE, WEIGHT_MAX_VALUE))
+            weights.append((user_id, value, record_date))
+            return
+
+        activity_type = self._activity_types.get(record_type)
+        if activity_type is None:
+            raise ValueError(msg.IMPORT_UNKNOWN_TYPE_S.format(record_type))
+        if not is_valid_activity_value(record_type, value):
+            raise ValueError(msg.IMPORT_ACTIVITY_RANGE_SSS.format(value, record_type, ACTIVITY_MAX_VALUES[record_type]))
+        activity_type_id, calories_per_unit = activity_type
+        calories = value * calories_per_unit if calories_per_unit else None
+        activities.append(((user_id, activity_type_id, value, calories, record_date), day))
+
+    def import_batch(self) -> bool:
+        """Чтение, проверка и запись следующей пачки строк. Возвращает False, если файл прочитан."""
+        weights: list[WeightRecord] = []
+        activities: list[tuple[ActivityRecord, str]] = []
+        rows = 0
+        for row in itertools.islice(self._reader, self.batch_size):
+            rows += 1
+            if not any(cell.strip() for cell in row):
+                continue
+            self.stats.rows += 1
+            try:
+                self._parse_row(row, weights, activities)
+            except ValueError as e:
+                # Заголовок прочитан до csv.reader, поэтому номер строки файла на 1 больше
+                self.stats.add_error(self._reader.line_num + 1, str(e))
+        if not rows:
+            return False
+        if weights or activities:
+            self._write(weights, activities)
+        return True
+
+    def _write(self, weights: list[WeightRecord], activities: list[tuple[ActivityRecord, str]]) -> None:
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+
+            # Снимок прогресса пересчитывается по последнему весу пользователя в пачке
+            latest: dict[int, tuple[str, float]] = {}
+            for record in weights:
+                if not insert_weight_record_if_new(cursor, record):
+                    self.stats.duplicates += 1
+                    continue
+                self.stats.weights += 1
+                user_id, weight, record_date = record
+                if user_id not in latest or record_date >= latest[user_id][0]:
+                    latest[user_id] = (record_date, weight)
+            for user_id, (record_date, weight) in latest.items():
+                save_user_progress(cursor, user_id, weight, record_date)
+
+            for record, day in activities:
+                record_id = insert_activity_record_if_new(cursor, record)
+                if record_id is None:
+                    self.stats.duplicates += 1
+                    continue
+                self.stats.activities += 1
+                save_activity_summary(cursor, record_id, day)
+
+            conn.commit()
+        finally:
+            conn.close()
+
+
+async def import_csv(source: BinaryIO, on_progress: Callable[[ImportStats], Awaitable[None]]) -> ImportStats:
+    """Импорт файла пачками в потоке с вызовом on_progress после каждой пачки.
+
+    ValueError, если в файле нет обязательных колонок.
+    """
+    importer = await asyncio.to_thread(CsvImporter, source)
+    while await asyncio.to_thread(importer.import_batch):
+        await on_progress(importer.stats)
+    logger.info(
+        "Импорт CSV завершен: строк %s, весов %s, активностей %s, дубликатов %s, ошибок %s",
+        importer.stats.rows,
+        importer.stats.weights,
+        importer.stats.activities,
+        importer.stats.duplicates,
+        importer.stats.error_count,
+    )
+    return importer.stats
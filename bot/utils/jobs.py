@@ -0,0 +1,216 @@
+"""Очереди фоновых задач процесса бота.
+
+Тяжелая работа (отрисовка графиков, импорт CSV) не выполняется в обработчике:
+обработчик ставит задачу в именованную очередь и сразу возвращается, а
+результат пользователю отправляет сама задача. У каждой очереди свое число
+одновременно выполняемых задач (job_queues) и предельный размер
+(job_queue_max_size): если очередь заполнена, задача сразу отклоняется
+с QueueFullError, и пользователь получает ответ "попробуй позже" вместо
+ожидания. Внутри очереди задачи выполняются по приоритету (меньше - раньше),
+при равном приоритете - в порядке постановки.
+
+Статусы последних job_history_size задач хранятся для просмотра (/jobs).
+Глубина очередей, время ожидания и выполнения задач пишутся в метрики.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from settings import settings
+
+import utils.messages as msg
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Очереди задач
+QUEUE_CHARTS = "charts"
+QUEUE_IMPORT = "import"
+
+# Приоритеты задач (меньше - раньше)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# Статусы задач
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+class QueueFullError(Exception):
+    """Очередь заполнена, задача не принята."""
+
+
+@dataclass
+class Job:
+    """Задача в очереди и ее статус."""
+
+    id: int
+    queue: str
+    name: str
+    priority: int
+    run: Callable[[], Awaitable[Any]] = field(repr=False)
+    status: str = JOB_QUEUED
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+
+
+class JobQueue:
+    """Очередь с приоритетами, ограничением размера и числа одновременных задач."""
+
+    def __init__(self, name: str, concurrency: int, max_size: int) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.running = 0
+        self._queue: asyncio.PriorityQueue[tuple[int, int, Job]] = asyncio.PriorityQueue(max_size)
+        self._sequence = itertools.count()
+        self._workers: list[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            job.status = JOB_CANCELLED
+        self._report_depth()
+
+    def put(self, job: Job) -> None:
+        """Постановка задачи. QueueFullError, если очередь заполнена."""
+        try:
+            self._queue.put_nowait((job.priority, next(self._sequence), job))
+        except asyncio.QueueFull:
+            metrics.inc("bot_jobs_total", queue=self.name, status="rejected")
+            raise QueueFullError(self.name) from None
+        self._report_depth()
+
+    def _report_depth(self) -> None:
+        metrics.set("bot_job_queue_depth", self._queue.qsize(), queue=self.name)
+        metrics.set("bot_job_queue_running", self.running, queue=self.name)
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            self.running += 1
+            self._report_depth()
+            job.status = JOB_RUNNING
+            job.started_at = time.monotonic()
+            metrics.observe("bot_job_wait_seconds", job.started_at - job.enqueued_at, queue=self.name)
+            try:
+                await job.run()
+            except asyncio.CancelledError:
+                job.status = JOB_CANCELLED
+                raise
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = repr(e)
+                logger.exception("Задача %s (%s) в очереди %s завершилась ошибкой", job.id, job.name, self.name)
+            else:
+                job.status = JOB_DONE
+            finally:
+                job.finished_at = time.monotonic()
+                self.running -= 1
+                self._report_depth()
+                metrics.observe("bot_job_duration_seconds", job.finished_at - job.started_at, queue=self.name)
+                metrics.inc("bot_jobs_total", queue=self.name, status=job.status)
+
+
+class JobManager:
+    """Именованные очереди задач процесса."""
+
+    def __init__(self, queues: dict[str, int] | None = None, max_size: int | None = None) -> None:
+        self.max_size = max_size if max_size is not None else settings.job_queue_max_size
+        self._concurrency = queues if queues is not None else settings.job_queues
+        self._queues: dict[str, JobQueue] = {}
+        self._jobs: OrderedDict[int, Job] = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def start(self) -> None:
+        """Запуск обработчиков всех очередей (нужен работающий цикл событий)."""
+        for name in self._concurrency:
+            self._queue(name).start()
+
+    async def stop(self) -> None:
+        """Остановка обработчиков; задачи, ожидавшие в очередях, отменяются."""
+        for queue in self._queues.values():
+            await queue.stop()
+
+    def _queue(self, name: str) -> JobQueue:
+        queue = self._queues.get(name)
+        if queue is None:
+            if name not in self._concurrency:
+                error_msg = f"Неизвестная очередь задач: {name}"
+                raise ValueError(error_msg)
+            queue = self._queues[name] = JobQueue(name, self._concurrency[name], self.max_size)
+        return queue
+
+    def submit(
+        self,
+        queue_name: str,
+        name: str,
+        run: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_NORMAL,
+    ) -> Job:
+        """Постановка задачи в очередь. QueueFullError, если очередь заполнена."""
+        queue = self._queue(queue_name)
+        queue.start()
+        job = Job(next(self._ids), queue_name, name, priority, run)
+        queue.put(job)
+
+        self._jobs[job.id] = job
+        while len(self._jobs) > settings.job_history_size:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: int) -> Job | None:
+        """Задача по ID (если она еще в истории)."""
+        return self._jobs.get(job_id)
+
+    def queues(self) -> list[tuple[str, int, int, int]]:
+        """Состояние очередей: имя, ожидающих задач, выполняемых, предельный размер."""
+        return [(name, len(queue), queue.running, self.max_size) for name, queue in self._queues.items()]
+
+    def recent(self, limit: int) -> list[Job]:
+        """Последние limit задач, начиная с новых."""
+        return list(itertools.islice(reversed(self._jobs.values()), limit))
+
+
+def submit_or_reject(
+    message: Message,
+    queue_name: str,
+    name: str,
+    run: Callable[[], Awaitable[Any]],
+    priority: int = PRIORITY_NORMAL,
+) -> SendMessage | None:
+    """Постановка задачи из обработчика; если очередь заполнена - ответ пользователю."""
+    try:
+        job_manager.submit(queue_name, name, run, priority)
+    except QueueFullError:
+        logger.warning("Очередь %s заполнена, задача %s отклонена", queue_name, name)
+        return message.answer(msg.JOB_QUEUE_FULL)
+    return None
+
+
+# Глобальный менеджер очередей задач
+job_manager = JobManager()
@@ -0,0 +1,131 @@
+"""Таблица лидеров в памяти процесса.
+
+Участники упорядочены по очкам прогресса в SortedList. При старте таблица
+строится из снимков user_progress (очки в них уже посчитаны), а при новом
+весе пересчитывается и перемещается только запись этого участника. Место
+участника и топ-N находятся за O(log n).
+
+Изменения, сделанные другими воркерами, подтягиваются по версии снимка
+не чаще раза в sync_interval и только если базу меняли (PRAGMA data_version).
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from database.models import get_connection
+from database.queries import UserProgress, select_progress_changes
+from settings import settings
+from sortedcontainers import SortedList
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    """Позиция участника в таблице лидеров."""
+
+    user_id: int
+    current_point: float
+    target_point: float
+    lost_weight: float
+
+    @property
+    def sort_key(self) -> tuple[float, int]:
+        # По убыванию очков, при равенстве - по ID
+        return -self.current_point, self.user_id
+
+
+class Leaderboard:
+    """Участники, упорядоченные по очкам прогресса."""
+
+    def __init__(self, sync_interval: float | None = None) -> None:
+        self.sync_interval = sync_interval if sync_interval is not None else settings.leaderboard_sync_interval
+        self._ranking: SortedList[tuple[float, int]] = SortedList()
+        self._entries: dict[int, LeaderboardEntry] = {}
+        self._conn: sqlite3.Connection | None = None
+        self._version = -1
+        self._data_version = 0
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> None:
+        """Построение таблицы из снимков прогресса всех участников."""
+        if self._conn is None:
+            self._conn = get_connection()
+        self._ranking.clear()
+        self._entries.clear()
+        self._version = -1
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._checked_at = time.monotonic()
+        self._apply(select_progress_changes(self._conn.cursor()))
+        logger.info("Таблица лидеров построена: %s участников", len(self._entries))
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _apply(self, rows: list[tuple[int, float, float, float, int]]) -> None:
+        for user_id, current_point, target_point, lost_weight, version in rows:
+            self._version = max(self._version, version)
+            self._put(LeaderboardEntry(user_id, current_point, target_point, lost_weight))
+
+    def _put(self, entry: LeaderboardEntry) -> None:
+        old = self._entries.get(entry.user_id)
+        if old is not None:
+            self._ranking.remove(old.sort_key)
+        self._entries[entry.user_id] = entry
+        self._ranking.add(entry.sort_key)
+
+    def update(self, progress: UserProgress) -> None:
+        """Пересчет позиции участника после нового веса."""
+        if self._conn is None:
+            self.load()
+        self._put(LeaderboardEntry(progress.user_id, progress.current_point, progress.target_point, progress.lost_weight))
+
+    def sync(self) -> None:
+        """Подтягивание снимков, измененных другими воркерами."""
+        if self._conn is None:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.sync_interval:
+            return
+        self._checked_at = now
+
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        self._apply(select_progress_changes(self._conn.cursor(), self._version))
+
+    def top(self, limit: int) -> list[tuple[int, LeaderboardEntry]]:
+        """Первые limit участников с местами (при равных очках место общее)."""
+        self.sync()
+        result = []
+        for _, user_id in self._ranking.islice(0, limit):
+            entry = self._entries[user_id]
+            result.append((self._rank_of(entry), entry))
+        return result
+
+    def rank(self, user_id: int) -> tuple[int, LeaderboardEntry] | None:
+        """Место участника и его позиция или None, если у него нет записей веса."""
+        self.sync()
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        return self._rank_of(entry), entry
+
+    def _rank_of(self, entry: LeaderboardEntry) -> int:
+        return self._ranking.bisect_left((-entry.current_point,)) + 1
+
+
+# Глобальный экземпляр таблицы лидеров
+leaderboard = Leaderboard()
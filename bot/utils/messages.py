@@ -21,6 +21,8 @@ TARGET_WEIGHT_REQUEST_EXTRA = "Теперь введи свой целевой 
 BOT_STARTUP_DEV_MODE = "Запуск бота в режиме разработки (polling)..."
 BOT_STARTED_ON_HOST_PORT_SS = "Бот запущен на %s:%s"
 SHUTTING_DOWN = "Shutting down..."
+WORKER_STARTED_SSS = "Воркер %s (pid %s) запущен, роль: %s"
+WORKER_RESTARTING_SS = "Воркер %s завершился с кодом %s, перезапуск"
 INVALID_TARGET_WEIGHT_S = "Целевой вес должен быть меньше стартового веса. Введи снова:"
 REGISTRATION_SUCCESS_S = "Регистрация завершена! Добро пожаловать, {}!"
 REGISTRATION_FAILED = "Ошибка при регистрации. Попробуйте снова."
@@ -61,8 +63,17 @@ PROGRESS_NO_RECORDS = "ℹ️ Пока нет записей о текущем 
 PROGRESS_WEIGHT_LOST_TEXT_S = "✅ Сброшено: {:.2f} кг"
 PROGRESS_WEIGHT_GAINED_TEXT_S = "⚠️ Набрано: {:.2f} кг"
 PROGRESS_INFO_WITH_CHANGE_SSSSS = "📊 Прогресс участника {}:\n\n📈 Стартовый вес: {} кг\n📉 Текущий вес: {} кг\n🎯 Целевой вес: {} кг\n\n{}{}\n\n📅 Последнее обновление: {}"
+PROGRESS_POINTS_SS = "\n🏆 Очки прогресса: {:.2f} из {:.2f}"
+LEADERBOARD_TITLE = "🏆 Таблица лидеров по очкам прогресса:\n"
+LEADERBOARD_ROW_SSSS = "{}. {} - {:.2f} очк. ({:+.1f} кг)"
+LEADERBOARD_OWN_RANK_SSSS = "\n📍 Твое место: {} из {} - {:.2f} очк. из {:.2f}"
+LEADERBOARD_NOT_RANKED = "\nℹ️ Тебя пока нет в таблице. Используй команду /weight, чтобы добавить вес."
+LEADERBOARD_EMPTY = "🏆 В таблице лидеров пока никого нет. Используй команду /weight, чтобы добавить вес."
 PROGRESS_INFO_NO_RECORDS_SS = "📊 Прогресс участника {}:\n\n📈 Стартовый вес: {} кг\n🎯 Целевой вес: {} кг\n\nℹ️ Пока нет записей о текущем весе. Используй команду /weight, чтобы добавить."
 NO_ACTIVITIES_RECORDS = "📊 У тебя пока нет записей об активности. Используй команду /activity, чтобы добавить."
+ACTIVITIES_STATS_TITLE_S = "📊 Статистика активности за последние {} дней:"
+ACTIVITIES_STATS_ROW_SSSSSSS = "\n🏃 {}: {:.0f} {}\n   📅 Дней с активностью: {}, записей: {}\n   ⏱ Сегодня: {:.0f}\n   🔥 Калорий: {:.0f}"
+ACTIVITIES_STATS_CALORIES_S = "\n🔥 Всего сожжено калорий: {:.0f}"
 CHART_NO_DATA = "❌ Недостаточно данных для построения графика"
 CHART_CAPTION = "📊 Твой индивидуальный график прогресса"
 ACTIVITY_CHART_CAPTION = "📊 Твой график активности за последние 30 дней"
@@ -71,11 +82,56 @@ INVALID_ACTIVITY_SELECTION = "Пожалуйста, выбери тип акти
 INVALID_ACTIVITY_VALUE_INPUT = "Пожалуйста, введи корректное числовое значение."
 ACTIVITY_SELECTION_ERROR = "Произошла ошибка при выборе типа активности."
 COMPARISON_CHART_NO_DATA = "❌ Недостаточно данных для построения сравнительного графика"
+COMPARISON_CHART_CAPTION = "📊 Прогресс всех участников соревнования"
+COMPARISON_CHART_TOP_CAPTION_S = "🏆 Топ-{} участников по очкам прогресса"
+COMPARISON_CHART_ACTIVE_CAPTION = "📊 Прогресс участников, вносивших вес за последнюю неделю"
+COMPARISON_CHART_USAGE_S = "Используй /comparison, /comparison top N (N от 1 до {}) или /comparison active"
 TOTAL_ACTIVITY_CHART_NO_DATA = "❌ Недостаточно данных для построения сравнительного графика активности"
 
 # Сообщения для уведомлений
 WEIGHT_REMINDER = "⏰ Напоминание: Не забудь ввести сегодняшний вес! Используй команду /weight"
 ACTIVITY_REMINDER = "⏰ Напоминание: Не забудь ввести свою активность! Используй команду /activity"
+REMINDER_TIME_SET_S = "⏰ Напоминание о весе будет приходить в {}"
+REMINDER_TIME_RESET_S = "⏰ Напоминание о весе будет приходить в общее время ({})"
+REMINDER_TIME_DISABLED_S = "⏰ Персональное время напоминания отключено, напоминание о весе приходит в {}"
+REMINDER_TIME_USAGE = "Укажи время напоминания в формате ЧЧ:ММ, например /reminder 08:15, или /reminder off для общего времени"
+
+# Сообщения для импорта CSV (администратор)
+IMPORT_USAGE = (
+    "📥 Импорт истории: отправь CSV-файл с колонками user_id,date,type,value.\n"
+    "date - дата (ГГГГ-ММ-ДД или ДД.ММ.ГГГГ, можно со временем ЧЧ:ММ), "
+    "type - weight или тип активности (walking, running, cycling, cardio), value - значение."
+)
+IMPORT_NOT_CSV = "❌ Нужен файл с расширением .csv"
+IMPORT_FILE_TOO_LARGE_S = "❌ Файл больше {} МБ, раздели его на части"
+IMPORT_QUEUED = "🕒 Файл принят, импорт в очереди..."
+IMPORT_STARTED = "⏳ Импорт начат..."
+IMPORT_PROGRESS_SSSS = "⏳ Импорт: обработано строк {}, добавлено весов {}, активностей {}, ошибок {}"
+IMPORT_DONE_SSSSS = (
+    "✅ Импорт завершен за {:.1f} с\n"
+    "Строк: {}\nДобавлено весов: {}\nДобавлено активностей: {}\nУже были в базе: {}"
+)
+IMPORT_ERRORS_SS = "\n\n⚠️ Строк с ошибками: {} (пропущены)\n{}"
+IMPORT_FAILED_S = "❌ Импорт не выполнен: {}"
+IMPORT_ROW_ERROR_SS = "строка {}: {}"
+IMPORT_MISSING_COLUMNS_SS = "нет колонок {} (нужен заголовок {})"
+IMPORT_INVALID_ROW = "не хватает значений"
+IMPORT_UNKNOWN_USER_S = "пользователь {} не зарегистрирован"
+IMPORT_INVALID_DATE_S = "некорректная дата '{}'"
+IMPORT_FUTURE_DATE_S = "дата {} в будущем"
+IMPORT_EARLY_DATE_SS = "дата {} раньше {}"
+IMPORT_INVALID_VALUE_S = "некорректное значение '{}'"
+IMPORT_WEIGHT_RANGE_SSS = "вес {} вне диапазона от {} до {} кг"
+IMPORT_UNKNOWN_TYPE_S = "неизвестный тип '{}'"
+IMPORT_ACTIVITY_RANGE_SSS = "значение {} для {} вне диапазона от 0 до {}"
+
+# Сообщения фоновых задач
+JOB_QUEUE_FULL = "⏳ Сейчас слишком много запросов, попробуй через минуту"
+JOBS_QUEUES_HEADER = "⚙️ Очереди задач:"
+JOBS_QUEUE_SSSS = "{}: в очереди {} из {}, выполняется {}"
+JOBS_RECENT_HEADER = "\nПоследние задачи:"
+JOBS_RECENT_SSSS = "#{} {} ({}): {}"
+JOBS_EMPTY = "Задач еще не было"
 
 # Сообщения для тестовой команды
 TEST_BOT_WORKING = "✅ Бот работает!"
@@ -92,7 +148,10 @@ HELP_MESSAGE = (
     "/progress - отображение прогресса\n"
     "/chart - отображение графика прогресса\n"
     "/activity_chart - отображение графика активности\n"
+    "/comparison - сравнительный график участников\n"
+    "/leaderboard - таблица лидеров\n"
     "/activities - статистика активности\n"
+    "/reminder ЧЧ:ММ - персональное время напоминания о весе\n"
     "/test - тестовая команда\n"
     "/help - список команд"
 )
@@ -105,4 +164,8 @@ LOG_RECEIVED_ACTIVITY_VALUE_SS = "Получено значение активн
 LOG_USER_NOT_REGISTERED_S = "Пользователь %s не зарегистрирован"
 LOG_WEIGHT_SAVED_SS = "Вес %s кг успешно сохранен для пользователя %s"
 LOG_ACTIVITY_SAVED_SS = "Активность %s сохранена для пользователя %s"
+LOG_SLOW_UPDATE_SSSSSSSS = (
+    "Медленное обновление %s (%s): %.1f мс - до обработчика %.1f мс, обработчик %.1f мс, после %.1f мс; "
+    "запросов к базе %s, %.1f мс"
+)
 LOG_SHUTTING_DOWN = "Shutting down..."
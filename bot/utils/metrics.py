@@ -0,0 +1,176 @@
+"""Метрики процесса бота: гистограммы задержек, счетчики и трассировка обновлений.
+
+Метрики хранятся в памяти процесса и отдаются в текстовом формате Prometheus
+на маршруте /metrics веб-приложения. В режиме нескольких воркеров у каждого
+процесса свои значения.
+"""
+
+import bisect
+import contextvars
+import sqlite3
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+# Границы корзин гистограмм задержек, с
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин гистограммы числа запросов к базе за обновление
+DB_CALLS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (накопительная при выводе)."""
+
+    __slots__ = ("bounds", "buckets", "count", "sum")
+
+    def __init__(self, bounds: Iterable[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = [*labels, extra] if extra else list(labels)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса."""
+
+    def __init__(self) -> None:
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+        self._bounds: dict[str, tuple[float, ...]] = {}
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._gauges: dict[str, dict[Labels, float]] = {}
+
+    def observe(self, name: str, value: float, bounds: Iterable[float] = LATENCY_BUCKETS, **labels: Any) -> None:
+        """Добавление значения в гистограмму name."""
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self._bounds.setdefault(name, tuple(bounds)))
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Увеличение счетчика name."""
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        """Установка текущего значения name."""
+        self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        lines: list[str] = []
+        for name, series in self._histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip((*histogram.bounds, "+Inf"), histogram.buckets, strict=True):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for kind, metrics_of_kind in (("counter", self._counters), ("gauge", self._gauges)):
+            for name, values in metrics_of_kind.items():
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in values.items())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+async def metrics_handler(_request: web.Request) -> web.Response:
+    """Маршрут /metrics веб-приложения."""
+    return web.Response(text=metrics.render(), content_type="text/plain")
+
+
+@dataclass
+class UpdateTrace:
+    """Время этапов обработки одного обновления и запросы к базе во время него."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    router: str | None = None
+    handler: str | None = None
+    handler_started_at: float | None = None
+    handler_duration: float = 0.0
+    db_calls: int = 0
+    db_duration: float = 0.0
+
+
+# Трассировка текущего обновления (None вне обработки обновления)
+current_trace: contextvars.ContextVar[UpdateTrace | None] = contextvars.ContextVar("current_trace", default=None)
+
+
+def _traced(trace: UpdateTrace, started_at: float) -> None:
+    trace.db_calls += 1
+    trace.db_duration += time.perf_counter() - started_at
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Курсор, учитывающий запросы в трассировке текущего обновления."""
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        trace = current_trace.get()
+        if trace is None:
+            return super().execute(sql, parameters)
+        started_at = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _traced(trace, started_at)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any], /) -> sqlite3.Cursor:
+        trace = current_trace.get()
+        if trace is None:
+            return super().executemany(sql, seq_of_parameters)
+        started_at = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _traced(trace, started_at)
+
+
+class TracedConnection(sqlite3.Connection):
+    """Соединение SQLite, учитывающее запросы и коммиты в трассировке текущего обновления."""
+
+    def cursor(self, factory: type[sqlite3.Cursor] = TracedCursor) -> sqlite3.Cursor:  # type: ignore[override]
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any], /) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self) -> None:
+        trace = current_trace.get()
+        if trace is None:
+            super().commit()
+            return
+        started_at = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _traced(trace, started_at)
@@ -0,0 +1,56 @@
+"""Общая HTTP-сессия для всех исходящих запросов к Telegram Bot API."""
+
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.enums import ParseMode
+from settings import settings
+
+
+class KeepAliveSession(AiohttpSession):
+    """Сессия aiohttp с настраиваемым пулом соединений, keep-alive и кэшем DNS."""
+
+    def __init__(
+        self,
+        limit: int,
+        limit_per_host: int,
+        keepalive_timeout: float,
+        dns_cache_ttl: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+
+
+def create_session(api: TelegramAPIServer | None = None) -> KeepAliveSession:
+    """Создание сессии по настройкам приложения."""
+    if api is None:
+        api = TelegramAPIServer.from_base(settings.telegram_api_url) if settings.telegram_api_url else PRODUCTION
+    return KeepAliveSession(
+        api=api,
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        dns_cache_ttl=settings.http_dns_cache_ttl,
+        timeout=settings.http_timeout,
+    )
+
+
+def create_bot(session: AiohttpSession | None = None) -> Bot:
+    """Создание единственного экземпляра бота процесса.
+
+    Обработчики, рассылки и отправка графиков используют этот экземпляр,
+    а значит и один пул соединений.
+    """
+    return Bot(
+        token=settings.bot_token,
+        session=session or create_session(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
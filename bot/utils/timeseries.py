@@ -0,0 +1,117 @@
+"""Временные ряды веса и активности для графиков, прореженные под ширину графика.
+
+Длинная история (год ежедневных взвешиваний) не должна делать отрисовку
+медленной и график нечитаемым, поэтому ряд прореживается до max_points точек
+алгоритмом LTTB (Largest-Triangle-Three-Buckets), сохраняющим форму линии.
+
+Вес берется из кэша историй (utils.weight_history): по точке на день в
+упакованных массивах, LTTB работает по ним без копирования. Активность -
+дневные итоги за окно графика (не больше одной строки на день).
+
+max_points по умолчанию - одна точка на SERIES_POINT_SPACING_PX пикселей ширины
+графика (800x600, см. utils.visualization). Короткие ряды возвращаются целиком.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+
+from database.queries import select_activity_chart_data, select_weight_chart_state, select_weight_goals
+from pytz import BaseTzInfo
+
+from utils.visualization import FIGURE_DPI, FIGURE_SIZE
+from utils.weight_history import WEIGHT_SCALE, history_date, weight_history
+
+# Минимальное расстояние между точками ряда на графике, пикселей
+SERIES_POINT_SPACING_PX = 4
+SERIES_MAX_POINTS = int(FIGURE_SIZE[0] * FIGURE_DPI) // SERIES_POINT_SPACING_PX
+
+Series = list[tuple[str, float]]
+
+_EPOCH = datetime(1970, 1, 1)  # noqa: DTZ001
+
+
+def _x(point_date: str) -> float:
+    """Координата точки по оси времени: секунды от эпохи (даты рядов без часового пояса)."""
+    return (datetime.fromisoformat(point_date) - _EPOCH).total_seconds()
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """Индексы threshold точек ряда (xs по возрастанию), выбранных алгоритмом LTTB.
+
+    Первая и последняя точки сохраняются; из каждого из остальных threshold - 2
+    интервалов берется точка, образующая наибольший треугольник с выбранной
+    точкой предыдущего интервала и средней точкой следующего.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:  # noqa: PLR2004
+        return list(range(n))
+
+    indices = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    selected = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = max(min(int((bucket + 2) * bucket_size) + 1, n), end + 1)
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_y = sum(ys[end:next_end]) / (next_end - end)
+
+        ax, ay = xs[selected], ys[selected]
+        selected = max(
+            range(start, end),
+            key=lambda index: abs((ax - avg_x) * (ys[index] - ay) - (ax - xs[index]) * (avg_y - ay)),
+        )
+        indices.append(selected)
+
+    indices.append(n - 1)
+    return indices
+
+
+def lttb(points: Series, threshold: int) -> Series:
+    """Прореживание ряда (дата в ISO формате, значение) до threshold точек алгоритмом LTTB."""
+    if threshold >= len(points):
+        return list(points)
+    xs = [_x(point_date) for point_date, _ in points]
+    ys = [value for _, value in points]
+    return [points[index] for index in lttb_indices(xs, ys, threshold)]
+
+
+def weight_series(user_id: int, max_points: int = SERIES_MAX_POINTS) -> tuple[Series, float, float] | None:
+    """Вес пользователя по дням (не больше max_points точек), стартовый и целевой вес. None, если записей нет.
+
+    Ряд берется из кэша историй веса и прореживается по его массивам без копирования.
+    """
+    history = weight_history.get(user_id)
+    goals = select_weight_goals(user_id)
+    if history is None or goals is None:
+        return None
+
+    days, weights = history.view()
+    records = [
+        (history_date(days[index]).isoformat(), weights[index] / WEIGHT_SCALE)
+        for index in lttb_indices(days, weights, max_points)
+    ]
+    return records, *goals
+
+
+def weight_series_version(user_id: int) -> str | None:
+    """Версия ряда weight_series: последняя учтенная запись, число дней, стартовый и целевой вес.
+
+    Если кэш историй еще не видел последнюю запись пользователя в базе (ее сохранил
+    другой воркер до очередного sync), история перечитывается, поэтому версия
+    описывает те же данные, по которым будет нарисован график. None, если записей нет.
+    """
+    state = select_weight_chart_state(user_id)
+    if state is None:
+        return None
+    last_id, start_weight, target_weight = state
+    history = weight_history.get(user_id, last_id)
+    if history is None:
+        return None
+    return f"{history.last_id}-{len(history)}-{start_weight}-{target_weight}"
+
+
+def activity_series(user_id: int, tz: BaseTzInfo, days: int, max_points: int = SERIES_MAX_POINTS) -> Series:
+    """Шаги пользователя по дням за последние days дней (не больше max_points точек)."""
+    return lttb(select_activity_chart_data(user_id, tz, days), max_points)
@@ -0,0 +1,31 @@
+"""Допустимые диапазоны вводимых значений.
+
+Общие для ввода через /weight и /activity и массового импорта из CSV.
+"""
+
+# Диапазон веса, кг
+WEIGHT_MIN_VALUE = 30
+WEIGHT_MAX_VALUE = 300
+
+# Максимальные значения активности по типам (минимум - 0)
+ACTIVITY_MAX_VALUES = {
+    "walking": 50000,  # шагов
+    "running": 300,  # до 5 часов
+    "cycling": 200,  # до 200 км
+    "cardio": 2000,  # до 2000 ккал
+}
+
+
+def parse_number(text: str) -> float:
+    """Число из текста, запятая допускается как десятичный разделитель. ValueError, если это не число."""
+    return float(text.strip().replace(",", "."))
+
+
+def is_valid_weight(weight: float) -> bool:
+    return WEIGHT_MIN_VALUE <= weight <= WEIGHT_MAX_VALUE
+
+
+def is_valid_activity_value(activity_name: str, value: float) -> bool:
+    """Проверка значения активности. Для типов без ограничения допустимо любое значение."""
+    max_value = ACTIVITY_MAX_VALUES.get(activity_name)
+    return max_value is None or 0 <= value <= max_value
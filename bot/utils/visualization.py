@@ -0,0 +1,173 @@
+"""Построение графиков в PNG (выполняется в процессах пула графиков, см. utils.charts).
+
+Функции принимают только простые данные (строки и числа), чтобы их можно было
+передать в другой процесс, и сами записывают файл.
+"""
+
+import io
+import os
+import pathlib
+from datetime import date, datetime
+
+import matplotlib as mpl
+
+mpl.use("Agg")
+
+from matplotlib.dates import DateFormatter, DayLocator
+from matplotlib.figure import Figure
+
+# Размер изображения 800x600 пикселей
+FIGURE_SIZE = (8, 6)
+FIGURE_DPI = 100
+
+PROGRESS_COLOR = "#2e7d32"
+REGRESS_COLOR = "#c62828"
+LINE_COLOR = "#1565c0"
+TARGET_COLOR = "#ef6c00"
+
+# Границы диапазонов шагов для цвета столбцов и их цвета
+STEPS_RANGES = ((5000, "#ef9a9a"), (10000, "#ffcc80"))
+STEPS_HIGH_COLOR = "#a5d6a7"
+
+# Палитра участников сравнительного графика (повторяется по кругу)
+PARTICIPANT_COLORS = "tab20"
+# Число участников, после которого подписи уменьшаются
+COMPACT_LABELS_FROM = 15
+
+
+def _save(fig: Figure, path: str) -> None:
+    """Запись во временный файл и атомарная замена, чтобы не отдать недописанный PNG."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fig.savefig(tmp_path, format="png")
+    pathlib.Path(tmp_path).replace(path)
+
+
+def warm_up() -> None:
+    """Прогрев процесса: загрузка matplotlib, шрифтов и кэшей отрисовки."""
+    fig = Figure(figsize=(1, 1), dpi=FIGURE_DPI)
+    ax = fig.subplots()
+    ax.plot([0, 1], [0, 1])
+    ax.set_title("Прогрев")
+    fig.savefig(io.BytesIO(), format="png")
+
+
+def render_weight_chart(
+    records: list[tuple[str, float]],
+    start_weight: float,
+    target_weight: float,
+    path: str,
+) -> str:
+    """Индивидуальный график веса: записи по датам, стартовый и целевой вес, линия тренда.
+
+    :param records: (дата в ISO формате, вес) в порядке дат
+    :return: путь к файлу
+    """
+    dates = [datetime.fromisoformat(record_date) for record_date, _ in records]
+    weights = [weight for _, weight in records]
+
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    ax = fig.subplots()
+    ax.plot(dates, weights, color=LINE_COLOR, linewidth=2, zorder=1)
+
+    # Зеленые точки - вес ниже стартового, красные - выше
+    colors = [PROGRESS_COLOR if weight <= start_weight else REGRESS_COLOR for weight in weights]
+    ax.scatter(dates, weights, c=colors, s=40, zorder=2)
+
+    ax.axhline(start_weight, color="gray", linestyle="--", label=f"Старт: {start_weight} кг")
+    ax.axhline(target_weight, color=TARGET_COLOR, linestyle="--", label=f"Цель: {target_weight} кг")
+
+    # Линия тренда по методу наименьших квадратов
+    if len(records) > 1:
+        days = [(record_date - dates[0]).total_seconds() / 86400 for record_date in dates]
+        mean_x = sum(days) / len(days)
+        mean_y = sum(weights) / len(weights)
+        variance = sum((x - mean_x) ** 2 for x in days)
+        if variance:
+            slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(days, weights, strict=True)) / variance
+            trend = [mean_y + slope * (x - mean_x) for x in days]
+            ax.plot(dates, trend, color="gray", linewidth=1, alpha=0.7, label="Тренд")
+
+    ax.set_title("Прогресс веса")
+    ax.set_ylabel("Вес, кг")
+    ax.xaxis.set_major_formatter(DateFormatter("%d.%m"))
+    ax.grid(visible=True, alpha=0.3)
+    ax.legend(loc="best")
+    fig.autofmt_xdate()
+    fig.tight_layout()
+
+    _save(fig, path)
+    return path
+
+
+def render_activity_chart(days: list[tuple[str, float]], path: str) -> str:
+    """Гистограмма шагов по дням.
+
+    :param days: (дата в ISO формате, шаги) в порядке дат
+    :return: путь к файлу
+    """
+    dates = [date.fromisoformat(day) for day, _ in days]
+    steps = [value for _, value in days]
+
+    def color(value: float) -> str:
+        for limit, range_color in STEPS_RANGES:
+            if value < limit:
+                return range_color
+        return STEPS_HIGH_COLOR
+
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    ax = fig.subplots()
+    ax.bar(dates, steps, color=[color(value) for value in steps], edgecolor="gray", linewidth=0.5)
+
+    ax.set_title("Шаги по дням")
+    ax.set_ylabel("Шаги")
+    # Подписи только целых дней, не больше десяти
+    ax.xaxis.set_major_locator(DayLocator(interval=max(1, len(dates) // 10)))
+    ax.xaxis.set_major_formatter(DateFormatter("%d.%m"))
+    ax.grid(visible=True, axis="y", alpha=0.3)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+
+    _save(fig, path)
+    return path
+
+
+def render_comparison_chart(participants: list[tuple[str, float, float, float]], path: str) -> str:
+    """Сравнительный график: позиция каждого участника на его шкале прогресса.
+
+    :param participants: (имя, очки, целевые очки, сброшено кг) в порядке места
+    :return: путь к файлу
+    """
+    palette = mpl.colormaps[PARTICIPANT_COLORS]
+    # Первое место сверху
+    rows = range(len(participants), 0, -1)
+
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    ax = fig.subplots()
+    font_size = 9 if len(participants) <= COMPACT_LABELS_FROM else 7
+
+    for index, (row, (_, points, target_points, lost_weight)) in enumerate(zip(rows, participants, strict=True)):
+        color = palette(index % palette.N)
+        ax.plot([0, target_points], [row, row], color=color, alpha=0.25, linewidth=1)
+        # Цель участника - вертикальная черта на его позиции шкалы
+        ax.scatter(target_points, row, marker="|", s=200, color=color)
+        ax.scatter(points, row, s=80, color=color, edgecolors="black", linewidths=0.5, zorder=3)
+        ax.annotate(
+            f"{-lost_weight:+.1f} кг",
+            (points, row),
+            textcoords="offset points",
+            xytext=(0, 7),
+            ha="center",
+            fontsize=font_size,
+            color=PROGRESS_COLOR if lost_weight >= 0 else REGRESS_COLOR,
+        )
+
+    ax.axvline(0, color="gray", linewidth=1)
+    ax.set_yticks(list(rows), [name for name, *_ in participants], fontsize=font_size)
+    ax.set_ylim(0.3, len(participants) + 0.9)
+    ax.set_title("Прогресс участников")
+    ax.set_xlabel("Прогресс, очки")
+    ax.grid(visible=True, axis="x", alpha=0.3)
+    fig.tight_layout()
+
+    _save(fig, path)
+    return path
@@ -0,0 +1,218 @@
+"""История веса пользователей в памяти процесса.
+
+История пользователя хранится одним упакованным массивом array('H'), в котором
+чередуются день (от HISTORY_EPOCH в часовом поясе уведомлений) и вес в сотых
+долях килограмма, по одной точке на день - последняя запись местного дня
+(витрина ETL делит записи по дням UTC, поэтому записи около полуночи могут
+попасть в другой день). Это 4 байта на день вместо кортежа из строки и float
+и около 130 байт на пользователя: 20 тысяч историй по 30 дней занимают около
+5 МБ, по 90 дней - около 10 МБ. Число пользователей ограничено LRU
+(weight_history_cache_size).
+
+История загружается из базы при первом обращении, а новые записи
+дописываются: в этом процессе - сразу при сохранении веса (append), записи
+других воркеров и импорта CSV - по ID записи не чаще раза в sync_interval.
+Запись за более ранний день, чем последний в истории (импорт старых данных),
+сбрасывает историю пользователя, и она перечитывается при следующем обращении.
+
+Чтение не копирует данные: WeightHistory.view возвращает memoryview на массив
+(дни и вес - срезы с шагом 2). Если при дописывании на массив есть открытые
+memoryview, массив копируется, и читатели продолжают видеть прежнюю версию.
+"""
+
+import logging
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import UTC, date, datetime
+
+import pytz
+from database.queries import select_last_weight_record_id, select_weight_history, select_weight_records_after
+from settings import settings
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Начало отсчета дней истории; array('H') вмещает 65535 дней (до 2179 года).
+# Записи за дни вне этого диапазона в историю не попадают
+HISTORY_EPOCH = date(2000, 1, 1)
+HISTORY_MAX_DAY = 2**16 - 1
+
+# Вес хранится в сотых долях килограмма, array('H') вмещает до 655.35 кг
+WEIGHT_SCALE = 100
+HISTORY_MAX_WEIGHT = HISTORY_MAX_DAY / WEIGHT_SCALE
+
+
+def history_day(day: date) -> int:
+    return (day - HISTORY_EPOCH).days
+
+
+def history_date(day: int) -> date:
+    return date.fromordinal(HISTORY_EPOCH.toordinal() + day)
+
+
+class WeightHistory:
+    """Вес пользователя по дням: упакованный массив пар (день, вес в сотых кг)."""
+
+    __slots__ = ("last_id", "points")
+
+    def __init__(self) -> None:
+        self.points = array("H")
+        self.last_id = 0  # ID последней учтенной записи веса
+
+    def __len__(self) -> int:
+        return len(self.points) // 2
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.points)
+
+    def add(self, record_id: int, day: int, weight: float) -> bool:
+        """Учет записи веса. False, если она раньше последнего дня истории (историю нужно перечитать)."""
+        if record_id <= self.last_id:
+            return True
+        if self.points and day < self.points[-2]:
+            return False
+        self.last_id = record_id
+        try:
+            self.put(day, weight)
+        except BufferError:
+            # На массив есть открытые memoryview: дописываем в копию
+            self.points = array("H", self.points)
+            self.put(day, weight)
+        return True
+
+    def put(self, day: int, weight: float) -> None:
+        """Добавление веса за день не раньше последнего (за тот же день - замена)."""
+        value = round(weight * WEIGHT_SCALE)
+        if self.points and self.points[-2] == day:
+            self.points[-1] = value
+        else:
+            self.points.extend((day, value))
+
+    def compact(self) -> None:
+        """Освобождение запаса памяти, выделенного массивом при дописывании."""
+        self.points = array("H", self.points)
+
+    def view(self, since: date | None = None) -> tuple[memoryview, memoryview]:
+        """Дни и вес в сотых кг (WEIGHT_SCALE) начиная с дня since (все, если None) без копирования."""
+        points = memoryview(self.points)
+        days = points[::2]
+        start = bisect_left(days, history_day(since)) if since is not None else 0
+        return days[start:], points[2 * start + 1::2]
+
+
+class WeightHistoryCache:
+    """Истории веса пользователей с вытеснением по LRU."""
+
+    def __init__(self, max_users: int | None = None, sync_interval: float | None = None) -> None:
+        self.max_users = max_users if max_users is not None else settings.weight_history_cache_size
+        self.sync_interval = sync_interval if sync_interval is not None else settings.weight_history_sync_interval
+        self.tz = pytz.timezone(settings.notification_timezone)
+        self._entries: OrderedDict[int, WeightHistory] = OrderedDict()
+        self._nbytes = 0
+        self._last_id: int | None = None
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def memory_usage(self) -> int:
+        """Память, занятая историями (объекты и массивы), байт."""
+        return self._nbytes
+
+    def _day(self, record_id: int, record_date: str, weight: float) -> int | None:
+        """День истории записи веса или None, если день или вес вне диапазона истории."""
+        # То же, что record_local_day, но без strptime: разбор даты - основная часть загрузки истории
+        day = history_day(datetime.fromisoformat(record_date).replace(tzinfo=UTC).astimezone(self.tz).date())
+        if not 0 <= day <= HISTORY_MAX_DAY or not 0 <= weight <= HISTORY_MAX_WEIGHT:
+            logger.warning("Запись веса %s (%s за %s) вне диапазона истории, пропущена", record_id, weight, record_date)
+            return None
+        return day
+
+    def get(self, user_id: int, last_id: int = 0) -> WeightHistory | None:
+        """История пользователя (загружается при промахе) или None, если записей веса нет.
+
+        last_id - ID последней записи веса пользователя, если он уже известен (например,
+        из версии графика): история, которая еще не дошла до него, перечитывается.
+        """
+        self.sync()
+        history = self._entries.get(user_id)
+        if history is not None and history.last_id >= last_id:
+            self._entries.move_to_end(user_id)
+            metrics.inc("bot_weight_history_requests_total", source="cache")
+            return history
+        if history is not None:
+            del self._entries[user_id]
+            self._nbytes -= history.nbytes
+
+        metrics.inc("bot_weight_history_requests_total", source="db")
+        history = WeightHistory()
+        for record_id, record_date, weight in select_weight_history(user_id):
+            history.last_id = max(history.last_id, record_id)
+            day = self._day(record_id, record_date, weight)
+            if day is not None:
+                history.put(day, weight)
+        if not history:
+            self._report()
+            return None
+        history.compact()
+
+        self._entries[user_id] = history
+        self._nbytes += history.nbytes
+        while len(self._entries) > self.max_users:
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+        self._report()
+        return history
+
+    def append(self, user_id: int, record_id: int, record_date: str, weight: float) -> None:
+        """Дописывание сохраненной записи веса в историю пользователя, если она в кэше."""
+        history = self._entries.get(user_id)
+        if history is None:
+            return
+        day = self._day(record_id, record_date, weight)
+        if day is None:
+            # Запись учтена, чтобы get не перечитывал историю из-за нее
+            history.last_id = max(history.last_id, record_id)
+            return
+        before = history.nbytes
+        if history.add(record_id, day, weight):
+            self._nbytes += history.nbytes - before
+        else:
+            logger.debug("Запись веса %s раньше истории пользователя %s, история будет перечитана", record_id, user_id)
+            del self._entries[user_id]
+            self._nbytes -= before
+        self._report()
+
+    def sync(self) -> None:
+        """Дописывание записей веса, добавленных другими воркерами и импортом."""
+        now = time.monotonic()
+        if self._last_id is not None and now - self._checked_at < self.sync_interval:
+            return
+        self._checked_at = now
+
+        if self._last_id is None:
+            self._last_id = select_last_weight_record_id()
+            return
+        records = select_weight_records_after(self._last_id)
+        for record_id, user_id, record_date, weight in records:
+            self.append(user_id, record_id, record_date, weight)
+        if records:
+            self._last_id = records[-1][0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+        self._report()
+
+    def _report(self) -> None:
+        metrics.set("bot_weight_history_cache_users", len(self._entries))
+        metrics.set("bot_weight_history_cache_bytes", self._nbytes)
+
+
+# Глобальный кэш историй веса
+weight_history = WeightHistoryCache()
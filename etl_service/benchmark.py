@@ -0,0 +1,178 @@
+"""Бенчмарк функций расчета прогресса (calculations.py).
+
+Эквивалентность оптимизированных функций исходной формуле и копии бота
+проверяют тесты (tests/test_calculations.py).
+
+Бенчмарк вызывает каждую функцию для случайной когорты пользователей каждого
+размера и берет лучшее из нескольких повторов. Время включает накладные
+расходы цикла и вызова, поэтому сравнивать имеет смысл только запуски
+на одной машине и одной версии Python. Результаты (нс/вызов и вызовов/с)
+сравниваются с базовой линией в JSON: если функция стала медленнее больше
+чем на порог, скрипт завершается с кодом 1.
+
+Запуск из каталога etl_service:
+
+    python benchmark.py --update-baseline             # записать базовую линию
+    python benchmark.py --threshold 0.2               # сравнить с ней
+    python benchmark.py --sizes 1000,10000
+"""
+
+import argparse
+import json
+import logging
+import pathlib
+import platform
+import random
+import sys
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from calculations import (
+    calculate_adjusted_percentage,
+    calculate_bmi,
+    calculate_current_point,
+    calculate_point,
+    calculate_progress_constants,
+    calculate_progress_points,
+    calculate_target_point,
+    get_weight_factor,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE_PATH = pathlib.Path(__file__).parent / "benchmark_baseline.json"
+DEFAULT_SIZES = (10**3, 10**4, 10**5, 10**6)
+
+Profile = tuple[float, float, float, float]  # стартовый вес, рост, целевой вес, текущий вес
+
+
+def random_profile(rng: random.Random) -> Profile:
+    """Случайный правдоподобный профиль: ИМТ 18-50, цель ниже старта, текущий вес около пути к цели."""
+    height = rng.uniform(145, 205)
+    start_weight = round(rng.uniform(18, 50) * (height / 100) ** 2, 1)
+    target_weight = round(start_weight * rng.uniform(0.7, 0.98), 1)
+    current_weight = round(rng.uniform(target_weight - 5, start_weight + 5), 1)
+    return start_weight, height, target_weight, current_weight
+
+
+def _best_time_ns(func: Callable[..., Any], args_list: list[tuple[Any, ...]], repeat: int) -> int:
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter_ns()
+        for args in args_list:
+            func(*args)
+        elapsed = time.perf_counter_ns() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best or 1
+
+
+def _benchmark_cases(cohort: list[Profile]) -> Iterator[tuple[str, Callable[..., Any], list[tuple[Any, ...]]]]:
+    # Аргументы каждой функции строятся перед ее замером, чтобы когорта
+    # в 10**6 пользователей не держала в памяти все списки сразу
+    yield "calculate_bmi", calculate_bmi, [(current, height) for _, height, _, current in cohort]
+    yield "get_weight_factor", get_weight_factor, [(calculate_bmi(start, height),) for start, height, _, _ in cohort]
+    yield (
+        "calculate_progress_points",
+        calculate_progress_points,
+        [(start, current, height, target) for start, height, target, current in cohort],
+    )
+    yield (
+        "calculate_adjusted_percentage",
+        calculate_adjusted_percentage,
+        [(start, current, height) for start, height, _, current in cohort],
+    )
+    yield "calculate_target_point", calculate_target_point, [(start, height, target) for start, height, target, _ in cohort]
+    yield (
+        "calculate_current_point",
+        calculate_current_point,
+        [(start, current, height, target) for start, height, target, current in cohort],
+    )
+    yield (
+        "calculate_progress_constants",
+        calculate_progress_constants,
+        [(start, height, target) for start, height, target, _ in cohort],
+    )
+    yield (
+        "calculate_point",
+        calculate_point,
+        [(calculate_progress_constants(start, height, target), current) for start, height, target, current in cohort],
+    )
+
+
+def run_benchmarks(sizes: list[int], repeat: int, seed: int) -> dict[str, dict[str, float]]:
+    """Замер нс/вызов и вызовов/с для каждой функции и размера когорты."""
+    results = {}
+    for size in sizes:
+        rng = random.Random(seed + size)  # noqa: S311
+        cohort = [random_profile(rng) for _ in range(size)]
+        for name, func, args_list in _benchmark_cases(cohort):
+            elapsed = _best_time_ns(func, args_list, repeat)
+            ns_per_call = elapsed / size
+            results[f"{name}/{size}"] = {"ns_per_call": round(ns_per_call, 2), "calls_per_s": round(1e9 / ns_per_call)}
+            logger.info("%-32s %9s  %10.1f нс/вызов  %12.0f вызовов/с", name, size, ns_per_call, 1e9 / ns_per_call)
+    return results
+
+
+def compare_with_baseline(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, Any],
+    threshold: float,
+) -> list[str]:
+    """Функции, ставшие медленнее базовой линии больше чем на threshold."""
+    if baseline.get("python") != platform.python_version():
+        logger.warning("Базовая линия записана на Python %s, сейчас %s: сравнение приблизительное",
+                       baseline.get("python"), platform.python_version())
+
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        change = result["ns_per_call"] / base["ns_per_call"] - 1
+        if change > threshold:
+            regressions.append(
+                f"{key}: {base['ns_per_call']:.1f} -> {result['ns_per_call']:.1f} нс/вызов (+{change:.0%})",
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк расчета прогресса")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="размеры когорт через запятую",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов замера (берется лучший)")
+    parser.add_argument("--seed", type=int, default=20240101, help="seed генератора профилей")
+    parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE_PATH, help="файл базовой линии")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление (0.2 - на 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты как базовую линию")
+    args = parser.parse_args()
+
+    results = run_benchmarks([int(size) for size in args.sizes.split(",")], args.repeat, args.seed)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(
+            {"python": platform.python_version(), "machine": platform.machine(), "results": results},
+            indent=2,
+            ensure_ascii=False,
+        ))
+        logger.info("Базовая линия записана в %s", args.baseline)
+        return 0
+
+    if not args.baseline.exists():
+        logger.warning("Базовая линия %s не найдена, запустите с --update-baseline", args.baseline)
+        return 0
+
+    regressions = compare_with_baseline(results, json.loads(args.baseline.read_text()), args.threshold)
+    for regression in regressions:
+        logger.error("Замедление: %s", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    import config  # noqa: F401 - настройка логирования
+
+    sys.exit(main())
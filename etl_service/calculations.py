@@ -2,6 +2,11 @@
 
 from dataclasses import dataclass
 
+# Версия формулы очков прогресса (как в боте, bot/utils/calculations.py). При изменении
+# расчета ее нужно увеличить: ETL полностью пересчитает историю прогресса
+# (user_progress_history), а бот - сохраненные константы пользователей.
+FORMULA_VERSION = 1
+
 
 def calculate_bmi(weight: float, height: float) -> float:
     """Рассчитывает ИМТ (индекс массы тела).
@@ -54,8 +59,9 @@ def calculate_progress_points(start_weight: float, current_weight: float, height
     _weight_factor = get_weight_factor(initial_bmi)
 
     # Рассчитываем адаптивный фактор для шкалы прогресса
-    current_bmi_diff = abs(current_bmi - calculate_bmi(target_weight, height))
-    initial_bmi_diff = abs(initial_bmi - calculate_bmi(target_weight, height))
+    target_bmi = calculate_bmi(target_weight, height)
+    current_bmi_diff = abs(current_bmi - target_bmi)
+    initial_bmi_diff = abs(initial_bmi - target_bmi)
 
     adaptive_factor = max(0.5, 1.0 - (current_bmi_diff / initial_bmi_diff if initial_bmi_diff != 0 else 1.0))
 
@@ -142,3 +148,77 @@ def calculate_current_point(start_weight: float, current_weight: float, height:
     :return: текущее количество условных пунктов прогресса
     """
     return calculate_progress_points(start_weight, current_weight, height, target_weight)
+
+
+@dataclass(frozen=True)
+class ProgressConstants:
+    """Величины расчета прогресса, зависящие только от профиля пользователя.
+
+    Считаются один раз при регистрации (calculate_progress_constants) и хранятся
+    в таблице users вместе с версией формулы FORMULA_VERSION.
+    """
+
+    start_weight: float
+    height_m_squared: float  # квадрат роста в метрах
+    initial_bmi: float
+    target_bmi: float
+    weight_factor: float
+    target_point: float
+
+    @property
+    def initial_bmi_diff(self) -> float:
+        return abs(self.initial_bmi - self.target_bmi)
+
+    @classmethod
+    def from_stored(
+        cls,
+        start_weight: float,
+        height: float,
+        stored: tuple[float, float, float, float],
+    ) -> "ProgressConstants":
+        """Константы из сохраненных значений пользователя (initial_bmi, target_bmi, weight_factor, target_point)."""
+        return cls(start_weight, (height / 100) ** 2, *stored)
+
+
+def calculate_progress_constants(start_weight: float, height: float, target_weight: float) -> ProgressConstants:
+    """Рассчитывает константы прогресса пользователя.
+
+    :param start_weight: начальный вес
+    :param height: рост
+    :param target_weight: целевой вес
+    :return: константы прогресса
+    """
+    initial_bmi = calculate_bmi(start_weight, height)
+    return ProgressConstants(
+        start_weight=start_weight,
+        height_m_squared=(height / 100) ** 2,
+        initial_bmi=initial_bmi,
+        target_bmi=calculate_bmi(target_weight, height),
+        weight_factor=get_weight_factor(initial_bmi),
+        target_point=calculate_target_point(start_weight, height, target_weight),
+    )
+
+
+def calculate_point(constants: ProgressConstants, current_weight: float) -> float:
+    """Рассчитывает текущий прогресс по константам пользователя.
+
+    Результат совпадает с calculate_current_point для того же профиля.
+
+    :param constants: константы прогресса пользователя
+    :param current_weight: текущий вес
+    :return: текущее количество условных пунктов прогресса
+    """
+    initial_bmi_diff = constants.initial_bmi_diff
+    current_bmi_diff = abs(current_weight / constants.height_m_squared - constants.target_bmi)
+    adaptive_factor = max(0.5, 1.0 - (current_bmi_diff / initial_bmi_diff if initial_bmi_diff != 0 else 1.0))
+    return (constants.start_weight - current_weight) * adaptive_factor
+
+
+def calculate_points_series(constants: ProgressConstants, weights: list[float]) -> list[float]:
+    """Рассчитывает очки прогресса для ряда весов одного пользователя.
+
+    :param constants: константы прогресса пользователя
+    :param weights: веса в порядке дат
+    :return: очки прогресса для каждого веса
+    """
+    return [calculate_point(constants, weight) for weight in weights]
@@ -18,6 +18,17 @@ class ETLSettings(BaseSettings):
     # Интервал выполнения ETL в минутах
     interval_minutes: int = Field(3, description="Интервал выполнения ETL в минутах")
 
+    # Полный пересчет истории прогресса при следующем запуске ETL
+    recompute_history: bool = Field(default=False, description="Полностью пересчитать историю прогресса")
+
+    # Интервал сверки витрины с базой бота по контрольным суммам партиций в минутах (0 - не сверять)
+    reconcile_interval_minutes: int = Field(60, description="Интервал сверки витрины с базой бота в минутах")
+
+    # Выгрузка витрины в Parquet после ETL
+    export_enabled: bool = Field(default=True, description="Выгружать витрину в Parquet")
+    export_dir: pathlib.Path = base_path / "../data/parquet"
+    export_batch_size: int = Field(10000, description="Строк в пачке курсора и группе строк Parquet")
+
     # Минимальный уровень логирования
     log_min_level: str = Field("INFO", description="Уровень логирования (DEBUG, INFO, WARNING, ERROR)")
 
@@ -52,6 +52,15 @@ CREATE_INDEX_ACTIVITY_DATA_USER_DATE = """
     CREATE INDEX IF NOT EXISTS idx_activity_data_user_date ON activity_data (user_id, date)
 """
 
+# Индексы по дате для выгрузки в Parquet по месяцам
+CREATE_INDEX_WEIGHT_DATA_DATE = """
+    CREATE INDEX IF NOT EXISTS idx_weight_data_date ON weight_data (date)
+"""
+
+CREATE_INDEX_ACTIVITY_DATA_DATE = """
+    CREATE INDEX IF NOT EXISTS idx_activity_data_date ON activity_data (date)
+"""
+
 CREATE_TABLE_USER_PROGRESS = """
     CREATE TABLE IF NOT EXISTS user_progress (
         user_id BIGINT PRIMARY KEY,
@@ -66,6 +75,26 @@ CREATE_INDEX_USER_PROGRESS_USER = """
     CREATE INDEX IF NOT EXISTS idx_user_progress_user ON user_progress (user_id)
 """
 
+CREATE_TABLE_USER_PROGRESS_HISTORY = """
+    CREATE TABLE IF NOT EXISTS user_progress_history (
+        user_id BIGINT NOT NULL,
+        date DATE NOT NULL,
+        weight DECIMAL(5,1) NOT NULL,
+        current_point DECIMAL(10,4) NOT NULL,
+        lost_weight DECIMAL(10,4) NOT NULL,
+        PRIMARY KEY (user_id, date),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+"""
+
+# Служебные значения ETL (версия формулы, последняя учтенная запись веса)
+CREATE_TABLE_ETL_META = """
+    CREATE TABLE IF NOT EXISTS etl_meta (
+        key VARCHAR(255) PRIMARY KEY,
+        value VARCHAR(255) NOT NULL
+    )
+"""
+
 
 # Список всех DDL команд для инициализации
 ALL_DDL_COMMANDS: list[str] = [
@@ -74,7 +103,11 @@ ALL_DDL_COMMANDS: list[str] = [
     CREATE_TABLE_WEIGHT_DATA,
     CREATE_TABLE_ACTIVITY_DATA,
     CREATE_TABLE_USER_PROGRESS,
+    CREATE_TABLE_USER_PROGRESS_HISTORY,
+    CREATE_TABLE_ETL_META,
     CREATE_INDEX_WEIGHT_DATA_USER_DATE,
     CREATE_INDEX_ACTIVITY_DATA_USER_DATE,
+    CREATE_INDEX_WEIGHT_DATA_DATE,
+    CREATE_INDEX_ACTIVITY_DATA_DATE,
     CREATE_INDEX_USER_PROGRESS_USER,
 ]
@@ -3,16 +3,73 @@
 import logging
 import sqlite3
 import typing
-from datetime import date
+from datetime import UTC, date, datetime, timedelta
 from decimal import Decimal
 
 import asyncpg
 from config import etl_settings
-from calculations import calculate_current_point, calculate_target_point
-from models import Activity, ActivityData, User, UserProgress, WeightData
+from calculations import (
+    FORMULA_VERSION,
+    ProgressConstants,
+    calculate_point,
+    calculate_points_series,
+    calculate_progress_constants,
+)
+from models import Activity, ActivityData, User, UserProgress, UserProgressHistory, WeightData
+from parquet_export import (
+    ACTIVITY_DATA_EXPORT,
+    EXPORT_FORMAT_VERSION,
+    WEIGHT_DATA_EXPORT,
+    ParquetExporter,
+    month_start,
+)
+from reconciliation import (
+    ACTIVITY_DATA_RECONCILED,
+    ACTIVITY_SOURCE_ROWS,
+    WEIGHT_DATA_RECONCILED,
+    WEIGHT_SOURCE_ROWS,
+    Reconciler,
+    mart_decimal,
+)
 
 logger = logging.getLogger(__name__)
 
+# Ключи etl_meta для истории прогресса
+HISTORY_FORMULA_VERSION_KEY = "progress_history_formula_version"
+HISTORY_LAST_WEIGHT_ID_KEY = "progress_history_last_weight_id"
+
+# Ключ etl_meta с версией формата выгрузки в Parquet
+PARQUET_EXPORT_VERSION_KEY = "parquet_export_format_version"
+
+# Префикс ключей etl_meta с месяцами, которые нужно перевыгрузить в Parquet:
+# {префикс}:{таблица}:{YYYY-MM}, значение - время отметки
+PARQUET_EXPORT_DIRTY_KEY = "parquet_export_dirty"
+
+# Ключ etl_meta со временем последней сверки витрины с базой бота
+RECONCILE_LAST_RUN_KEY = "reconcile_last_run"
+
+# Ключи etl_meta с ID последних загруженных записей базы бота
+LOAD_LAST_WEIGHT_RECORD_ID_KEY = "load_last_weight_record_id"
+LOAD_LAST_ACTIVITY_RECORD_ID_KEY = "load_last_activity_record_id"
+
+# Фильтры записей базы бота по дням, в которых есть записи с ID в диапазоне (?1, ?2]
+WEIGHT_NEW_DAYS_FILTER = """
+    (user_id, substr(record_date, 1, 10)) IN (
+        SELECT user_id, substr(record_date, 1, 10) FROM weight_records WHERE id > ?1 AND id <= ?2
+    )
+"""
+ACTIVITY_NEW_DAYS_FILTER = """
+    (user_id, activity_type_id, substr(record_date, 1, 10)) IN (
+        SELECT user_id, activity_type_id, substr(record_date, 1, 10) FROM activity_records WHERE id > ?1 AND id <= ?2
+    )
+"""
+
+# Точность хранения очков в витрине, DECIMAL(10,4)
+POINT_PRECISION = Decimal("0.0001")
+
+# Рост по умолчанию, если он не указан, см
+DEFAULT_HEIGHT = 170.0
+
 
 class ETLProcessor:
     def __init__(self, batch_size: int | None = None) -> None:
@@ -25,6 +82,7 @@ class ETLProcessor:
         # Подключение к исходной SQLite базе
         logger.debug(f"Подключение к исходной базе данных: {etl_settings.database_path}")
         self.source_conn = sqlite3.connect(etl_settings.database_path)
+        self.source_conn.create_function("mart_decimal", 2, mart_decimal, deterministic=True)
         logger.debug("Успешное подключение к исходной базе данных")
 
         # Подключение к целевой PostgreSQL базе
@@ -97,44 +155,34 @@ class ETLProcessor:
             for row in rows
         ]
 
-    async def get_weight_data_from_source_batch(self, offset: int = 0) -> list[dict[str, typing.Any]]:
-        """Получение данных о весе из исходной базы данных порционно."""
-        cursor = self.source_conn.cursor()
-        cursor.execute("""
-            SELECT user_id, weight, record_date FROM weight_records
-            ORDER BY user_id, record_date
-            LIMIT ? OFFSET ?
-        """, (self.batch_size, offset))
-        rows = cursor.fetchall()
-        return [
-            {
-                "user_id": row[0],
-                "weight": Decimal(str(row[1])),
-                "date": date.fromisoformat(row[2].split()[0]),  # Преобразование строки даты в объект date
-            }
-            for row in rows
-        ]
-
-    async def get_activity_data_from_source_batch(self, offset: int = 0) -> list[dict[str, typing.Any]]:
-        """Получение данных об активности из исходной базы данных порционно."""
-        cursor = self.source_conn.cursor()
-        cursor.execute("""
-            SELECT ar.user_id, ar.activity_type_id, ar.value, ar.calories, ar.record_date
-            FROM activity_records ar
-            ORDER BY ar.user_id, ar.activity_type_id, ar.record_date
-            LIMIT ? OFFSET ?
-        """, (self.batch_size, offset))
-        rows = cursor.fetchall()
-        return [
-            {
-                "user_id": row[0],
-                "activity_id": row[1],
-                "value": Decimal(str(row[2])),
-                "calories": int(row[3]) if row[3] is not None else 0,
-                "date": date.fromisoformat(row[4].split()[0]),
-            }
-            for row in rows
-        ]
+    def get_max_record_id_in_source(self, table_name: str) -> int:
+        """ID последней записи таблицы исходной базы (0, если записей нет)."""
+        return self.source_conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name}").fetchone()[0]  # noqa: S608
+
+    def iter_weight_data_from_source(self, after_id: int, up_to_id: int) -> typing.Iterator[list[WeightData]]:
+        """Канонические строки веса дней с записями after_id < id <= up_to_id пачками по batch_size.
+
+        Одна строка на пользователя и день (UTC) - последняя запись дня, как при сверке
+        (reconciliation.WEIGHT_SOURCE_ROWS).
+        """
+        cursor = self.source_conn.execute(
+            f"{WEIGHT_SOURCE_ROWS.format(where=WEIGHT_NEW_DAYS_FILTER)} ORDER BY user_id, day", (after_id, up_to_id),
+        )
+        while rows := cursor.fetchmany(self.batch_size):
+            yield [WeightData(*WEIGHT_DATA_RECONCILED.to_target(row)) for row in rows]
+
+    def iter_activity_data_from_source(self, after_id: int, up_to_id: int) -> typing.Iterator[list[ActivityData]]:
+        """Канонические строки активности дней с записями after_id < id <= up_to_id пачками по batch_size.
+
+        Одна строка на пользователя, тип активности и день (UTC) - сумма записей дня,
+        как при сверке (reconciliation.ACTIVITY_SOURCE_ROWS).
+        """
+        cursor = self.source_conn.execute(
+            f"{ACTIVITY_SOURCE_ROWS.format(where=ACTIVITY_NEW_DAYS_FILTER)} ORDER BY user_id, activity_id, day",
+            (after_id, up_to_id),
+        )
+        while rows := cursor.fetchmany(self.batch_size):
+            yield [ActivityData(*ACTIVITY_DATA_RECONCILED.to_target(row)) for row in rows]
 
     async def get_existing_users_in_target(self) -> list[int]:
         """Получение ID пользователей, уже существующих в целевой базе."""
@@ -146,16 +194,6 @@ class ETLProcessor:
         records = await self.target_conn.fetch("SELECT id FROM activities")
         return [record["id"] for record in records]
 
-    async def get_existing_weight_data_in_target(self) -> set[tuple]:
-        """Получение существующих записей о весе в целевой базе (user_id, date)."""
-        records = await self.target_conn.fetch("SELECT user_id, date FROM weight_data")
-        return {(record["user_id"], record["date"]) for record in records}
-
-    async def get_existing_activity_data_in_target(self) -> set[tuple]:
-        """Получение существующих записей об активности в целевой базе (user_id, activity_id, date)."""
-        records = await self.target_conn.fetch("SELECT user_id, activity_id, date FROM activity_data")
-        return {(record["user_id"], record["activity_id"], record["date"]) for record in records}
-
     async def get_user_progress_from_source(self) -> list[dict[str, typing.Any]]:
         """Получение данных о прогрессе пользователей из исходной базы данных."""
         cursor = self.source_conn.cursor()
@@ -164,7 +202,8 @@ class ETLProcessor:
                    (SELECT weight FROM weight_records 
                     WHERE user_id = u.id 
                     ORDER BY record_date DESC 
-                    LIMIT 1) as current_weight
+                    LIMIT 1) as current_weight,
+                   u.initial_bmi, u.target_bmi, u.weight_factor, u.target_point, u.formula_version
             FROM users u
         """)
         rows = cursor.fetchall()
@@ -175,10 +214,27 @@ class ETLProcessor:
                 "target_weight": row[2],
                 "height": row[3],
                 "current_weight": row[4],
+                "constants": self.get_progress_constants(row[1], row[3], row[2], row[5:9], row[9]),
             }
             for row in rows
         ]
 
+    @staticmethod
+    def get_progress_constants(
+        start_weight: float | None,
+        height: float | None,
+        target_weight: float | None,
+        stored: tuple[float, float, float, float],
+        formula_version: int | None,
+    ) -> ProgressConstants | None:
+        """Константы прогресса, сохраненные ботом, или их расчет, если версия формулы другая."""
+        if start_weight is None or target_weight is None:
+            return None
+        height = height or DEFAULT_HEIGHT
+        if formula_version == FORMULA_VERSION:
+            return ProgressConstants.from_stored(start_weight, height, stored)
+        return calculate_progress_constants(start_weight, height, target_weight)
+
     async def insert_users_to_target(self, users: list[User]) -> None:
         """Вставка пользователей в целевую базу."""
         if not users:
@@ -215,7 +271,11 @@ class ETLProcessor:
         """, values)
 
     async def insert_weight_data_to_target(self, weight_data: list[WeightData]) -> None:
-        """Вставка данных о весе в целевую базу."""
+        """Вставка и обновление данных о весе в целевой базе.
+
+        Измененная строка получает новый id, чтобы история прогресса по ней
+        пересчиталась при инкрементальном обновлении.
+        """
         if not weight_data:
             return
 
@@ -228,11 +288,14 @@ class ETLProcessor:
         await self.target_conn.executemany("""
             INSERT INTO weight_data (user_id, weight, date)
             VALUES ($1, $2, $3)
-            ON CONFLICT (user_id, date) DO NOTHING
+            ON CONFLICT (user_id, date) DO UPDATE SET
+                weight = EXCLUDED.weight,
+                id = DEFAULT
+            WHERE weight_data.weight IS DISTINCT FROM EXCLUDED.weight
         """, values)
 
     async def insert_activity_data_to_target(self, activity_data: list[ActivityData]) -> None:
-        """Вставка данных об активности в целевую базу."""
+        """Вставка и обновление данных об активности в целевой базе."""
         if not activity_data:
             return
 
@@ -245,7 +308,120 @@ class ETLProcessor:
         await self.target_conn.executemany("""
             INSERT INTO activity_data (user_id, activity_id, date, value, calories)
             VALUES ($1, $2, $3, $4, $5)
-            ON CONFLICT (user_id, activity_id, date) DO NOTHING
+            ON CONFLICT (user_id, activity_id, date) DO UPDATE SET
+                value = EXCLUDED.value,
+                calories = EXCLUDED.calories
+            WHERE (activity_data.value, activity_data.calories) IS DISTINCT FROM (EXCLUDED.value, EXCLUDED.calories)
+        """, values)
+
+    async def get_user_target_points_in_target(self) -> dict[int, Decimal]:
+        """Получение целевых очков пользователей из витрины (по ним видно изменение профиля)."""
+        records = await self.target_conn.fetch("SELECT user_id, target_point FROM user_progress")
+        return {record["user_id"]: record["target_point"] for record in records}
+
+    async def get_etl_meta(self, key: str) -> str | None:
+        """Получение служебного значения ETL."""
+        return await self.target_conn.fetchval("SELECT value FROM etl_meta WHERE key = $1", key)
+
+    async def set_etl_meta(self, key: str, value: str) -> None:
+        """Сохранение служебного значения ETL."""
+        await self.target_conn.execute("""
+            INSERT INTO etl_meta (key, value)
+            VALUES ($1, $2)
+            ON CONFLICT (key) DO UPDATE SET
+                value = EXCLUDED.value
+        """, key, value)
+
+    async def load_weight_data(self) -> int:
+        """Загрузка дней веса, в которых появились записи после прошлой загрузки.
+
+        Бот только добавляет записи, поэтому изменившиеся дни находятся по ID
+        записей больше сохраненного в etl_meta; день переносится целиком
+        каноническими строками. Удаленные дни и правки витрины исправляет сверка.
+
+        :return: количество загруженных строк
+        """
+        last_id = int(await self.get_etl_meta(LOAD_LAST_WEIGHT_RECORD_ID_KEY) or 0)
+        max_id = self.get_max_record_id_in_source("weight_records")
+        if max_id <= last_id:
+            return 0
+
+        loaded = 0
+        for weight_data in self.iter_weight_data_from_source(last_id, max_id):
+            # Месяцы отмечаются для выгрузки в Parquet до загрузки
+            await self.mark_export_months(WEIGHT_DATA_EXPORT.name, {month_start(wd.date) for wd in weight_data})
+            await self.insert_weight_data_to_target(weight_data)
+            loaded += len(weight_data)
+            logger.debug("Загружено %s дней веса с новыми записями.", loaded)
+        # При сбое до этой точки дни загрузятся повторно, вставка идемпотентна
+        await self.set_etl_meta(LOAD_LAST_WEIGHT_RECORD_ID_KEY, str(max_id))
+        return loaded
+
+    async def load_activity_data(self) -> int:
+        """Загрузка дней активности, в которых появились записи после прошлой загрузки.
+
+        Дни находятся так же, как в load_weight_data.
+
+        :return: количество загруженных строк
+        """
+        last_id = int(await self.get_etl_meta(LOAD_LAST_ACTIVITY_RECORD_ID_KEY) or 0)
+        max_id = self.get_max_record_id_in_source("activity_records")
+        if max_id <= last_id:
+            return 0
+
+        loaded = 0
+        for activity_data in self.iter_activity_data_from_source(last_id, max_id):
+            # Месяцы отмечаются для выгрузки в Parquet до загрузки
+            await self.mark_export_months(ACTIVITY_DATA_EXPORT.name, {month_start(ad.date) for ad in activity_data})
+            await self.insert_activity_data_to_target(activity_data)
+            loaded += len(activity_data)
+            logger.debug("Загружено %s дней активности с новыми записями.", loaded)
+        await self.set_etl_meta(LOAD_LAST_ACTIVITY_RECORD_ID_KEY, str(max_id))
+        return loaded
+
+    async def mark_export_months(self, table_name: str, months: set[date]) -> None:
+        """Отметка месяцев таблицы (первые числа) для перевыгрузки в Parquet.
+
+        Отметки хранятся в etl_meta до замены файлов партиций, поэтому месяцы
+        не теряются, если выгрузка упала или отключена (ETL_EXPORT_ENABLED=false).
+        Повторная отметка обновляет время: отметку, поставленную во время
+        выгрузки, выгрузка не снимет.
+        """
+        if not months:
+            return
+        marked_at = datetime.now(UTC).isoformat()
+        await self.target_conn.executemany("""
+            INSERT INTO etl_meta (key, value)
+            VALUES ($1, $2)
+            ON CONFLICT (key) DO UPDATE SET
+                value = EXCLUDED.value
+        """, [(f"{PARQUET_EXPORT_DIRTY_KEY}:{table_name}:{month:%Y-%m}", marked_at) for month in months])
+
+    async def get_export_marks(self) -> dict[str, str]:
+        """Отметки месяцев для перевыгрузки в Parquet: ключ etl_meta и время отметки."""
+        records = await self.target_conn.fetch(
+            "SELECT key, value FROM etl_meta WHERE key LIKE $1", f"{PARQUET_EXPORT_DIRTY_KEY}:%",
+        )
+        return {record["key"]: record["value"] for record in records}
+
+    async def insert_user_progress_history_to_target(self, history: list[UserProgressHistory]) -> None:
+        """Вставка истории прогресса в целевую базу."""
+        if not history:
+            return
+
+        # Подготовка данных для вставки
+        values = [
+            (h.user_id, h.date, h.weight, h.current_point, h.lost_weight)
+            for h in history
+        ]
+
+        await self.target_conn.executemany("""
+            INSERT INTO user_progress_history (user_id, date, weight, current_point, lost_weight)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (user_id, date) DO UPDATE SET
+                weight = EXCLUDED.weight,
+                current_point = EXCLUDED.current_point,
+                lost_weight = EXCLUDED.lost_weight
         """, values)
 
     async def insert_user_progress_to_target(self, user_progress: list[UserProgress]) -> None:
@@ -268,6 +444,169 @@ class ETLProcessor:
                 lost_weight = EXCLUDED.lost_weight
         """, values)
 
+    def build_user_progress_history(
+        self,
+        user_id: int,
+        records: list[asyncpg.Record],
+        profile: dict[str, typing.Any],
+    ) -> list[UserProgressHistory]:
+        """Расчет истории прогресса одного пользователя по его записям веса из витрины."""
+        start_weight = profile["start_weight"]
+        points = calculate_points_series(profile["constants"], [float(record["weight"]) for record in records])
+        return [
+            UserProgressHistory(
+                user_id=user_id,
+                date=record["date"],
+                weight=record["weight"],
+                current_point=Decimal(str(point)),
+                lost_weight=record["weight"] - Decimal(str(start_weight)),
+            )
+            for record, point in zip(records, points, strict=True)
+        ]
+
+    async def load_user_progress_history(
+        self,
+        profiles: dict[int, dict[str, typing.Any]],
+        since_id: int = 0,
+        user_ids: list[int] | None = None,
+    ) -> tuple[int, int]:
+        """Расчет и загрузка истории прогресса по записям веса витрины с id больше since_id.
+
+        Записи читаются курсором по пользователям, очки каждого пользователя
+        считаются одним вызовом calculate_points_series. Должен вызываться в транзакции.
+
+        :param profiles: стартовый и целевой вес, рост пользователей
+        :param since_id: id последней уже учтенной записи weight_data
+        :param user_ids: только эти пользователи (None - все)
+        :return: количество загруженных строк и наибольший id прочитанной записи
+        """
+        query = """
+            SELECT id, user_id, weight, date FROM weight_data
+            WHERE id > $1 AND ($2::BIGINT[] IS NULL OR user_id = ANY($2::BIGINT[]))
+            ORDER BY user_id, date
+        """
+        history: list[UserProgressHistory] = []
+        user_records: list[asyncpg.Record] = []
+        loaded = 0
+        max_id = since_id
+
+        async def flush_user() -> None:
+            nonlocal loaded
+            user_id = user_records[0]["user_id"]
+            profile = profiles.get(user_id)
+            # Без стартового и целевого веса очки не считаются
+            if profile and profile["constants"] is not None:
+                history.extend(self.build_user_progress_history(user_id, user_records, profile))
+            user_records.clear()
+            if len(history) >= self.batch_size:
+                await self.insert_user_progress_history_to_target(history)
+                loaded += len(history)
+                history.clear()
+
+        async for record in self.target_conn.cursor(query, since_id, user_ids, prefetch=self.batch_size):
+            max_id = max(max_id, record["id"])
+            if user_records and user_records[0]["user_id"] != record["user_id"]:
+                await flush_user()
+            user_records.append(record)
+
+        if user_records:
+            await flush_user()
+        await self.insert_user_progress_history_to_target(history)
+        loaded += len(history)
+        return loaded, max_id
+
+    async def update_user_progress_history(
+        self,
+        profiles: dict[int, dict[str, typing.Any]],
+        changed_user_ids: list[int],
+    ) -> int:
+        """Обновление истории прогресса.
+
+        Обычно считаются только записи веса, добавленные после прошлого запуска.
+        Если изменилась версия формулы (FORMULA_VERSION) или задан ETL_RECOMPUTE_HISTORY,
+        история пересчитывается полностью; пользователям с измененным профилем
+        (стартовый или целевой вес, рост) - вся их история.
+
+        :return: количество загруженных строк истории
+        """
+        async with self.target_conn.transaction():
+            formula_version = await self.get_etl_meta(HISTORY_FORMULA_VERSION_KEY)
+            last_weight_id = await self.get_etl_meta(HISTORY_LAST_WEIGHT_ID_KEY)
+
+            if etl_settings.recompute_history or formula_version != str(FORMULA_VERSION) or last_weight_id is None:
+                logger.info("Полный пересчет истории прогресса (версия формулы %s)", FORMULA_VERSION)
+                await self.target_conn.execute("DELETE FROM user_progress_history")
+                loaded, max_id = await self.load_user_progress_history(profiles)
+                await self.set_etl_meta(HISTORY_FORMULA_VERSION_KEY, str(FORMULA_VERSION))
+            else:
+                loaded = 0
+                if changed_user_ids:
+                    logger.info("Пересчет истории прогресса %s пользователей с измененным профилем",
+                                len(changed_user_ids))
+                    await self.target_conn.execute(
+                        "DELETE FROM user_progress_history WHERE user_id = ANY($1::BIGINT[])", changed_user_ids,
+                    )
+                    loaded, _ = await self.load_user_progress_history(profiles, user_ids=changed_user_ids)
+                new_loaded, max_id = await self.load_user_progress_history(profiles, int(last_weight_id))
+                loaded += new_loaded
+
+            await self.set_etl_meta(HISTORY_LAST_WEIGHT_ID_KEY, str(max_id))
+        return loaded
+
+    async def reconcile_if_due(self) -> int:
+        """Сверка витрины с базой бота, если с прошлой сверки прошло reconcile_interval_minutes.
+
+        Месяцы перенесенных партиций отмечаются для выгрузки в Parquet в той же транзакции.
+
+        :return: количество перенесенных партиций
+        """
+        if etl_settings.reconcile_interval_minutes <= 0:
+            return 0
+        now = datetime.now(UTC)
+        last_run = await self.get_etl_meta(RECONCILE_LAST_RUN_KEY)
+        if last_run is not None and now - datetime.fromisoformat(last_run) < timedelta(
+            minutes=etl_settings.reconcile_interval_minutes,
+        ):
+            return 0
+
+        async with self.target_conn.transaction():
+            repaired = await Reconciler(self.source_conn, self.target_conn).reconcile()
+            for table_name, partitions in repaired.items():
+                await self.mark_export_months(table_name, {month for _, month in partitions})
+            await self.set_etl_meta(RECONCILE_LAST_RUN_KEY, now.isoformat())
+        return sum(len(partitions) for partitions in repaired.values())
+
+    async def export_to_parquet(self) -> int:
+        """Выгрузка витрины в Parquet.
+
+        Перезаписываются только партиции месяцев, отмеченных в etl_meta
+        (mark_export_months). Если выгрузки еще нет или изменилась версия ее
+        формата (EXPORT_FORMAT_VERSION), выгружаются все месяцы. Отметки
+        снимаются только после замены файлов партиций.
+
+        :return: количество выгруженных строк
+        """
+        marks = await self.get_export_marks()
+        months: dict[str, set[date]] = {}
+        for key in marks:
+            _, table_name, month = key.split(":")
+            months.setdefault(table_name, set()).add(date.fromisoformat(f"{month}-01"))
+
+        export_version = await self.get_etl_meta(PARQUET_EXPORT_VERSION_KEY)
+        full = export_version != str(EXPORT_FORMAT_VERSION) or not etl_settings.export_dir.exists()
+        if full:
+            logger.info("Полная выгрузка витрины в Parquet: %s", etl_settings.export_dir)
+
+        exporter = ParquetExporter(self.target_conn, etl_settings.export_dir, etl_settings.export_batch_size)
+        exported = await exporter.export(None if full else months)
+
+        await self.set_etl_meta(PARQUET_EXPORT_VERSION_KEY, str(EXPORT_FORMAT_VERSION))
+        # Отметки, обновленные после чтения, остаются до следующей выгрузки
+        await self.target_conn.executemany(
+            "DELETE FROM etl_meta WHERE key = $1 AND value = $2", list(marks.items()),
+        )
+        return exported
+
     async def extract_transform_load(self) -> None:
         """Основной метод ETL процесса."""
         await self.connect_to_sources()
@@ -280,8 +619,6 @@ class ETLProcessor:
             # Получение существующих данных в целевой базе
             existing_user_ids = await self.get_existing_users_in_target()
             existing_activity_ids = await self.get_existing_activities_in_target()
-            existing_weight_keys = await self.get_existing_weight_data_in_target()
-            existing_activity_keys = await self.get_existing_activity_data_in_target()
 
             # Преобразование и загрузка пользователей
             new_users = [
@@ -306,81 +643,12 @@ class ETLProcessor:
 
             logger.info("Загружено: %s пользователей, %s активностей.", len(new_users), len(new_activities))
 
-            # Обработка данных о весе порционно
-            offset = 0
-            total_weight_loaded = 0
-
-            while True:
-                source_weight_data = await self.get_weight_data_from_source_batch(offset)
+            # Загрузка записей веса и активности по дням
+            total_weight_loaded = await self.load_weight_data()
+            total_activity_loaded = await self.load_activity_data()
 
-                if not source_weight_data:
-                    break
-
-                # Фильтрация новых записей веса
-                new_weight_data = [
-                    WeightData(
-                        user_id=wd["user_id"],
-                        weight=wd["weight"],
-                        date=wd["date"],
-                    )
-                    for wd in source_weight_data
-                    if (wd["user_id"], wd["date"]) not in existing_weight_keys
-                ]
-
-                # Загрузка данных в целевую базу
-                await self.insert_weight_data_to_target(new_weight_data)
-                total_weight_loaded += len(new_weight_data)
-
-                logger.debug(
-                    "Обработано %s записей веса, добавлено %s новых.",
-                    offset + len(source_weight_data),
-                    len(new_weight_data),
-                )
-
-                offset += self.batch_size
-
-                # Освобождение памяти
-                del source_weight_data
-                del new_weight_data
-
-            # Обработка данных об активности порционно
-            offset = 0
-            total_activity_loaded = 0
-
-            while True:
-                source_activity_data = await self.get_activity_data_from_source_batch(offset)
-
-                if not source_activity_data:
-                    break
-
-                # Фильтрация новых записей активности
-                new_activity_data = [
-                    ActivityData(
-                        user_id=ad["user_id"],
-                        activity_id=ad["activity_id"],
-                        date=ad["date"],
-                        value=ad["value"],
-                        calories=ad["calories"],
-                    )
-                    for ad in source_activity_data
-                    if (ad["user_id"], ad["activity_id"], ad["date"]) not in existing_activity_keys
-                ]
-
-                # Загрузка данных в целевую базу
-                await self.insert_activity_data_to_target(new_activity_data)
-                total_activity_loaded += len(new_activity_data)
-
-                logger.debug(
-                    "Обработано %s записей активности, добавлено %s новых.",
-                    offset + len(source_activity_data),
-                    len(new_activity_data),
-                )
-
-                offset += self.batch_size
-
-                # Освобождение памяти
-                del source_activity_data
-                del new_activity_data
+            # Сверка с базой бота: исправленные записи веса попадут в историю прогресса этого запуска
+            total_reconciled = await self.reconcile_if_due()
 
             # Обработка данных о прогрессе пользователей
             source_user_progress = await self.get_user_progress_from_source()
@@ -392,18 +660,13 @@ class ETLProcessor:
                 if user_data["current_weight"] is None:
                     continue
 
-                target_point = Decimal(str(calculate_target_point(
-                    start_weight=user_data["start_weight"],
-                    height=user_data["height"] or 170.0,  # используем значение по умолчанию
-                    target_weight=user_data["target_weight"],
-                )))
+                # Константы формулы посчитаны ботом при регистрации, остается расчет по текущему весу
+                constants = user_data["constants"]
+                if constants is None:
+                    continue
 
-                current_point = Decimal(str(calculate_current_point(
-                    start_weight=user_data["start_weight"],
-                    current_weight=user_data["current_weight"],
-                    height=user_data["height"] or 170.0,  # используем значение по умолчанию
-                    target_weight=user_data["target_weight"],
-                )))
+                target_point = Decimal(str(constants.target_point))
+                current_point = Decimal(str(calculate_point(constants, user_data["current_weight"])))
 
                 user_progress_list.append(UserProgress(
                     user_id=user_data["user_id"],
@@ -412,14 +675,37 @@ class ETLProcessor:
                     lost_weight=user_data["current_weight"] - user_data["start_weight"],
                 ))
 
+            # Пользователи, у которых изменились целевые очки (профиль), до обновления прогресса
+            existing_target_points = await self.get_user_target_points_in_target()
+            changed_user_ids = [
+                up.user_id
+                for up in user_progress_list
+                if up.user_id in existing_target_points
+                and up.target_point.quantize(POINT_PRECISION) != existing_target_points[up.user_id]
+            ]
+
             # Загрузка данных о прогрессе в целевую базу
             await self.insert_user_progress_to_target(user_progress_list)
 
+            # Обновление истории прогресса по новым записям веса
+            profiles = {user_data["user_id"]: user_data for user_data in source_user_progress}
+            total_history_loaded = await self.update_user_progress_history(profiles, changed_user_ids)
+
+            # Выгрузка отмеченных партиций в Parquet
+            total_exported = 0
+            if etl_settings.export_enabled:
+                total_exported = await self.export_to_parquet()
+
             logger.info(
-                "ETL процесс завершен. Всего загружено: %s записей веса, %s записей активности, %s записей прогресса.",
+                "ETL процесс завершен. Всего загружено: %s записей веса, %s записей активности, "
+                "%s записей прогресса, %s записей истории прогресса; перенесено при сверке %s партиций, "
+                "выгружено в Parquet %s строк.",
                 total_weight_loaded,
                 total_activity_loaded,
                 len(user_progress_list),
+                total_history_loaded,
+                total_reconciled,
+                total_exported,
             )
 
         finally:
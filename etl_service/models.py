@@ -51,3 +51,14 @@ class UserProgress:
     target_point: Decimal
     current_point: Decimal
     lost_weight: Decimal
+
+
+@dataclass
+class UserProgressHistory:
+    """Модель прогресса пользователя на дату записи веса."""
+
+    user_id: int
+    date: date
+    weight: Decimal
+    current_point: Decimal
+    lost_weight: Decimal
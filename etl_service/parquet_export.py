@@ -0,0 +1,208 @@
+"""Выгрузка витрины данных в Parquet для аналитиков.
+
+Таблицы записей выгружаются по месяцам даты в раскладке Hive, которую
+pyarrow.dataset, DuckDB и Spark читают как одну таблицу с колонкой month:
+
+    {export_dir}/weight_data/month=2024-01/part-0.parquet
+    {export_dir}/activity_data/month=2024-01/part-0.parquet
+    {export_dir}/user_progress/part-0.parquet
+
+Строки читаются курсором на стороне сервера пачками по batch_size и сразу
+пишутся группой строк, поэтому память не зависит от размера таблицы. Файл
+пишется во временный и атомарно заменяет прежний: читатели видят либо
+старую, либо новую версию партиции. Идентификаторы кодируются словарем,
+даты пишутся как date32, числовые значения - как decimal той же точности,
+что в витрине.
+"""
+
+import logging
+import pathlib
+import shutil
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import asyncpg
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Версия раскладки и схем выгрузки: при изменении выгрузка пересоздается целиком
+EXPORT_FORMAT_VERSION = 1
+
+PARTITION_FILE_NAME = "part-0.parquet"
+PARQUET_COMPRESSION = "zstd"
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """Выгружаемая таблица витрины."""
+
+    name: str
+    query: str  # для партиционированных таблиц - с параметрами $1, $2 (границы месяца)
+    schema: pa.Schema
+    dictionary_columns: tuple[str, ...]
+    partitioned: bool = True
+
+
+WEIGHT_DATA_EXPORT = ExportTable(
+    name="weight_data",
+    query="""
+        SELECT id, user_id, date, weight FROM weight_data
+        WHERE date >= $1 AND date < $2
+        ORDER BY user_id, date
+    """,
+    schema=pa.schema([
+        pa.field("id", pa.int32(), nullable=False),
+        pa.field("user_id", pa.int64(), nullable=False),
+        pa.field("date", pa.date32(), nullable=False),
+        pa.field("weight", pa.decimal128(5, 1), nullable=False),
+    ]),
+    dictionary_columns=("user_id",),
+)
+
+ACTIVITY_DATA_EXPORT = ExportTable(
+    name="activity_data",
+    query="""
+        SELECT id, user_id, activity_id, date, value, calories FROM activity_data
+        WHERE date >= $1 AND date < $2
+        ORDER BY user_id, activity_id, date
+    """,
+    schema=pa.schema([
+        pa.field("id", pa.int32(), nullable=False),
+        pa.field("user_id", pa.int64(), nullable=False),
+        pa.field("activity_id", pa.int64(), nullable=False),
+        pa.field("date", pa.date32(), nullable=False),
+        pa.field("value", pa.decimal128(8, 2), nullable=False),
+        pa.field("calories", pa.int32(), nullable=False),
+    ]),
+    dictionary_columns=("user_id", "activity_id"),
+)
+
+USER_PROGRESS_EXPORT = ExportTable(
+    name="user_progress",
+    query="""
+        SELECT user_id, target_point, current_point, lost_weight FROM user_progress
+        ORDER BY user_id
+    """,
+    schema=pa.schema([
+        pa.field("user_id", pa.int64(), nullable=False),
+        pa.field("target_point", pa.decimal128(10, 4), nullable=False),
+        pa.field("current_point", pa.decimal128(10, 4), nullable=False),
+        pa.field("lost_weight", pa.decimal128(10, 4)),
+    ]),
+    dictionary_columns=("user_id",),
+    partitioned=False,
+)
+
+PARTITIONED_EXPORT_TABLES = (WEIGHT_DATA_EXPORT, ACTIVITY_DATA_EXPORT)
+SNAPSHOT_EXPORT_TABLES = (USER_PROGRESS_EXPORT,)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(month: date) -> date:
+    return month_start(month + timedelta(days=32))
+
+
+class ParquetExporter:
+    """Запись таблиц витрины в файлы Parquet."""
+
+    def __init__(self, conn: asyncpg.Connection, export_dir: pathlib.Path, batch_size: int) -> None:
+        self.conn = conn
+        self.export_dir = export_dir
+        self.batch_size = batch_size
+
+    def partition_path(self, table: ExportTable, month: date | None = None) -> pathlib.Path:
+        if month is None:
+            return self.export_dir / table.name / PARTITION_FILE_NAME
+        return self.export_dir / table.name / f"month={month:%Y-%m}" / PARTITION_FILE_NAME
+
+    @staticmethod
+    def to_record_batch(table: ExportTable, records: list[asyncpg.Record]) -> pa.RecordBatch:
+        columns = [
+            pa.array([record[index] for record in records], type=field.type)
+            for index, field in enumerate(table.schema)
+        ]
+        return pa.RecordBatch.from_arrays(columns, schema=table.schema)
+
+    async def export_partition(self, table: ExportTable, month: date | None = None) -> int:
+        """Перезапись партиции таблицы (month - первое число месяца, None - вся таблица).
+
+        Должен вызываться в транзакции. Если строк нет, партиция удаляется.
+        :return: количество выгруженных строк
+        """
+        path = self.partition_path(table, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        args = (month, next_month(month)) if month is not None else ()
+
+        exported = 0
+        records: list[asyncpg.Record] = []
+        with pq.ParquetWriter(
+            tmp_path,
+            table.schema,
+            compression=PARQUET_COMPRESSION,
+            use_dictionary=list(table.dictionary_columns),
+        ) as writer:
+            async for record in self.conn.cursor(table.query, *args, prefetch=self.batch_size):
+                records.append(record)
+                if len(records) >= self.batch_size:
+                    writer.write_batch(self.to_record_batch(table, records))
+                    exported += len(records)
+                    records.clear()
+            if records:
+                writer.write_batch(self.to_record_batch(table, records))
+                exported += len(records)
+
+        if exported:
+            tmp_path.replace(path)
+        else:
+            tmp_path.unlink()
+            path.unlink(missing_ok=True)
+            if month is not None:
+                shutil.rmtree(path.parent, ignore_errors=True)
+        return exported
+
+    async def get_months(self, table: ExportTable) -> set[date]:
+        """Месяцы, за которые в таблице есть записи."""
+        records = await self.conn.fetch(
+            f"SELECT DISTINCT date_trunc('month', date)::date AS month FROM {table.name}",  # noqa: S608
+        )
+        return {record["month"] for record in records}
+
+    def remove_stale_partitions(self, table: ExportTable, months: set[date]) -> None:
+        """Удаление партиций месяцев, которых больше нет в таблице."""
+        table_dir = self.export_dir / table.name
+        if not table_dir.exists():
+            return
+        expected = {f"month={month:%Y-%m}" for month in months}
+        for partition_dir in table_dir.iterdir():
+            if partition_dir.is_dir() and partition_dir.name not in expected:
+                shutil.rmtree(partition_dir)
+
+    async def export(self, touched_months: dict[str, set[date]] | None = None) -> int:
+        """Выгрузка партиций в одном снимке данных.
+
+        :param touched_months: месяцы (первые числа) для перевыгрузки по таблицам;
+            None - полная выгрузка всех месяцев. Снимки (user_progress) ETL обновляет
+            целиком, поэтому они перезаписываются всегда.
+        :return: количество выгруженных строк
+        """
+        exported = 0
+        async with self.conn.transaction(isolation="repeatable_read", readonly=True):
+            for table in PARTITIONED_EXPORT_TABLES:
+                if touched_months is None:
+                    months = await self.get_months(table)
+                    self.remove_stale_partitions(table, months)
+                else:
+                    months = touched_months.get(table.name, set())
+                for month in sorted(months):
+                    rows = await self.export_partition(table, month)
+                    logger.debug("Выгружено в Parquet %s за %s: %s строк", table.name, f"{month:%Y-%m}", rows)
+                    exported += rows
+            for table in SNAPSHOT_EXPORT_TABLES:
+                exported += await self.export_partition(table)
+        return exported
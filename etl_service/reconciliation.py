@@ -0,0 +1,206 @@
+"""Сверка витрины с базой бота по контрольным суммам партиций.
+
+Партиция - записи одного пользователя за месяц. Обе стороны считают в SQL
+для каждой партиции число строк, сумму значений и сумму полиномиальных
+хешей строк, поэтому сравнение стоит O(числа партиций), а заново
+переносятся только партиции с различающимися суммами.
+
+Витрина хранит одну строку на день (UTC): вес - последняя запись дня,
+активность - сумма записей дня по типу. Канонические строки задают
+WEIGHT_SOURCE_ROWS и ACTIVITY_SOURCE_ROWS; по ним же идет обычная загрузка
+(etl_processor), поэтому сверка исправляет только расхождения, которые
+загрузка не видит: удаленные в базе бота дни и правки витрины в обход ETL.
+
+Значения сравниваются целыми числами в единицах последнего знака DECIMAL
+витрины; для базы бота их считает функция mart_decimal, округляющая так же,
+как PostgreSQL при загрузке.
+"""
+
+import logging
+import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+import asyncpg
+from parquet_export import next_month
+
+logger = logging.getLogger(__name__)
+
+# Параметры полиномиального хеша строки: основание и простой модуль (2^31 - 1),
+# при котором квадрат остатка помещается в 64-битное целое обеих СУБД
+HASH_BASE = 1000003
+HASH_MODULUS = 2147483647
+
+# Фильтр записей базы бота по партиции: пользователь и границы месяца
+SOURCE_PARTITION_FILTER = "user_id = ? AND record_date >= ? AND record_date < ?"
+
+PartitionKey = tuple[int, str]  # ID пользователя, месяц YYYY-MM
+Checksum = tuple[int, int, int]  # число строк, сумма значений, сумма хешей строк
+
+
+def mart_decimal(value: float | None, scale: int) -> int | None:
+    """Значение в единицах последнего знака DECIMAL(_, scale), как его сохранит витрина."""
+    if value is None:
+        return None
+    return int((Decimal(str(value)) * 10**scale).to_integral_value(ROUND_HALF_UP))
+
+
+def row_hash_sql(*fields: str) -> str:
+    """SQL-выражение хеша строки из целых полей, одинаковое для SQLite и PostgreSQL.
+
+    Поля сворачиваются в многочлен по модулю HASH_MODULUS, результат возводится
+    в квадрат, чтобы сумма хешей не сводилась к линейной комбинации сумм полей.
+    """
+    value = fields[0]
+    for field in fields[1:]:
+        value = f"(({value}) % {HASH_MODULUS} * {HASH_BASE} + {field})"
+    return f"(({value}) % {HASH_MODULUS}) * (({value}) % {HASH_MODULUS}) % {HASH_MODULUS}"
+
+
+@dataclass(frozen=True)
+class ReconciledTable:
+    """Таблица витрины, сверяемая по партициям."""
+
+    name: str
+    source_rows: str  # SQLite: канонические строки витрины, {where} - фильтр записей
+    source_checksums: str  # SQLite: контрольные суммы партиций
+    target_checksums: str  # PostgreSQL: контрольные суммы партиций
+    delete: str  # PostgreSQL: удаление партиции ($1 - пользователь, $2 и $3 - границы месяца)
+    insert: str
+    to_target: Callable[[tuple], tuple]  # строка source_rows -> параметры insert
+    has_progress_history: bool = False  # по строкам таблицы считается история прогресса
+
+
+WEIGHT_SOURCE_ROWS = """
+    SELECT user_id, day, mart_decimal(weight, 1) AS weight
+    FROM (
+        SELECT user_id, substr(record_date, 1, 10) AS day, weight,
+               ROW_NUMBER() OVER (
+                   PARTITION BY user_id, substr(record_date, 1, 10) ORDER BY record_date DESC, id DESC
+               ) AS day_rank
+        FROM weight_records
+        WHERE {where}
+    )
+    WHERE day_rank = 1
+"""
+
+WEIGHT_DATA_RECONCILED = ReconciledTable(
+    name="weight_data",
+    source_rows=WEIGHT_SOURCE_ROWS,
+    source_checksums=f"""
+        SELECT user_id, substr(day, 1, 7) AS month, COUNT(*), SUM(weight),
+               SUM({row_hash_sql("CAST(substr(day, 9, 2) AS INTEGER)", "weight")})
+        FROM ({WEIGHT_SOURCE_ROWS.format(where="1 = 1")})
+        GROUP BY user_id, month
+    """,  # noqa: S608
+    target_checksums=f"""
+        SELECT user_id, to_char(date, 'YYYY-MM') AS month, COUNT(*), SUM(weight),
+               SUM({row_hash_sql("EXTRACT(DAY FROM date)::BIGINT", "weight")})
+        FROM (SELECT user_id, date, (weight * 10)::BIGINT AS weight FROM weight_data) AS mart_rows
+        GROUP BY user_id, month
+    """,  # noqa: S608
+    delete="DELETE FROM weight_data WHERE user_id = $1 AND date >= $2 AND date < $3",
+    insert="INSERT INTO weight_data (user_id, weight, date) VALUES ($1, $2, $3)",
+    to_target=lambda row: (row[0], Decimal(row[2]).scaleb(-1), date.fromisoformat(row[1])),
+    has_progress_history=True,
+)
+
+ACTIVITY_SOURCE_ROWS = """
+    SELECT user_id, activity_type_id AS activity_id, substr(record_date, 1, 10) AS day,
+           mart_decimal(SUM(value), 2) AS value, CAST(TOTAL(calories) AS INTEGER) AS calories
+    FROM activity_records
+    WHERE {where}
+    GROUP BY user_id, activity_type_id, day
+"""
+
+ACTIVITY_DATA_RECONCILED = ReconciledTable(
+    name="activity_data",
+    source_rows=ACTIVITY_SOURCE_ROWS,
+    source_checksums=f"""
+        SELECT user_id, substr(day, 1, 7) AS month, COUNT(*), SUM(value),
+               SUM({row_hash_sql("activity_id", "CAST(substr(day, 9, 2) AS INTEGER)", "value", "calories")})
+        FROM ({ACTIVITY_SOURCE_ROWS.format(where="1 = 1")})
+        GROUP BY user_id, month
+    """,  # noqa: S608
+    target_checksums=f"""
+        SELECT user_id, to_char(date, 'YYYY-MM') AS month, COUNT(*), SUM(value),
+               SUM({row_hash_sql("activity_id", "EXTRACT(DAY FROM date)::BIGINT", "value", "calories")})
+        FROM (
+            SELECT user_id, activity_id, date, (value * 100)::BIGINT AS value, calories FROM activity_data
+        ) AS mart_rows
+        GROUP BY user_id, month
+    """,  # noqa: S608
+    delete="DELETE FROM activity_data WHERE user_id = $1 AND date >= $2 AND date < $3",
+    insert="INSERT INTO activity_data (user_id, activity_id, date, value, calories) VALUES ($1, $2, $3, $4, $5)",
+    to_target=lambda row: (row[0], row[1], date.fromisoformat(row[2]), Decimal(row[3]).scaleb(-2), row[4]),
+)
+
+RECONCILED_TABLES = (WEIGHT_DATA_RECONCILED, ACTIVITY_DATA_RECONCILED)
+
+
+class Reconciler:
+    """Сверка и перенос различающихся партиций."""
+
+    def __init__(self, source_conn: sqlite3.Connection, target_conn: asyncpg.Connection) -> None:
+        self.source_conn = source_conn
+        self.target_conn = target_conn
+        self.source_conn.create_function("mart_decimal", 2, mart_decimal, deterministic=True)
+
+    def get_source_checksums(self, table: ReconciledTable) -> dict[PartitionKey, Checksum]:
+        rows = self.source_conn.execute(table.source_checksums).fetchall()
+        return {(user_id, month): (count, total, row_hash) for user_id, month, count, total, row_hash in rows}
+
+    async def get_target_checksums(self, table: ReconciledTable) -> dict[PartitionKey, Checksum]:
+        records = await self.target_conn.fetch(table.target_checksums)
+        return {(record[0], record[1]): (record[2], int(record[3]), int(record[4])) for record in records}
+
+    async def find_mismatched_partitions(self, table: ReconciledTable) -> list[PartitionKey]:
+        """Партиции, контрольные суммы которых различаются или есть только на одной стороне."""
+        source = self.get_source_checksums(table)
+        target = await self.get_target_checksums(table)
+        mismatched = [key for key in source.keys() | target.keys() if source.get(key) != target.get(key)]
+        logger.debug("Сверка %s: партиций в базе бота %s, в витрине %s, различается %s",
+                     table.name, len(source), len(target), len(mismatched))
+        return sorted(mismatched)
+
+    async def resync_partition(self, table: ReconciledTable, user_id: int, month: date) -> int:
+        """Перенос партиции заново. Должен вызываться в транзакции.
+
+        Строки получают новые id, поэтому история прогресса по ним пересчитывается
+        при следующем инкрементальном обновлении; строки истории удаленных дней удаляются.
+        :return: количество перенесенных строк
+        """
+        bounds = (month, next_month(month))
+        rows = self.source_conn.execute(
+            table.source_rows.format(where=SOURCE_PARTITION_FILTER),
+            (user_id, *(bound.isoformat() for bound in bounds)),
+        ).fetchall()
+
+        if table.has_progress_history:
+            await self.target_conn.execute(
+                "DELETE FROM user_progress_history WHERE user_id = $1 AND date >= $2 AND date < $3", user_id, *bounds,
+            )
+        await self.target_conn.execute(table.delete, user_id, *bounds)
+        await self.target_conn.executemany(table.insert, [table.to_target(row) for row in rows])
+        return len(rows)
+
+    async def reconcile(self) -> dict[str, list[tuple[int, date]]]:
+        """Сверка всех таблиц и перенос различающихся партиций в одной транзакции.
+
+        :return: перенесенные партиции (ID пользователя, первое число месяца) по таблицам
+        """
+        repaired: dict[str, list[tuple[int, date]]] = {}
+        async with self.target_conn.transaction():
+            for table in RECONCILED_TABLES:
+                partitions = []
+                rows = 0
+                for user_id, month_text in await self.find_mismatched_partitions(table):
+                    month = date.fromisoformat(f"{month_text}-01")
+                    rows += await self.resync_partition(table, user_id, month)
+                    partitions.append((user_id, month))
+                if partitions:
+                    logger.info("Сверка %s: перенесено %s партиций (%s строк)", table.name, len(partitions), rows)
+                repaired[table.name] = partitions
+        return repaired
@@ -0,0 +1,28 @@
+"""Общие настройки тестов: пути к модулям бота и ETL и окружение их настроек.
+
+Модули бота импортируются как из каталога bot (settings, utils.*, database.*),
+модули ETL - как из каталога etl_service. Настройки бота читаются при импорте,
+поэтому окружение задается до него; база бота для каждого теста своя (bot_db).
+"""
+
+import os
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+sys.path[:0] = [str(ROOT / "bot"), str(ROOT / "etl_service")]
+
+
+@pytest.fixture
+def bot_db(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    """Пустая база бота во временном каталоге."""
+    from database import models
+
+    path = tmp_path / "database.db"
+    monkeypatch.setattr(models, "DATABASE_PATH", path)
+    models.init_db()
+    return path
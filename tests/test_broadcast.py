@@ -0,0 +1,114 @@
+"""Рассылка (utils.broadcast) против фейкового сервера Bot API (tools.fake_bot_api)."""
+
+import asyncio
+
+from aiogram.client.telegram import TelegramAPIServer
+from tools.fake_bot_api import FakeBotAPI, FakeBotAPIConfig
+from utils.broadcast import Broadcaster, BroadcastStats, DeliveryFailure, TokenBucket, classify_failure
+from utils.session import create_bot, create_session
+
+# Допуск на неточность таймеров цикла событий, с
+TIMER_SLACK = 0.05
+
+
+def run_broadcast(
+    config: FakeBotAPIConfig,
+    chat_ids: list[int],
+    **broadcaster_options: float,
+) -> tuple[BroadcastStats, FakeBotAPI]:
+    """Рассылка chat_ids через фейковый сервер с конфигурацией config."""
+    server = FakeBotAPI(config)
+
+    async def main() -> BroadcastStats:
+        await server.start()
+        bot = create_bot(create_session(TelegramAPIServer.from_base(server.base_url)))
+        try:
+            broadcaster = Broadcaster(bot, **broadcaster_options)  # type: ignore[arg-type]
+            return await broadcaster.broadcast(chat_ids, "test")
+        finally:
+            await bot.session.close()
+            await server.stop()
+
+    return asyncio.run(main()), server
+
+
+def test_rate_stays_under_bucket_limit() -> None:
+    rate = 20
+    stats, server = run_broadcast(FakeBotAPIConfig(), list(range(1, 51)), rate=rate, per_chat_interval=0, concurrency=10)
+
+    assert stats.sent == 50
+    times = [call.received_at for call in server.calls]
+    # За любой интервал ведро выдает не больше емкости (rate) плюс пополнение
+    for first in range(len(times)):
+        for last in range(first + 1, len(times)):
+            assert last - first + 1 <= rate + rate * (times[last] - times[first] + TIMER_SLACK)
+
+
+def test_per_chat_interval_is_kept() -> None:
+    stats, server = run_broadcast(FakeBotAPIConfig(), [1, 1, 1], rate=100, per_chat_interval=0.2, concurrency=3)
+
+    assert stats.sent == 3
+    times = [call.received_at for call in server.calls]
+    assert all(later - earlier >= 0.2 - TIMER_SLACK for earlier, later in zip(times, times[1:], strict=False))
+
+
+def test_retry_after_is_honoured() -> None:
+    config = FakeBotAPIConfig(flood_every=3, retry_after=1)
+    stats, server = run_broadcast(config, [1, 2, 3, 4], rate=100, per_chat_interval=0, concurrency=1)
+
+    assert stats.sent == 4
+    assert stats.retried >= 1
+    assert stats.failed == 0
+    # Следующий запрос после 429 приходит не раньше, чем через retry_after
+    flood = server.calls[2]
+    assert server.calls[3].received_at - flood.received_at >= config.retry_after - TIMER_SLACK
+
+
+def test_retry_after_gives_up_after_max_retries() -> None:
+    stats, _ = run_broadcast(FakeBotAPIConfig(flood_every=1, retry_after=1), [1], max_retries=1)
+
+    assert stats.sent == 0
+    assert stats.retried == 1
+    assert stats.failures == {DeliveryFailure.RATE_LIMITED: 1}
+
+
+def test_unreachable_users_are_reported() -> None:
+    config = FakeBotAPIConfig(blocked_chat_ids={2}, deactivated_chat_ids={3}, missing_chat_ids={4})
+    stats, _ = run_broadcast(config, [1, 2, 3, 4], per_chat_interval=0)
+
+    assert stats.sent == 1
+    assert sorted(stats.unreachable) == [2, 3, 4]
+    assert stats.failures == {DeliveryFailure.BLOCKED: 2, DeliveryFailure.CHAT_NOT_FOUND: 1}
+    assert stats.retried == 0
+
+
+def test_transient_errors_are_retried() -> None:
+    config = FakeBotAPIConfig(server_errors={1: 2, 2: 5})
+    stats, server = run_broadcast(config, [1, 2, 3], per_chat_interval=0, max_retries=3)
+
+    assert stats.sent == 2
+    assert stats.failures == {DeliveryFailure.SERVER: 1}
+    assert stats.unreachable == []
+    # Чат 1: две ошибки и успешная отправка; чат 2: первая попытка и три повтора
+    chat_calls = [int(call.params["chat_id"]) for call in server.calls]
+    assert chat_calls.count(1) == 3
+    assert chat_calls.count(2) == 4
+
+
+def test_token_bucket_limits_bursts() -> None:
+    async def acquire_all(bucket: TokenBucket, count: int) -> float:
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        for _ in range(count):
+            await bucket.acquire()
+        return loop.time() - started_at
+
+    # Емкость 5 выдается сразу, еще 5 токенов - за 5 / 50 = 0.1 с
+    elapsed = asyncio.run(acquire_all(TokenBucket(rate=50, capacity=5), 10))
+    assert 0.1 - TIMER_SLACK <= elapsed < 0.1 + 10 * TIMER_SLACK
+
+
+def test_classify_failure_without_server() -> None:
+    assert classify_failure(RuntimeError("boom")) == DeliveryFailure.UNKNOWN
+
+
@@ -0,0 +1,218 @@
+"""Эквивалентность функций расчета прогресса бота и ETL эталонной формуле.
+
+Расчет продублирован в etl_service/calculations.py и bot/utils/calculations.py
+(бот и ETL собираются в разные образы). Обе копии сравниваются с
+зафиксированной здесь исходной формулой (_reference_*) и между собой с
+точностью до бита: на граничных профилях (ИМТ ровно на пороге, цель равна
+старту, вес ниже цели, набор веса) и на случайных профилях для набора seed.
+"""
+
+import importlib.util
+import math
+import pathlib
+import random
+from collections.abc import Callable
+from types import ModuleType
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+# Случайные профили: SAMPLES профилей для каждого seed
+SEEDS = range(20)
+SAMPLES = 2000
+
+# Пороги ИМТ формулы
+BMI_THRESHOLDS = (25, 30, 35, 40)
+
+Profile = tuple[float, float, float, float]  # стартовый вес, рост, целевой вес, текущий вес
+
+
+def _load(name: str, path: pathlib.Path) -> ModuleType:
+    # Обе копии называются calculations, поэтому загружаются по пути под разными именами
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+MODULES = {
+    "etl": _load("etl_calculations", ROOT / "etl_service" / "calculations.py"),
+    "bot": _load("bot_calculations", ROOT / "bot" / "utils" / "calculations.py"),
+}
+
+
+# Эталонная формула (исходная реализация calculations.py). Не менять при оптимизациях:
+# новые реализации сравниваются с ней.
+
+def _reference_bmi(weight: float, height: float) -> float:
+    height_m = height / 100
+    return weight / (height_m ** 2)
+
+
+def _reference_weight_factor(initial_bmi: float) -> float:
+    if initial_bmi < 25:
+        return 1.0
+    if initial_bmi < 30:
+        return 1.2
+    if initial_bmi < 35:
+        return 1.5
+    if initial_bmi < 40:
+        return 1.8
+    return 2.0
+
+
+def _reference_progress_points(start_weight: float, current_weight: float, height: float, target_weight: float) -> float:
+    initial_bmi = _reference_bmi(start_weight, height)
+    current_bmi = _reference_bmi(current_weight, height)
+    current_bmi_diff = abs(current_bmi - _reference_bmi(target_weight, height))
+    initial_bmi_diff = abs(initial_bmi - _reference_bmi(target_weight, height))
+    adaptive_factor = max(0.5, 1.0 - (current_bmi_diff / initial_bmi_diff if initial_bmi_diff != 0 else 1.0))
+    return (start_weight - current_weight) * (1.0 * adaptive_factor)
+
+
+def _reference_adjusted_percentage(start_weight: float, current_weight: float, height: float) -> float:
+    percentage_loss = (start_weight - current_weight) / start_weight * 100
+    initial_bmi = _reference_bmi(start_weight, height)
+    if initial_bmi < 25:
+        adjustment_factor = 1.0
+    elif initial_bmi < 30:
+        adjustment_factor = 1.1
+    elif initial_bmi < 35:
+        adjustment_factor = 1.3
+    elif initial_bmi < 40:
+        adjustment_factor = 1.6
+    else:
+        adjustment_factor = 2.0
+    return percentage_loss * adjustment_factor
+
+
+Check = tuple[Callable[[ModuleType, Profile], float], Callable[[Profile], float]]
+
+# Проверки: значение функции модуля на профиле и эталонное значение
+CHECKS: dict[str, Check] = {
+    "calculate_bmi": (
+        lambda m, p: m.calculate_bmi(p[3], p[1]),
+        lambda p: _reference_bmi(p[3], p[1]),
+    ),
+    "get_weight_factor": (
+        lambda m, p: m.get_weight_factor(_reference_bmi(p[0], p[1])),
+        lambda p: _reference_weight_factor(_reference_bmi(p[0], p[1])),
+    ),
+    "calculate_progress_points": (
+        lambda m, p: m.calculate_progress_points(p[0], p[3], p[1], p[2]),
+        lambda p: _reference_progress_points(p[0], p[3], p[1], p[2]),
+    ),
+    "calculate_target_point": (
+        lambda m, p: m.calculate_target_point(p[0], p[1], p[2]),
+        lambda p: _reference_progress_points(p[0], p[2], p[1], p[2]),
+    ),
+    "calculate_current_point": (
+        lambda m, p: m.calculate_current_point(p[0], p[3], p[1], p[2]),
+        lambda p: _reference_progress_points(p[0], p[3], p[1], p[2]),
+    ),
+    "calculate_progress_constants.target_point": (
+        lambda m, p: m.calculate_progress_constants(p[0], p[1], p[2]).target_point,
+        lambda p: _reference_progress_points(p[0], p[2], p[1], p[2]),
+    ),
+    "calculate_point": (
+        lambda m, p: m.calculate_point(m.calculate_progress_constants(p[0], p[1], p[2]), p[3]),
+        lambda p: _reference_progress_points(p[0], p[3], p[1], p[2]),
+    ),
+}
+
+# Проверки функций, которые есть только в ETL
+ETL_CHECKS: dict[str, Check] = {
+    "calculate_adjusted_percentage": (
+        lambda m, p: m.calculate_adjusted_percentage(p[0], p[3], p[1]),
+        lambda p: _reference_adjusted_percentage(p[0], p[3], p[1]),
+    ),
+    "calculate_points_series": (
+        lambda m, p: m.calculate_points_series(m.calculate_progress_constants(p[0], p[1], p[2]), [p[3]])[0],
+        lambda p: _reference_progress_points(p[0], p[3], p[1], p[2]),
+    ),
+}
+
+
+def random_profile(rng: random.Random) -> Profile:
+    """Случайный правдоподобный профиль: ИМТ 18-50, цель ниже старта, текущий вес около пути к цели."""
+    height = rng.uniform(145, 205)
+    start_weight = round(rng.uniform(18, 50) * (height / 100) ** 2, 1)
+    target_weight = round(start_weight * rng.uniform(0.7, 0.98), 1)
+    current_weight = round(rng.uniform(target_weight - 5, start_weight + 5), 1)
+    return start_weight, height, target_weight, current_weight
+
+
+def edge_profiles() -> list[Profile]:
+    """Граничные профили формулы."""
+    profiles = []
+    for height in (150.0, 170.0, 185.5):
+        height_m_squared = (height / 100) ** 2
+        for threshold in BMI_THRESHOLDS:
+            # Стартовый вес ровно на пороге ИМТ и рядом с ним
+            for start_weight in (threshold * height_m_squared, threshold * height_m_squared - 1e-9):
+                target_weight = start_weight * 0.9
+                profiles.extend([
+                    (start_weight, height, target_weight, start_weight),  # без изменений
+                    (start_weight, height, target_weight, target_weight),  # цель достигнута
+                    (start_weight, height, target_weight, target_weight - 3),  # ниже цели
+                    (start_weight, height, target_weight, start_weight + 4),  # набор веса
+                ])
+        # Цель равна старту: нулевая шкала
+        profiles.extend((start_weight, height, start_weight, start_weight - 2) for start_weight in (60.0, 95.5, 120.0))
+    return profiles
+
+
+def random_profiles(seed: int) -> list[Profile]:
+    rng = random.Random(seed)
+    return [random_profile(rng) for _ in range(SAMPLES)]
+
+
+def _same(actual: float, expected: float) -> bool:
+    # Совпадение с точностью до бита (NaN равен NaN)
+    return actual == expected or (math.isnan(actual) and math.isnan(expected))
+
+
+def _assert_matches(module: ModuleType, check: Check, profiles: list[Profile]) -> None:
+    actual, expected = check
+    for profile in profiles:
+        actual_value, expected_value = actual(module, profile), expected(profile)
+        assert _same(actual_value, expected_value), (
+            f"{actual_value!r} != {expected_value!r} "
+            f"(старт {profile[0]!r}, рост {profile[1]!r}, цель {profile[2]!r}, вес {profile[3]!r})"
+        )
+
+
+def test_formula_version_matches() -> None:
+    assert MODULES["bot"].FORMULA_VERSION == MODULES["etl"].FORMULA_VERSION
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+@pytest.mark.parametrize("check_name", CHECKS)
+def test_edge_profiles_match_reference(module_name: str, check_name: str) -> None:
+    _assert_matches(MODULES[module_name], CHECKS[check_name], edge_profiles())
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+@pytest.mark.parametrize("check_name", CHECKS)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_random_profiles_match_reference(module_name: str, check_name: str, seed: int) -> None:
+    _assert_matches(MODULES[module_name], CHECKS[check_name], random_profiles(seed))
+
+
+@pytest.mark.parametrize("check_name", ETL_CHECKS)
+@pytest.mark.parametrize("seed", [None, *SEEDS])
+def test_etl_only_functions_match_reference(check_name: str, seed: int | None) -> None:
+    profiles = edge_profiles() if seed is None else random_profiles(seed)
+    _assert_matches(MODULES["etl"], ETL_CHECKS[check_name], profiles)
+
+
+@pytest.mark.parametrize("check_name", CHECKS)
+@pytest.mark.parametrize("seed", [None, *SEEDS])
+def test_bot_matches_etl(check_name: str, seed: int | None) -> None:
+    profiles = edge_profiles() if seed is None else random_profiles(seed)
+    actual, _ = CHECKS[check_name]
+    # Эталон - значение копии ETL
+    _assert_matches(MODULES["bot"], (actual, lambda p: actual(MODULES["etl"], p)), profiles)
@@ -0,0 +1,120 @@
+"""Импорт истории из CSV (utils.csv_import.CsvImporter)."""
+
+import io
+import pathlib
+
+import pytest
+from database.models import get_connection
+from utils import messages as msg
+from utils.csv_import import CsvImporter, ImportStats
+from utils.weight_history import HISTORY_EPOCH
+
+
+@pytest.fixture
+def users(bot_db: pathlib.Path) -> None:
+    conn = get_connection()
+    conn.executemany(
+        """
+        INSERT INTO users (id, username, gender, age, height, start_weight, target_weight)
+        VALUES (?, ?, 'M', 40, 180, 100, 85)
+        """,
+        [(1, "first"), (2, "second")],
+    )
+    conn.commit()
+    conn.close()
+
+
+def import_text(text: str, batch_size: int = 100) -> ImportStats:
+    importer = CsvImporter(io.BytesIO(text.encode()), batch_size=batch_size)
+    while importer.import_batch():
+        pass
+    return importer.stats
+
+
+def count(table: str) -> int:
+    conn = get_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]  # noqa: S608
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("delimiter", [",", ";"])
+def test_header_delimiter_is_detected(users: None, delimiter: str) -> None:
+    rows = [
+        ["type", "value", "user_id", "date"],
+        ["weight", "98,5" if delimiter == ";" else "98.5", "1", "2024-01-15"],
+        ["walking", "10500", "1", "15.01.2024 19:30"],
+    ]
+    stats = import_text("\n".join(delimiter.join(row) for row in rows))
+
+    assert stats.error_count == 0, stats.errors
+    assert (stats.rows, stats.weights, stats.activities) == (2, 1, 1)
+
+
+def test_missing_columns_are_rejected(users: None) -> None:
+    with pytest.raises(ValueError, match="value"):
+        CsvImporter(io.BytesIO(b"user_id,date,type\n1,2024-01-15,weight\n"))
+
+
+@pytest.mark.parametrize(
+    ("row", "error"),
+    [
+        ("3,2024-01-15,weight,90", msg.IMPORT_UNKNOWN_USER_S.format("3")),
+        ("1,1999-12-31,weight,90", msg.IMPORT_EARLY_DATE_SS.format("1999-12-31", f"{HISTORY_EPOCH:%d.%m.%Y}")),
+        ("1,2999-01-01,weight,90", msg.IMPORT_FUTURE_DATE_S.format("2999-01-01")),
+        ("1,15/01/2024,weight,90", msg.IMPORT_INVALID_DATE_S.format("15/01/2024")),
+        ("1,2024-01-15,weight,heavy", msg.IMPORT_INVALID_VALUE_S.format("heavy")),
+        ("1,2024-01-15,weight,500", msg.IMPORT_WEIGHT_RANGE_SSS.format(500.0, 30, 300)),
+        ("1,2024-01-15,swimming,30", msg.IMPORT_UNKNOWN_TYPE_S.format("swimming")),
+        ("1,2024-01-15,walking,-5", msg.IMPORT_ACTIVITY_RANGE_SSS.format(-5.0, "walking", 50000)),
+        ("1,2024-01-15", msg.IMPORT_INVALID_ROW),
+    ],
+)
+def test_invalid_rows_are_rejected(users: None, row: str, error: str) -> None:
+    stats = import_text(f"user_id,date,type,value\n{row}\n")
+
+    assert stats.errors == [msg.IMPORT_ROW_ERROR_SS.format(2, error)]
+    assert (stats.rows, stats.weights, stats.activities) == (1, 0, 0)
+    assert count("weight_records") == 0
+
+
+def test_reimport_counts_duplicates(users: None) -> None:
+    text = "\n".join([
+        "user_id,date,type,value",
+        *(f"{user_id},2024-01-{day:02},weight,{95 - day / 10}" for user_id in (1, 2) for day in range(1, 11)),
+        "1,2024-01-05,running,30",
+    ])
+    first = import_text(text, batch_size=7)
+    second = import_text(text, batch_size=7)
+
+    assert (first.weights, first.activities, first.duplicates) == (20, 1, 0)
+    assert (second.rows, second.weights, second.activities, second.duplicates) == (21, 0, 0, 21)
+    assert count("weight_records") == 20
+    assert count("activity_records") == 1
+
+
+def test_progress_uses_latest_weight_in_batch(users: None) -> None:
+    # Строки не по порядку дат: снимок строится по самой поздней записи, а не по последней строке
+    stats = import_text(
+        "user_id,date,type,value\n"
+        "1,2024-01-03,weight,96\n"
+        "1,2024-01-10,weight,94\n"
+        "1,2024-01-05,weight,95\n",
+    )
+    assert stats.weights == 3
+
+    conn = get_connection()
+    row = conn.execute("SELECT current_weight, lost_weight FROM user_progress WHERE user_id = 1").fetchone()
+    conn.close()
+    assert row == (94, 6)
+
+
+def test_progress_is_not_rolled_back_by_older_batch(users: None) -> None:
+    import_text("user_id,date,type,value\n1,2024-02-01,weight,90\n")
+    import_text("user_id,date,type,value\n1,2024-01-01,weight,97\n")
+
+    conn = get_connection()
+    row = conn.execute("SELECT current_weight FROM user_progress WHERE user_id = 1").fetchone()
+    conn.close()
+    assert row == (90,)
@@ -0,0 +1,121 @@
+"""Очереди фоновых задач (utils.jobs)."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import pytest
+from utils.jobs import (
+    JOB_CANCELLED,
+    JOB_DONE,
+    JOB_FAILED,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    JobManager,
+    QueueFullError,
+)
+
+
+def recorder(order: list[str], name: str) -> Callable[[], Awaitable[None]]:
+    async def run() -> None:
+        order.append(name)
+
+    return run
+
+
+def test_jobs_run_by_priority_then_fifo() -> None:
+    async def test() -> list[str]:
+        manager = JobManager({"charts": 1}, max_size=10)
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def blocker() -> None:
+            await release.wait()
+            order.append("blocker")
+
+        manager.submit("charts", "blocker", blocker)
+        # Обработчик занят первой задачей, остальные ждут в очереди
+        await asyncio.sleep(0)
+        jobs = [
+            manager.submit("charts", name, recorder(order, name), priority)
+            for name, priority in [
+                ("low", PRIORITY_LOW),
+                ("normal-1", PRIORITY_NORMAL),
+                ("high", PRIORITY_HIGH),
+                ("normal-2", PRIORITY_NORMAL),
+            ]
+        ]
+        assert manager.queues() == [("charts", 4, 1, 10)]
+        release.set()
+        while any(job.status != JOB_DONE for job in jobs):
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return order
+
+    assert asyncio.run(test()) == ["blocker", "high", "normal-1", "normal-2", "low"]
+
+
+def test_full_queue_rejects_job() -> None:
+    async def test() -> None:
+        manager = JobManager({"import": 1}, max_size=2)
+        release = asyncio.Event()
+        jobs = [manager.submit("import", f"job-{index}", release.wait) for index in range(2)]
+        with pytest.raises(QueueFullError):
+            manager.submit("import", "rejected", release.wait)
+        # Отклоненная задача не попадает в историю
+        assert [job.name for job in manager.recent(10)] == ["job-1", "job-0"]
+
+        # Обработчик забрал задачу из очереди - место освободилось
+        await asyncio.sleep(0)
+        jobs.append(manager.submit("import", "accepted", release.wait))
+        release.set()
+        while any(job.status != JOB_DONE for job in jobs):
+            await asyncio.sleep(0.01)
+        await manager.stop()
+
+    asyncio.run(test())
+
+
+def test_failed_job_does_not_stop_queue() -> None:
+    async def test() -> None:
+        manager = JobManager({"charts": 1}, max_size=10)
+        order: list[str] = []
+
+        async def fail() -> None:
+            raise RuntimeError("boom")
+
+        failed = manager.submit("charts", "fail", fail)
+        done = manager.submit("charts", "next", recorder(order, "next"))
+        while done.status != JOB_DONE:
+            await asyncio.sleep(0.01)
+        await manager.stop()
+
+        assert failed.status == JOB_FAILED
+        assert failed.error == "RuntimeError('boom')"
+        assert order == ["next"]
+
+    asyncio.run(test())
+
+
+def test_stop_cancels_waiting_jobs() -> None:
+    async def test() -> None:
+        manager = JobManager({"charts": 1}, max_size=10)
+        never = asyncio.Event()
+        running = manager.submit("charts", "running", never.wait)
+        await asyncio.sleep(0)
+        waiting = manager.submit("charts", "waiting", never.wait)
+        await manager.stop()
+        assert running.status == JOB_CANCELLED
+        assert waiting.status == JOB_CANCELLED
+
+    asyncio.run(test())
+
+
+def test_unknown_queue_is_rejected() -> None:
+    manager = JobManager({"charts": 1}, max_size=10)
+
+    async def run() -> None:
+        pass
+
+    with pytest.raises(ValueError, match="unknown"):
+        manager.submit("unknown", "job", run)
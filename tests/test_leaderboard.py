@@ -0,0 +1,79 @@
+"""Таблица лидеров (utils.leaderboard): места после нового веса и после изменений других воркеров."""
+
+import pathlib
+from collections.abc import Iterator
+
+import pytest
+from database.models import get_connection
+from database.queries import UserProgress, save_user_progress
+from utils.leaderboard import Leaderboard
+
+
+def save_weights(weights: dict[int, float], record_date: str) -> dict[int, UserProgress]:
+    """Запись весов в снимки прогресса отдельным соединением, как в другом воркере."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    progress = {}
+    for user_id, weight in weights.items():
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO users (id, username, gender, age, height, start_weight, target_weight)
+            VALUES (?, ?, 'F', 30, 170, 80, 70)
+            """,
+            (user_id, f"user{user_id}"),
+        )
+        saved = save_user_progress(cursor, user_id, weight, record_date)
+        assert saved is not None
+        progress[user_id] = saved
+    conn.commit()
+    conn.close()
+    return progress
+
+
+@pytest.fixture
+def board(bot_db: pathlib.Path) -> Iterator[Leaderboard]:
+    save_weights({1: 79, 2: 76, 3: 78}, "2026-10-01 08:00:00")
+    board = Leaderboard(sync_interval=0)
+    board.load()
+    yield board
+    board.close()
+
+
+def ranking(board: Leaderboard) -> list[tuple[int, int]]:
+    return [(rank, entry.user_id) for rank, entry in board.top(10)]
+
+
+def test_top_and_rank_after_load(board: Leaderboard) -> None:
+    assert len(board) == 3
+    assert ranking(board) == [(1, 2), (2, 3), (3, 1)]
+    assert board.top(1)[0][1].lost_weight == 4
+    rank = board.rank(3)
+    assert rank is not None
+    assert rank[0] == 2
+    assert board.rank(4) is None
+
+
+def test_update_moves_only_the_participant(board: Leaderboard) -> None:
+    progress = save_weights({1: 75}, "2026-10-02 08:00:00")
+    board.update(progress[1])
+    assert ranking(board) == [(1, 1), (2, 2), (3, 3)]
+
+    # При равных очках место общее, порядок - по ID
+    progress = save_weights({3: 75}, "2026-10-02 09:00:00")
+    board.update(progress[3])
+    assert ranking(board) == [(1, 1), (1, 3), (3, 2)]
+
+
+def test_sync_picks_up_changes_of_other_workers(board: Leaderboard) -> None:
+    save_weights({2: 79, 4: 74}, "2026-10-02 08:00:00")
+    assert ranking(board) == [(1, 4), (2, 3), (3, 1), (3, 2)]
+    assert len(board) == 4
+
+
+def test_sync_interval_delays_foreign_changes(bot_db: pathlib.Path) -> None:
+    save_weights({1: 79}, "2026-10-01 08:00:00")
+    board = Leaderboard(sync_interval=60)
+    board.load()
+    save_weights({2: 75}, "2026-10-01 08:00:00")
+    assert board.rank(2) is None
+    board.close()
@@ -0,0 +1,145 @@
+"""Инкрементальная загрузка витрины и сверка партиций (etl_processor, reconciliation).
+
+Нужен PostgreSQL: тесты запускаются, только если ETL_TEST_POSTGRES_DB указывает
+на тестовую базу (остальные параметры подключения - ETL_ANAL_POSTGRES_*).
+Таблицы витрины в ней очищаются.
+"""
+
+import asyncio
+import os
+import pathlib
+from collections.abc import Awaitable, Callable
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from config import etl_settings
+from database.models import get_connection
+from etl_processor import ETLProcessor
+from init_tables import init_analytics_tables
+from models import Activity, User
+from reconciliation import ACTIVITY_DATA_RECONCILED, WEIGHT_DATA_RECONCILED, Reconciler
+
+pytestmark = pytest.mark.skipif(not os.environ.get("ETL_TEST_POSTGRES_DB"), reason="ETL_TEST_POSTGRES_DB не задана")
+
+MART_TABLES = "user_progress_history, weight_data, activity_data, user_progress, etl_meta, users, activities"
+
+WEIGHTS = [
+    (1, 90.0, "2026-01-30 08:00:00"),
+    (1, 89.5, "2026-01-31 08:00:00"),
+    # Две записи за день: в витрину попадает последняя
+    (1, 89.0, "2026-02-01 08:00:00"),
+    (1, 88.8, "2026-02-01 21:00:00"),
+    (2, 70.0, "2026-02-01 09:00:00"),
+]
+ACTIVITIES = [
+    (1, 1, 5000, "2026-02-01 10:00:00"),
+    (1, 1, 2500, "2026-02-01 18:00:00"),
+    (2, 2, 30, "2026-02-02 07:00:00"),
+]
+
+
+def add_records(weights: list[tuple], activities: list[tuple]) -> None:
+    conn = get_connection()
+    conn.executemany("INSERT INTO weight_records (user_id, weight, record_date) VALUES (?, ?, ?)", weights)
+    conn.executemany(
+        "INSERT INTO activity_records (user_id, activity_type_id, value, record_date) VALUES (?, ?, ?, ?)", activities,
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def run_etl(bot_db: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> Callable[[Callable[[ETLProcessor], Awaitable]], None]:
+    """Запуск теста с процессором, подключенным к базе бота и пустой витрине."""
+    monkeypatch.setattr(etl_settings, "database_path", bot_db)
+    monkeypatch.setattr(etl_settings, "anal_postgres_db", os.environ["ETL_TEST_POSTGRES_DB"])
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO users (id, username, gender, height, start_weight, target_weight) VALUES (?, ?, 'F', 170, 90, 70)",
+        [(1, "first"), (2, "second")],
+    )
+    conn.commit()
+    conn.close()
+    add_records(WEIGHTS, ACTIVITIES)
+
+    def run(test: Callable[[ETLProcessor], Awaitable]) -> None:
+        async def main() -> None:
+            await init_analytics_tables()
+            processor = ETLProcessor()
+            await processor.connect_to_sources()
+            try:
+                await processor.target_conn.execute(f"TRUNCATE {MART_TABLES} CASCADE")
+                users = await processor.get_users_from_source()
+                await processor.insert_users_to_target([User(id=user["id"], nickname=user["nickname"]) for user in users])
+                activities = await processor.get_activities_from_source()
+                await processor.insert_activities_to_target([Activity(**activity) for activity in activities])
+                await test(processor)
+            finally:
+                await processor.disconnect_from_sources()
+
+        asyncio.run(main())
+
+    return run
+
+
+async def mart_weights(processor: ETLProcessor) -> dict[tuple[int, date], Decimal]:
+    records = await processor.target_conn.fetch("SELECT user_id, date, weight FROM weight_data")
+    return {(record["user_id"], record["date"]): record["weight"] for record in records}
+
+
+def test_load_takes_only_days_with_new_records(run_etl: Callable) -> None:
+    async def test(processor: ETLProcessor) -> None:
+        assert await processor.load_weight_data() == 4
+        assert await processor.load_activity_data() == 2
+        weights = await mart_weights(processor)
+        assert weights[1, date(2026, 2, 1)] == Decimal("88.8")
+        activity = await processor.target_conn.fetchval("SELECT value FROM activity_data WHERE user_id = 1")
+        assert activity == Decimal(7500)
+
+        # Без новых записей база бота не читается
+        assert await processor.load_weight_data() == 0
+        assert await processor.load_activity_data() == 0
+
+        # Новая запись в уже загруженный день и новый день: переносятся только они
+        add_records([(1, 88.1, "2026-02-01 22:00:00"), (2, 69.5, "2026-02-03 09:00:00")], [(2, 2, 15, "2026-02-02 19:00:00")])
+        assert await processor.load_weight_data() == 2
+        assert await processor.load_activity_data() == 1
+        weights = await mart_weights(processor)
+        assert weights[1, date(2026, 2, 1)] == Decimal("88.1")
+        assert weights[2, date(2026, 2, 3)] == Decimal("69.5")
+        assert weights[1, date(2026, 1, 30)] == Decimal("90.0")
+        activity = await processor.target_conn.fetchval("SELECT value FROM activity_data WHERE user_id = 2")
+        assert activity == Decimal(45)
+
+        # Загрузка совпадает с канонической: сверке нечего исправлять
+        reconciler = Reconciler(processor.source_conn, processor.target_conn)
+        for table in (WEIGHT_DATA_RECONCILED, ACTIVITY_DATA_RECONCILED):
+            assert await reconciler.find_mismatched_partitions(table) == []
+
+    run_etl(test)
+
+
+def test_reconciliation_repairs_corrupted_row(run_etl: Callable) -> None:
+    async def test(processor: ETLProcessor) -> None:
+        await processor.load_weight_data()
+        await processor.load_activity_data()
+        loaded = await mart_weights(processor)
+
+        # Правка витрины в обход ETL: загрузка ее не видит, сверка находит партицию
+        await processor.target_conn.execute(
+            "UPDATE weight_data SET weight = weight + 1 WHERE user_id = 1 AND date = '2026-01-31'",
+        )
+        await processor.target_conn.execute("DELETE FROM activity_data WHERE user_id = 2")
+        assert await processor.load_weight_data() == 0
+        reconciler = Reconciler(processor.source_conn, processor.target_conn)
+        assert await reconciler.find_mismatched_partitions(WEIGHT_DATA_RECONCILED) == [(1, "2026-01")]
+        assert await reconciler.find_mismatched_partitions(ACTIVITY_DATA_RECONCILED) == [(2, "2026-02")]
+
+        repaired = await reconciler.reconcile()
+        assert repaired == {"weight_data": [(1, date(2026, 1, 1))], "activity_data": [(2, date(2026, 2, 1))]}
+        assert await mart_weights(processor) == loaded
+        assert await processor.target_conn.fetchval("SELECT value FROM activity_data WHERE user_id = 2") == Decimal(30)
+        assert await reconciler.reconcile() == {"weight_data": [], "activity_data": []}
+
+    run_etl(test)
@@ -0,0 +1,114 @@
+"""Хранилище FSM в SQLite (storage.sqlite): пакетная запись и синхронизация воркеров."""
+
+import asyncio
+import pathlib
+from collections.abc import Awaitable, Callable
+
+from aiogram.fsm.storage.base import StorageKey
+from storage.sqlite import SQLiteStorage
+
+KEY = StorageKey(bot_id=42, chat_id=1, user_id=1)
+
+
+def storage(flush_interval: float = 60, sync_interval: float = 0, cache_size: int = 100) -> SQLiteStorage:
+    """Хранилище с отложенной записью и проверкой чужих изменений при каждом чтении."""
+    return SQLiteStorage(flush_interval=flush_interval, sync_interval=sync_interval, cache_size=cache_size)
+
+
+def run(test: Callable[[], Awaitable[None]]) -> None:
+    asyncio.run(test())
+
+
+def test_round_trip_across_flush(bot_db: pathlib.Path) -> None:
+    async def test() -> None:
+        writer = storage()
+        await writer.set_state(KEY, "Form:weight")
+        await writer.set_data(KEY, {"weight": 70.5})
+        # До записи в базу значения видны из кэша процесса
+        assert await writer.get_state(KEY) == "Form:weight"
+        await writer.close()
+
+        reader = storage()
+        assert await reader.get_state(KEY) == "Form:weight"
+        assert await reader.get_data(KEY) == {"weight": 70.5}
+
+        # Очистка как в FSMContext.clear
+        await reader.set_state(KEY, None)
+        await reader.set_data(KEY, {})
+        await reader.close()
+
+        cleared = storage()
+        assert await cleared.get_state(KEY) is None
+        assert await cleared.get_data(KEY) == {}
+        await cleared.close()
+
+    run(test)
+
+
+def test_get_data_returns_copy(bot_db: pathlib.Path) -> None:
+    async def test() -> None:
+        fsm = storage()
+        await fsm.set_data(KEY, {"step": 1})
+        data = await fsm.get_data(KEY)
+        data["step"] = 2
+        assert await fsm.get_data(KEY) == {"step": 1}
+        await fsm.close()
+
+    run(test)
+
+
+def test_data_version_sync_between_instances(bot_db: pathlib.Path) -> None:
+    async def test() -> None:
+        first, second = storage(), storage()
+        # Второй воркер кэширует пустое состояние
+        assert await second.get_state(KEY) is None
+
+        await first.set_state(KEY, "Form:weight")
+        await first.set_data(KEY, {"weight": 80})
+        await first._flush()
+        assert await second.get_state(KEY) == "Form:weight"
+        assert await second.get_data(KEY) == {"weight": 80}
+
+        # Изменения второго воркера, еще не записанные в базу, не затираются чужими
+        await second.set_data(KEY, {"weight": 81})
+        await first.set_data(KEY, {"weight": 82})
+        await first._flush()
+        assert await second.get_data(KEY) == {"weight": 81}
+
+        await second.close()
+        await first.close()
+        reader = storage()
+        assert await reader.get_data(KEY) == {"weight": 81}
+        await reader.close()
+
+    run(test)
+
+
+def test_sync_interval_delays_foreign_changes(bot_db: pathlib.Path) -> None:
+    async def test() -> None:
+        first, second = storage(flush_interval=0), storage(sync_interval=60)
+        assert await second.get_state(KEY) is None
+        await first.set_state(KEY, "Form:weight")
+        # Кэш второго воркера обновится только через sync_interval
+        assert await second.get_state(KEY) is None
+        await first.close()
+        await second.close()
+
+    run(test)
+
+
+def test_cache_keeps_unflushed_records(bot_db: pathlib.Path) -> None:
+    async def test() -> None:
+        fsm = storage(cache_size=2)
+        keys = [StorageKey(bot_id=42, chat_id=chat_id, user_id=chat_id) for chat_id in range(5)]
+        for key in keys:
+            await fsm.set_state(key, f"State:{key.chat_id}")
+        # Несохраненные записи не вытесняются из кэша
+        assert [await fsm.get_state(key) for key in keys] == [f"State:{key.chat_id}" for key in keys]
+        await fsm.close()
+
+        reader = storage()
+        assert [await reader.get_state(key) for key in keys] == [f"State:{key.chat_id}" for key in keys]
+        await reader.close()
+
+    run(test)
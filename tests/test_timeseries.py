@@ -0,0 +1,51 @@
+"""Прореживание рядов для графиков алгоритмом LTTB (utils.timeseries)."""
+
+import math
+from datetime import date, timedelta
+
+import pytest
+from utils.timeseries import lttb, lttb_indices
+
+
+def daily_series(count: int) -> list[tuple[str, float]]:
+    start = date(2025, 1, 1)
+    return [((start + timedelta(days=day)).isoformat(), 80 + 5 * math.sin(day / 10)) for day in range(count)]
+
+
+@pytest.mark.parametrize("threshold", [3, 10, 99])
+def test_endpoints_are_kept_and_threshold_respected(threshold: int) -> None:
+    xs = [float(x) for x in range(1000)]
+    ys = [math.sin(x / 50) for x in xs]
+    indices = lttb_indices(xs, ys, threshold)
+
+    assert len(indices) == threshold
+    assert indices[0] == 0
+    assert indices[-1] == len(xs) - 1
+    assert indices == sorted(set(indices))
+
+
+@pytest.mark.parametrize(("count", "threshold"), [(0, 10), (5, 10), (10, 10), (10, 2)])
+def test_short_series_is_returned_unchanged(count: int, threshold: int) -> None:
+    xs = [float(x) for x in range(count)]
+    assert lttb_indices(xs, xs, threshold) == list(range(count))
+
+    points = daily_series(count)
+    assert lttb(points, threshold) == points
+
+
+def test_peak_is_kept() -> None:
+    ys = [0.0] * 500
+    ys[321] = 10.0
+    indices = lttb_indices([float(x) for x in range(500)], ys, 20)
+    assert 321 in indices
+
+
+def test_lttb_uses_dates_as_x() -> None:
+    points = daily_series(365)
+    result = lttb(points, 50)
+
+    assert len(result) == 50
+    assert result[0] == points[0]
+    assert result[-1] == points[-1]
+    assert all(point in points for point in result)
+    assert [point_date for point_date, _ in result] == sorted(point_date for point_date, _ in result)
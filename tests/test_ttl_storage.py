@@ -0,0 +1,113 @@
+"""Хранилище FSM в памяти с TTL (storage.memory): истечение ключей и вытеснение LRU."""
+
+import asyncio
+import time
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from storage.memory import TTLMemoryStorage
+from utils.metrics import metrics
+
+
+class Form(StatesGroup):
+    weight = State()
+
+
+def key(chat_id: int) -> StorageKey:
+    return StorageKey(bot_id=42, chat_id=chat_id, user_id=chat_id)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Управляемое время time.monotonic, сдвигается изменением clock[0]."""
+    now = [time.monotonic()]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_key_expires_after_ttl(clock: list[float]) -> None:
+    async def test() -> None:
+        storage = TTLMemoryStorage(default_ttl=10, state_ttls={Form: 2})
+        await storage.set_state(key(1), Form.weight)
+        await storage.set_data(key(2), {"step": 1})
+
+        clock[0] += 1
+        # Обращение продлевает срок жизни ключа
+        assert await storage.get_state(key(1)) == Form.weight.state
+        clock[0] += 1.5
+        assert await storage.get_state(key(1)) == Form.weight.state
+        clock[0] += 2
+        # Срок группы Form истек, для ключа без состояния действует default_ttl
+        assert await storage.get_state(key(1)) is None
+        assert await storage.get_data(key(2)) == {"step": 1}
+        assert storage.evictions == 1
+        assert storage.live_keys == 1
+        await storage.close()
+
+    asyncio.run(test())
+
+
+def test_sweep_removes_expired_keys(clock: list[float]) -> None:
+    async def test() -> None:
+        storage = TTLMemoryStorage(default_ttl=5)
+        for chat_id in range(3):
+            await storage.set_data(key(chat_id), {"chat_id": chat_id})
+        clock[0] += 3
+        await storage.get_data(key(0))
+        clock[0] += 3
+
+        assert storage.sweep() == 2
+        assert storage.live_keys == 1
+        assert await storage.get_data(key(0)) == {"chat_id": 0}
+        await storage.close()
+
+    asyncio.run(test())
+
+
+def test_least_recently_used_keys_are_evicted(clock: list[float]) -> None:
+    async def test() -> None:
+        storage = TTLMemoryStorage(default_ttl=60, max_keys=2)
+        await storage.set_data(key(1), {"chat_id": 1})
+        await storage.set_data(key(2), {"chat_id": 2})
+        # Чтение делает ключ 1 недавно использованным, вытесняется ключ 2
+        await storage.get_data(key(1))
+        await storage.set_data(key(3), {"chat_id": 3})
+
+        assert storage.live_keys == 2
+        assert storage.evictions == 1
+        assert await storage.get_data(key(2)) == {}
+        assert await storage.get_data(key(1)) == {"chat_id": 1}
+        assert await storage.get_data(key(3)) == {"chat_id": 3}
+        await storage.close()
+
+    asyncio.run(test())
+
+
+def test_finished_dialog_is_not_kept() -> None:
+    async def test() -> None:
+        storage = TTLMemoryStorage(default_ttl=60)
+        await storage.set_state(key(1), Form.weight)
+        await storage.set_data(key(1), {"weight": 70})
+        await storage.set_state(key(1), None)
+        await storage.set_data(key(1), {})
+        assert storage.live_keys == 0
+        await storage.close()
+
+    asyncio.run(test())
+
+
+def test_metrics_expose_live_keys_and_evictions(clock: list[float]) -> None:
+    async def test() -> None:
+        storage = TTLMemoryStorage(default_ttl=1, max_keys=1)
+        await storage.set_data(key(1), {"chat_id": 1})
+        await storage.set_data(key(2), {"chat_id": 2})
+        clock[0] += 2
+        storage.sweep()
+        await storage.close()
+
+    asyncio.run(test())
+    rendered = metrics.render()
+    assert 'bot_fsm_evictions_total{reason="capacity"}' in rendered
+    assert 'bot_fsm_evictions_total{reason="expired"}' in rendered
+    assert "bot_fsm_live_keys 0" in rendered
@@ -0,0 +1,35 @@
+"""Снимок прогресса пользователя (database.queries.save_user_progress)."""
+
+import pathlib
+
+from database.models import get_connection
+from database.queries import save_user_progress
+
+
+def test_older_record_does_not_overwrite_progress(bot_db: pathlib.Path) -> None:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO users (id, username, gender, age, height, start_weight, target_weight)
+        VALUES (1, 'user', 'F', 30, 170, 80, 70)
+    """)
+
+    progress = save_user_progress(cursor, 1, 78, "2026-10-02 08:00:00")
+    assert progress is not None
+    assert progress.lost_weight == 2
+
+    # Запись за более ранний день снимок не меняет
+    assert save_user_progress(cursor, 1, 79, "2026-10-01 08:00:00") is None
+    cursor.execute("SELECT current_weight, last_update FROM user_progress WHERE user_id = 1")
+    assert cursor.fetchone() == (78, "2026-10-02 08:00:00")
+
+    assert save_user_progress(cursor, 1, 77, "2026-10-03 08:00:00") is not None
+    conn.close()
+
+
+def test_user_without_target_has_no_progress(bot_db: pathlib.Path) -> None:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, gender) VALUES (1, 'user', 'M')")
+    assert save_user_progress(cursor, 1, 80, "2026-10-02 08:00:00") is None
+    conn.close()
@@ -0,0 +1,97 @@
+"""Кэш историй веса (utils.weight_history) и версия графика веса (utils.timeseries)."""
+
+import pathlib
+from datetime import date
+
+import pytest
+from database.models import get_connection
+from utils import timeseries
+from utils.timeseries import weight_series, weight_series_version
+from utils.weight_history import WEIGHT_SCALE, WeightHistory, WeightHistoryCache, history_day
+
+
+def add_weight(user_id: int, weight: float, record_date: str) -> int:
+    """Запись веса в базу, как ее сохраняет бот или другой воркер. Возвращает ID записи."""
+    conn = get_connection()
+    cursor = conn.execute(
+        "INSERT INTO weight_records (user_id, weight, record_date) VALUES (?, ?, ?)", (user_id, weight, record_date),
+    )
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+
+def test_points_are_packed_by_day() -> None:
+    history = WeightHistory()
+    day = history_day(date(2026, 1, 1))
+    assert history.add(1, day, 80.25)
+    assert history.add(2, day, 80.1)
+    assert history.add(3, day + 2, 79.9)
+    # Запись за более ранний день требует перечитать историю
+    assert not history.add(4, day + 1, 80.0)
+
+    days, weights = history.view()
+    assert list(days) == [day, day + 2]
+    assert [value / WEIGHT_SCALE for value in weights] == [80.1, 79.9]
+    assert len(history) == 2
+    assert history.last_id == 3
+
+    days, weights = history.view(since=date(2026, 1, 2))
+    assert list(days) == [day + 2]
+    assert list(weights) == [7990]
+
+
+def test_open_view_keeps_previous_version() -> None:
+    history = WeightHistory()
+    history.add(1, 100, 80.0)
+    days, _ = history.view()
+    assert history.add(2, 101, 79.5)
+    assert list(days) == [100]
+    assert list(history.view()[0]) == [100, 101]
+
+
+def test_get_reloads_history_behind_database(bot_db: pathlib.Path) -> None:
+    cache = WeightHistoryCache(max_users=10, sync_interval=60)
+    add_weight(1, 80.0, "2026-01-01 08:00:00")
+    history = cache.get(1)
+    assert history is not None
+    assert len(history) == 1
+
+    # Запись другого воркера: sync еще не прошел, но известный ID последней записи перечитывает историю
+    record_id = add_weight(1, 79.0, "2026-01-02 08:00:00")
+    cached = cache.get(1)
+    assert cached is not None
+    assert len(cached) == 1
+    history = cache.get(1, record_id)
+    assert history is not None
+    assert len(history) == 2
+    assert history.last_id == record_id
+
+
+def test_lru_limits_users(bot_db: pathlib.Path) -> None:
+    cache = WeightHistoryCache(max_users=2, sync_interval=60)
+    for user_id in range(1, 4):
+        add_weight(user_id, 80.0, "2026-01-01 08:00:00")
+        cache.get(user_id)
+    assert len(cache) == 2
+    assert cache.memory_usage() > 0
+    assert cache.get(4) is None
+
+
+def test_chart_version_follows_rendered_data(bot_db: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Синхронизация с базой не успевает пройти между запросами
+    monkeypatch.setattr(timeseries, "weight_history", WeightHistoryCache(max_users=10, sync_interval=60))
+    conn = get_connection()
+    conn.execute("INSERT INTO users (id, username, gender, start_weight, target_weight) VALUES (1, 'user', 'F', 80, 70)")
+    conn.commit()
+    conn.close()
+    assert weight_series_version(1) is None
+
+    add_weight(1, 79.5, "2026-01-01 08:00:00")
+    version = weight_series_version(1)
+    # Запись другого воркера меняет версию, а ряд для отрисовки уже включает ее
+    add_weight(1, 78.75, "2026-01-02 08:00:00")
+    assert weight_series_version(1) != version
+    series = weight_series(1)
+    assert series is not None
+    assert series[0][-1] == ("2026-01-02", 78.75)